@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from alembic import context
 from app.core.config import settings
 from app.core.database import Base
-from app.models import access_code, property, booking, user, access_log, payment
+from app.models import access_code, property, booking, user, access_log, payment, telemetry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,51 @@
+"""Full-text and trigram search over properties
+
+Revision ID: 3f6b1c2d9a01
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+# revision identifiers, used by Alembic.
+revision = "3f6b1c2d9a01"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "properties",
+        sa.Column("search_vector", TSVECTOR, sa.Computed(SEARCH_VECTOR, persisted=True)),
+    )
+    op.create_index(
+        "ix_properties_search_vector",
+        "properties",
+        ["search_vector"],
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_properties_location_trgm",
+        "properties",
+        ["location"],
+        postgresql_using="gin",
+        postgresql_ops={"location": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_properties_location_trgm", table_name="properties")
+    op.drop_index("ix_properties_search_vector", table_name="properties")
+    op.drop_column("properties", "search_vector")
@@ -0,0 +1,26 @@
+"""Add coordinates to properties
+
+Revision ID: 8d2e4a7c5b12
+Revises: 3f6b1c2d9a01
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8d2e4a7c5b12"
+down_revision = "3f6b1c2d9a01"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("properties", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("properties", sa.Column("longitude", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("properties", "longitude")
+    op.drop_column("properties", "latitude")
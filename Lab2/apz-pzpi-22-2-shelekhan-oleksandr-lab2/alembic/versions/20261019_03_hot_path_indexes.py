@@ -0,0 +1,51 @@
+"""Index foreign keys and date ranges used by hot queries
+
+Revision ID: c47a9e0f3d25
+Revises: 8d2e4a7c5b12
+Create Date: 2026-10-19 11:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "c47a9e0f3d25"
+down_revision = "8d2e4a7c5b12"
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns); leading columns also serve single-column lookups,
+# so bookings.property_id and notifications.user_id need no index of their own
+INDEXES = [
+    ("ix_bookings_user_id", "bookings", ["user_id"]),
+    ("ix_bookings_property_dates", "bookings", ["property_id", "start_date", "end_date"]),
+    ("ix_payments_booking_id", "payments", ["booking_id"]),
+    ("ix_access_codes_booking_id", "access_codes", ["booking_id"]),
+    ("ix_notifications_user_id_created_at", "notifications", ["user_id", "created_at"]),
+    ("ix_access_logs_access_code_id", "access_logs", ["access_code_id"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,105 @@
+"""Partition access_logs by month
+
+Revision ID: 9e3c7a1f2b48
+Revises: 5b8f1d3a9c64
+Create Date: 2026-10-19 13:00:00
+
+"""
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9e3c7a1f2b48"
+down_revision = "5b8f1d3a9c64"
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, access_code_id, command, response_status, response_message, accessed_at"
+MONTHS_AHEAD = 3
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def create_partitions(first_month):
+    # Kept here rather than imported from the app, so the revision stays as it was
+    month = first_month.replace(day=1)
+    last = datetime.utcnow().date().replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last = next_month(last)
+    while month <= last:
+        following = next_month(month)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS access_logs_{month:%Y_%m} "
+            f"PARTITION OF access_logs "
+            f"FOR VALUES FROM ('{month}') TO ('{following}')"
+        )
+        month = following
+
+
+def upgrade() -> None:
+    # The table is rebuilt: an existing table cannot be turned into a partitioned one
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_old")
+    op.execute("ALTER INDEX access_logs_pkey RENAME TO access_logs_old_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_access_logs_id")
+    op.execute("DROP INDEX IF EXISTS ix_access_logs_access_code_id")
+
+    # No foreign key: entries are written in deferred batches and may name a
+    # code deleted in the meantime, which would fail the whole batch
+    op.execute(
+        """
+        CREATE TABLE access_logs (
+            id integer NOT NULL DEFAULT nextval('access_logs_id_seq'),
+            access_code_id integer,
+            command varchar NOT NULL,
+            response_status varchar NOT NULL,
+            response_message varchar,
+            accessed_at timestamp without time zone NOT NULL
+                DEFAULT (now() AT TIME ZONE 'utc'),
+            PRIMARY KEY (id, accessed_at)
+        ) PARTITION BY RANGE (accessed_at)
+        """
+    )
+    op.execute("CREATE TABLE access_logs_default PARTITION OF access_logs DEFAULT")
+    first = op.get_bind().execute(sa.text("SELECT min(accessed_at) FROM access_logs_old")).scalar()
+    create_partitions(first.date() if first else datetime.utcnow().date())
+
+    op.execute(
+        f"INSERT INTO access_logs ({COLUMNS}) "
+        f"SELECT id, access_code_id, command, response_status, response_message, "
+        f"coalesce(accessed_at, now() AT TIME ZONE 'utc') FROM access_logs_old"
+    )
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+    op.drop_table("access_logs_old")
+    op.create_index("ix_access_logs_access_code_id", "access_logs", ["access_code_id"])
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_partitioned")
+    op.execute("ALTER INDEX access_logs_pkey RENAME TO access_logs_partitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_access_logs_access_code_id")
+    op.execute(
+        """
+        CREATE TABLE access_logs (
+            id integer PRIMARY KEY DEFAULT nextval('access_logs_id_seq'),
+            access_code_id integer REFERENCES access_codes (id) ON DELETE CASCADE,
+            command varchar NOT NULL,
+            response_status varchar NOT NULL,
+            response_message varchar,
+            accessed_at timestamp without time zone
+        )
+        """
+    )
+    op.execute(
+        f"INSERT INTO access_logs ({COLUMNS}) "
+        f"SELECT id, CASE WHEN access_code_id IN (SELECT id FROM access_codes) "
+        f"THEN access_code_id END, command, response_status, response_message, "
+        f"accessed_at FROM access_logs_partitioned"
+    )
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+    op.drop_table("access_logs_partitioned")
+    op.create_index("ix_access_logs_id", "access_logs", ["id"])
+    op.create_index("ix_access_logs_access_code_id", "access_logs", ["access_code_id"])
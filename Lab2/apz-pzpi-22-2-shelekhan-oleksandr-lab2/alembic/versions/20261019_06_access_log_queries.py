@@ -0,0 +1,82 @@
+"""Access log property, time-range indexes and hourly rollups
+
+Revision ID: 2a6d4f8b1e93
+Revises: 9e3c7a1f2b48
+Create Date: 2026-10-19 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "2a6d4f8b1e93"
+down_revision = "9e3c7a1f2b48"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Like access_code_id without a foreign key, entries are written in batches
+    op.add_column("access_logs", sa.Column("property_id", sa.Integer(), nullable=True))
+    op.add_column("access_logs", sa.Column("device_id", sa.String(), nullable=True))
+    # Existing entries get the property and lock of their access code's booking
+    op.execute(
+        """
+        UPDATE access_logs l
+        SET property_id = p.id, device_id = nullif(split_part(p.lock_id, ':', 1), '')
+        FROM access_codes c
+        JOIN bookings b ON b.id = c.booking_id
+        JOIN properties p ON p.id = b.property_id
+        WHERE c.id = l.access_code_id
+        """
+    )
+
+    # Indexes on a partitioned table cannot be built CONCURRENTLY
+    op.drop_index("ix_access_logs_access_code_id", table_name="access_logs")
+    op.create_index(
+        "ix_access_logs_access_code_id_accessed_at",
+        "access_logs",
+        ["access_code_id", "accessed_at"],
+    )
+    op.create_index(
+        "ix_access_logs_property_id_accessed_at",
+        "access_logs",
+        ["property_id", "accessed_at"],
+    )
+    op.create_index(
+        "ix_access_logs_accessed_at_brin",
+        "access_logs",
+        ["accessed_at"],
+        postgresql_using="brin",
+    )
+
+    op.create_table(
+        "access_log_rollups",
+        sa.Column("property_id", sa.Integer(), nullable=False),
+        sa.Column("hour", sa.DateTime(), nullable=False),
+        sa.Column("command", sa.String(), nullable=False),
+        sa.Column("response_status", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["property_id"], ["properties.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("property_id", "hour", "command", "response_status"),
+    )
+    op.execute(
+        """
+        INSERT INTO access_log_rollups (property_id, hour, command, response_status, count)
+        SELECT l.property_id, date_trunc('hour', l.accessed_at), l.command, l.response_status, count(*)
+        FROM access_logs l
+        JOIN properties p ON p.id = l.property_id
+        GROUP BY l.property_id, date_trunc('hour', l.accessed_at), l.command, l.response_status
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("access_log_rollups")
+    op.drop_index("ix_access_logs_accessed_at_brin", table_name="access_logs")
+    op.drop_index("ix_access_logs_property_id_accessed_at", table_name="access_logs")
+    op.drop_index("ix_access_logs_access_code_id_accessed_at", table_name="access_logs")
+    op.create_index("ix_access_logs_access_code_id", "access_logs", ["access_code_id"])
+    op.drop_column("access_logs", "device_id")
+    op.drop_column("access_logs", "property_id")
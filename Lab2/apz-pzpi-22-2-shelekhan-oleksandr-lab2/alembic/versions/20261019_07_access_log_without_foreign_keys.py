@@ -0,0 +1,41 @@
+"""Keep access logs of deleted access codes and properties
+
+Revision ID: 7c1e5b9d3f26
+Revises: 2a6d4f8b1e93
+Create Date: 2026-10-19 15:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "7c1e5b9d3f26"
+down_revision = "2a6d4f8b1e93"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Revisions 05 and 06 no longer create foreign keys on access_logs: a
+    # buffered entry may name a code deleted before it is flushed, and the
+    # audit trail has to outlive a revoked code. Databases migrated with their
+    # earlier version still have them; names differ between databases.
+    op.execute(
+        """
+        DO $$
+        DECLARE constraint_name text;
+        BEGIN
+            FOR constraint_name IN
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = 'access_logs'::regclass AND contype = 'f'
+            LOOP
+                EXECUTE format('ALTER TABLE access_logs DROP CONSTRAINT %I', constraint_name);
+            END LOOP;
+        END $$
+        """
+    )
+
+
+def downgrade() -> None:
+    # Revision 06 creates access_logs without foreign keys
+    pass
@@ -0,0 +1,32 @@
+"""Revocations of offline-verifiable access codes
+
+Revision ID: 4d8a2c6e0b71
+Revises: 7c1e5b9d3f26
+Create Date: 2026-10-19 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4d8a2c6e0b71"
+down_revision = "7c1e5b9d3f26"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "access_code_revocations",
+        sa.Column("property_id", sa.Integer(), nullable=False),
+        sa.Column("serial", sa.BigInteger(), nullable=False),
+        sa.Column("valid_until", sa.DateTime(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["property_id"], ["properties.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("property_id", "serial"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("access_code_revocations")
@@ -0,0 +1,141 @@
+"""Redis mirror of the access codes, so a door check needs no database.
+
+Each booking's code is stored under ``access_code:<booking_id>`` together with
+the guest and owner allowed to check it, and expires when the code does
+(``valid_until``). Entries are written and removed once the transaction that
+created or deleted the code commits. A removed code leaves a ``revoked``
+marker behind, so a validation that read the database just before the delete
+cannot put the code back; the same marker remembers bookings without a valid
+code. A miss, or Redis being unavailable, falls back to the database.
+"""
+import asyncio
+import hmac
+import json
+from datetime import datetime, timezone
+from typing import Iterable
+from loguru import logger
+from app.core.config import settings
+from app.core.database import on_commit, on_rollback
+from app.core.redis import redis_client
+from app.offline_codes import normalize_code
+
+KEY = "access_code:{}"
+REVOKED = "revoked"
+
+# Writes scheduled from after-commit callbacks, referenced until they finish
+_pending = set()
+
+
+def make_entry(access_code, user_id: int, owner_id: int) -> dict:
+    return {
+        "id": access_code.id,
+        "booking_id": access_code.booking_id,
+        "code": access_code.code,
+        "valid_from": access_code.valid_from.isoformat(),
+        "valid_until": access_code.valid_until.isoformat(),
+        "user_id": user_id,
+        "owner_id": owner_id,
+    }
+
+
+def matches(entry: dict, code: str, now: datetime = None) -> bool:
+    """Whether ``code`` is the entry's code and valid now (UTC), with the
+    same rules as a lock checking it offline (``offline_codes.verify_code``)."""
+    now = now or datetime.utcnow()
+    # Constant time, the comparison must not tell how much of a guess was right
+    expected = normalize_code(entry["code"]).encode()
+    if not hmac.compare_digest(expected, normalize_code(code).encode()):
+        return False
+    valid_from = datetime.fromisoformat(entry["valid_from"])
+    valid_until = datetime.fromisoformat(entry["valid_until"])
+    return valid_from <= now < valid_until
+
+
+async def lookup(booking_id: int):
+    """The cached entry of a booking, ``REVOKED`` if it has no valid code, or
+    ``None`` if Redis does not know (or cannot be reached)."""
+    try:
+        value = await redis_client.get(KEY.format(booking_id))
+    except Exception as e:
+        logger.warning(f"Access code cache lookup failed, using the database: {e}")
+        return None
+    if value is None or value == REVOKED:
+        return value
+    return json.loads(value)
+
+
+async def store(entry: dict, only_if_missing: bool = False):
+    """Cache an entry until its code expires; ``only_if_missing`` never
+    replaces a newer entry or a revocation."""
+    valid_until = datetime.fromisoformat(entry["valid_until"])
+    expires_at = int(valid_until.replace(tzinfo=timezone.utc).timestamp())
+    key = KEY.format(entry["booking_id"])
+    if expires_at <= datetime.now(timezone.utc).timestamp():
+        await mark_revoked([key], only_if_missing)
+        return
+    await redis_client.set(key, json.dumps(entry), exat=expires_at, nx=only_if_missing)
+
+
+async def mark_revoked(keys: Iterable[str], only_if_missing: bool = False):
+    async with redis_client.pipeline(transaction=False) as pipeline:
+        for key in keys:
+            pipeline.set(
+                key, REVOKED, ex=settings.ACCESS_CODE_REVOKED_TTL_SECONDS, nx=only_if_missing
+            )
+        await pipeline.execute()
+
+
+async def revoke(booking_ids: Iterable[int]):
+    """Drop the cached codes of bookings, leaving revocation markers."""
+    keys = [KEY.format(booking_id) for booking_id in booking_ids]
+    if keys:
+        await mark_revoked(keys)
+
+
+async def forget(booking_ids: Iterable[int]):
+    """Drop whatever is cached for bookings, the next check reads the database."""
+    keys = [KEY.format(booking_id) for booking_id in booking_ids]
+    if keys:
+        await redis_client.delete(*keys)
+
+
+def spawn(coroutine, description: str):
+    """Run a side effect from an after-commit (or rollback) callback in the
+    background, logging instead of raising when it fails."""
+
+    async def run():
+        try:
+            await coroutine
+        except Exception as e:
+            logger.error(f"Failed to {description}: {e}")
+
+    task = asyncio.get_running_loop().create_task(run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def store_on_commit(session, access_code, user_id: int, owner_id: int):
+    """Cache a new code once the session commits (the id is known by then)."""
+
+    def store_code():
+        spawn(
+            store(make_entry(access_code, user_id, owner_id)),
+            f"cache the access code of booking {access_code.booking_id}",
+        )
+
+    on_commit(session, store_code)
+
+
+def revoke_on_commit(session, booking_ids: Iterable[int]):
+    """Revoke cached codes again once the delete commits, after any
+    validation that still saw the old rows. If the delete rolls back, the
+    markers written ahead of it are removed so the codes work again."""
+    booking_ids = list(booking_ids)
+    on_commit(
+        session,
+        lambda: spawn(revoke(booking_ids), f"revoke access codes of bookings {booking_ids}"),
+    )
+    on_rollback(
+        session,
+        lambda: spawn(forget(booking_ids), f"restore access codes of bookings {booking_ids}"),
+    )
@@ -0,0 +1,28 @@
+"""Hourly access log counts per property, maintained incrementally.
+
+A periodic task recounts the hours touched since a point in time and upserts
+them into ``access_log_rollups``; only the recent partitions are scanned.
+Queries for hours or days read the rollups, never ``access_logs``.
+"""
+from datetime import datetime
+from sqlalchemy import text
+
+ROLLUP_ACCESS_LOGS = text(
+    """
+    INSERT INTO access_log_rollups (property_id, hour, command, response_status, count)
+    SELECT l.property_id, date_trunc('hour', l.accessed_at), l.command, l.response_status, count(*)
+    FROM access_logs l
+    -- Entries of deleted properties are kept, but not counted
+    JOIN properties p ON p.id = l.property_id
+    WHERE l.accessed_at >= date_trunc('hour', CAST(:since AS timestamp))
+    GROUP BY l.property_id, date_trunc('hour', l.accessed_at), l.command, l.response_status
+    ON CONFLICT (property_id, hour, command, response_status) DO UPDATE
+    SET count = excluded.count
+    """
+)
+
+
+def roll_up_access_logs(connection, since: datetime):
+    """Recount every hour from the one containing ``since`` (synchronous
+    connection); pass ``datetime.min`` to rebuild everything."""
+    connection.execute(ROLLUP_ACCESS_LOGS, {"since": since})
@@ -0,0 +1,224 @@
+"""Batched, append-only writer for ``access_logs``.
+
+Lock commands are logged outside the request's transaction: entries are
+queued and a background task writes them with one COPY per batch, so opening
+a door does not wait for an audit INSERT and its commit, and a command that
+reached the lock is logged even if the request fails afterwards.
+
+``ACCESS_LOG_BUFFER=memory`` queues in this process, entries not flushed yet
+are lost if it dies; once ``ACCESS_LOG_MAX_BUFFER`` entries are waiting (the
+database is down or behind) new ones are dropped and counted, a door command
+never waits for the database. ``redis`` queues in a Redis list that outlives the
+process and is drained by the flusher of any worker. Security events (denied
+codes, commands that failed) are written with ``durable=True``: COPY and
+commit before ``write`` returns. ``ACCESS_LOG_SYNC`` makes every entry durable.
+
+A batch the database rejects (bad data, a constraint) would fail again on
+every retry; it is written row by row instead and the rows that still fail
+are set aside (logged, and kept under ``access_logs:rejected`` with Redis).
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from asyncpg.exceptions import DataError, IntegrityConstraintViolationError
+from loguru import logger
+from app.core.config import settings
+from app.core.database import engine
+from app.core.metrics import ACCESS_LOG_ENTRIES, ACCESS_LOG_FLUSH_DURATION
+from app.core.redis import redis_client
+
+COLUMNS = (
+    "access_code_id",
+    "property_id",
+    "device_id",
+    "command",
+    "response_status",
+    "response_message",
+    "accessed_at",
+)
+QUEUE_KEY = "access_logs:queue"
+REJECTED_KEY = "access_logs:rejected"
+# Errors that retrying the same rows cannot fix
+REJECTED_ERRORS = (DataError, IntegrityConstraintViolationError)
+
+
+def encode(record) -> str:
+    *values, accessed_at = record
+    return json.dumps([*values, accessed_at.isoformat()])
+
+
+def decode(item: str):
+    *values, accessed_at = json.loads(item)
+    return (*values, datetime.fromisoformat(accessed_at))
+
+
+class AccessLogWriter:
+    def __init__(self, buffer: str, batch_size: int, flush_interval: float, max_buffer: int):
+        if buffer not in ("memory", "redis"):
+            raise ValueError(f"Unknown access log buffer {buffer!r}")
+        self.buffer = buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.pending = []
+        # Entries dropped on a full buffer since the last successful flush
+        self.dropped = 0
+        self.flush_lock = asyncio.Lock()
+        self.wake = asyncio.Event()
+        self.task = None
+
+    async def copy(self, records):
+        started = time.perf_counter()
+        async with engine.connect() as connection:
+            raw = await connection.get_raw_connection()
+            # COPY runs outside a transaction block, it commits as one statement
+            await raw.driver_connection.copy_records_to_table(
+                "access_logs", records=records, columns=COLUMNS
+            )
+        ACCESS_LOG_FLUSH_DURATION.observe(time.perf_counter() - started)
+
+    async def copy_batch(self, records: list):
+        """COPY a queued batch; rows the database rejects are set aside
+        instead of failing the batch again and again.
+
+        ``records`` is emptied as rows are written or set aside, what is left
+        when this raises still has to be written.
+        """
+        try:
+            await self.copy(records)
+        except REJECTED_ERRORS as e:
+            logger.warning(f"Access log batch rejected ({e}), writing it row by row")
+        else:
+            ACCESS_LOG_ENTRIES.labels("buffered").inc(len(records))
+            records.clear()
+            return
+        rejected = []
+        while records:
+            try:
+                await self.copy(records[:1])
+            except REJECTED_ERRORS as e:
+                logger.error(f"Access log entry set aside: {records[0]!r}: {e}")
+                rejected.append(records[0])
+            else:
+                ACCESS_LOG_ENTRIES.labels("buffered").inc()
+            del records[0]
+        if rejected:
+            ACCESS_LOG_ENTRIES.labels("rejected").inc(len(rejected))
+            if self.buffer == "redis":
+                await redis_client.rpush(REJECTED_KEY, *map(encode, rejected))
+
+    async def write(
+        self,
+        command: str,
+        response_status: str,
+        response_message: str = None,
+        access_code_id: int = None,
+        property_id: int = None,
+        device_id: str = None,
+        durable: bool = False,
+    ):
+        """Log a lock command; ``durable`` entries are committed on return."""
+        record = (
+            access_code_id,
+            property_id,
+            device_id,
+            command,
+            response_status,
+            response_message,
+            datetime.utcnow(),
+        )
+        if durable or settings.ACCESS_LOG_SYNC:
+            await self.copy([record])
+            ACCESS_LOG_ENTRIES.labels("durable").inc()
+            return
+        if self.buffer == "redis":
+            await redis_client.rpush(QUEUE_KEY, encode(record))
+            return
+        if len(self.pending) >= self.max_buffer:
+            if not self.dropped:
+                logger.error(
+                    f"Access log buffer full ({self.max_buffer} entries), dropping new entries"
+                )
+            self.dropped += 1
+            ACCESS_LOG_ENTRIES.labels("dropped").inc()
+            self.wake.set()
+            return
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.wake.set()
+
+    async def flush(self):
+        """Write everything queued so far, one COPY per batch."""
+        async with self.flush_lock:
+            if self.buffer == "redis":
+                await self._flush_redis()
+            else:
+                await self._flush_memory()
+
+    async def _flush_memory(self):
+        while self.pending:
+            batch = self.pending[: self.batch_size]
+            del self.pending[: len(batch)]
+            try:
+                await self.copy_batch(batch)
+            except BaseException:
+                # Back in front, in order, for the next attempt (also when cancelled)
+                self.pending[:0] = batch
+                raise
+            if self.dropped:
+                logger.warning(f"Access log buffer drained, {self.dropped} entries were dropped")
+                self.dropped = 0
+
+    async def _flush_redis(self):
+        while True:
+            items = await redis_client.lpop(QUEUE_KEY, self.batch_size)
+            if not items:
+                return
+            records = [decode(item) for item in items]
+            try:
+                await self.copy_batch(records)
+            except BaseException:
+                unwritten = items[len(items) - len(records) :]
+                if unwritten:
+                    await redis_client.lpush(QUEUE_KEY, *reversed(unwritten))
+                raise
+            if len(items) < self.batch_size:
+                return
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Access log flush failed, retrying: {e}")
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the background flushes and write what is still queued."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final access log flush failed, {len(self.pending)} entries lost: {e}")
+
+
+access_log_writer = AccessLogWriter(
+    settings.ACCESS_LOG_BUFFER,
+    settings.ACCESS_LOG_BATCH_SIZE,
+    settings.ACCESS_LOG_FLUSH_INTERVAL,
+    settings.ACCESS_LOG_MAX_BUFFER,
+)
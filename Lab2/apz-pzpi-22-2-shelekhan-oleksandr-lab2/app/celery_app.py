@@ -1,6 +1,7 @@
 from celery import Celery
 import os
 from app.core.config import settings
+from app.core.metrics import instrument_celery
 from celery.schedules import crontab
 
 celery_app = Celery(
@@ -18,11 +19,32 @@ celery_app.conf.update(
     timezone="UTC",
 )
 
+instrument_celery(settings.CELERY_METRICS_PORT)
 
-# # Add periodic task schedule
-# celery_app.conf.beat_schedule = {
-#     "check-temperature-every-3-minutes": {
-#         "task": "check_temperature_task",
-#         "schedule": crontab(minute="*/3"),  # Run every 3 minutes
-#     },
-# }
+
+celery_app.conf.beat_schedule = {
+    # "check-temperature-every-3-minutes": {
+    #     "task": "check_temperature_task",
+    #     "schedule": crontab(minute="*/3"),  # Run every 3 minutes
+    # },
+    "roll-up-temperatures-every-minute": {
+        "task": "roll_up_temperatures",
+        "schedule": crontab(),
+    },
+    "create-temperature-partitions-daily": {
+        "task": "create_temperature_partitions",
+        "schedule": crontab(minute=0, hour=3),
+    },
+    "roll-up-access-logs-every-5-minutes": {
+        "task": "roll_up_access_logs",
+        "schedule": crontab(minute="*/5"),
+    },
+    "push-access-code-revocations-every-15-minutes": {
+        "task": "push_access_code_revocations",
+        "schedule": crontab(minute="*/15"),
+    },
+    "maintain-access-log-partitions-daily": {
+        "task": "maintain_access_log_partitions",
+        "schedule": crontab(minute=10, hour=3),
+    },
+}
@@ -1,3 +1,4 @@
+from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic_core import MultiHostUrl
 from pydantic import (
@@ -30,6 +31,48 @@ class Settings(BaseSettings):
             port=self.POSTGRES_PORT,
             path=self.POSTGRES_DB
         )
+
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    # Seconds to wait for a free connection before failing the checkout
+    DB_POOL_TIMEOUT: float = 30
+    # Seconds after which a connection is replaced, -1 keeps connections forever
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # Prepared statements kept per connection, SQLAlchemy's asyncpg default is 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500
+    # Transaction pooling (PgBouncer) cannot keep prepared statements per connection
+    DB_PGBOUNCER: bool = False
+    # Each prefork Celery process runs one task at a time
+    CELERY_DB_POOL_SIZE: int = 2
+    CELERY_DB_MAX_OVERFLOW: int = 2
+
+    # Comma separated "host[:port]" list of streaming replicas, same credentials
+    POSTGRES_REPLICA_SERVERS: str = ""
+    # Seconds a user's reads stay on the primary after they wrote
+    READ_YOUR_WRITES_SECONDS: int = 10
+    # Seconds a deleted or missing access code stays known as such in Redis
+    ACCESS_CODE_REVOKED_TTL_SECONDS: int = 3600
+    # Issue codes locks verify offline (app.offline_codes), random ones otherwise
+    ACCESS_CODE_SIGNED: bool = True
+
+    @computed_field
+    @property
+    def SQLALCHEMY_REPLICA_URLS(self) -> List[PostgresDsn]:
+        urls = []
+        for server in filter(None, map(str.strip, self.POSTGRES_REPLICA_SERVERS.split(","))):
+            host, _, port = server.partition(":")
+            urls.append(
+                MultiHostUrl.build(
+                    scheme="postgresql+asyncpg",
+                    username=self.POSTGRES_USER,
+                    password=self.POSTGRES_PASSWORD,
+                    host=host,
+                    port=int(port) if port else self.POSTGRES_PORT,
+                    path=self.POSTGRES_DB,
+                )
+            )
+        return urls
     
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
@@ -47,12 +90,90 @@ class Settings(BaseSettings):
 
     BROKER_URL: str
     RESULT_BACKEND: str
+    REDIS_URL: str = "redis://redis:6379/0"
+    # Port of the Prometheus endpoint of Celery workers, 0 disables it
+    CELERY_METRICS_PORT: int = 9808
 
     IOTHUB_HOST: str
     REGISTRY_SHARED_ACCESS_KEY_NAME: str
     REGISTRY_SHARED_ACCESS_KEY: str
+    # Seconds a lock gets to answer a command, and commands in flight per process
+    IOTHUB_COMMAND_TIMEOUT: int = 10
+    IOTHUB_MAX_WORKERS: int = 8
+    # Locks per Celery subtask of the temperature sweep, and locks in flight per subtask
+    TEMPERATURE_SWEEP_CHUNK_SIZE: int = 50
+    TEMPERATURE_SWEEP_CONCURRENCY: int = 16
+    # Answer lock commands locally instead of calling IoT Hub (load tests)
+    IOTHUB_STUB: bool = False
+    IOTHUB_STUB_LATENCY: float = 0.05
+
+    # Temperature telemetry: monthly partitions created ahead, minutes of
+    # readings re-aggregated on each rollup, and the anomaly detector defaults
+    TELEMETRY_PARTITION_MONTHS_AHEAD: int = 3
+    TELEMETRY_ROLLUP_LOOKBACK_MINUTES: int = 5
+    TELEMETRY_ANOMALY_METHOD: str = "zscore"
+    TELEMETRY_ANOMALY_WINDOW: int = 60
+    TELEMETRY_ANOMALY_THRESHOLD: float = 3.0
+    # Hours of readings scored by the sweep to decide whether to alert
+    TELEMETRY_ANOMALY_LOOKBACK_HOURS: int = 24
+    # Access logs are queued and written in batches, in this process ("memory")
+    # or in a Redis list that survives a crash ("redis"); security events, or
+    # every entry with ACCESS_LOG_SYNC, are committed before the request returns
+    ACCESS_LOG_BUFFER: str = "memory"
+    ACCESS_LOG_BATCH_SIZE: int = 500
+    ACCESS_LOG_FLUSH_INTERVAL: float = 1.0
+    # Entries queued in memory at most, new ones are dropped beyond it
+    ACCESS_LOG_MAX_BUFFER: int = 10000
+    ACCESS_LOG_SYNC: bool = False
+    # Monthly partitions created ahead, and months kept (0 keeps everything)
+    ACCESS_LOG_PARTITION_MONTHS_AHEAD: int = 3
+    ACCESS_LOG_RETENTION_MONTHS: int = 0
+    # Hours recounted by every rollup run, covers entries flushed or delivered late
+    ACCESS_LOG_ROLLUP_LOOKBACK_HOURS: int = 2
+
+    # Notifications written after the response (app.notification_queue)
+    NOTIFICATION_BATCH_SIZE: int = 500
+    NOTIFICATION_QUEUE_SIZE: int = 10000
+
+    # "poll" asks every lock from check_temperature_task, "mqtt" leaves
+    # readings to the ingest worker (python -m app.mqtt_ingest)
+    TEMPERATURE_SOURCE: str = "poll"
+
+    # MQTT ingest worker: devices publish Fernet-encrypted JSON to
+    # "<prefix>/<device_id>/telemetry" and "<prefix>/<device_id>/events"
+    MQTT_HOST: str = "mosquitto"
+    MQTT_PORT: int = 1883
+    MQTT_USERNAME: str = ""
+    MQTT_PASSWORD: str = ""
+    MQTT_TOPIC_PREFIX: str = "locks"
+    MQTT_CLIENT_ID: str = "smart-booking-ingest"
+    # Workers in the same group share the subscription, empty disables it
+    MQTT_SHARE_GROUP: str = "ingest"
+    # A batch is written when it has this many rows or is this many seconds old
+    MQTT_BATCH_SIZE: int = 500
+    MQTT_BATCH_INTERVAL: float = 1.0
+    # Seconds between reloads of the device list, and between two alerts per lock
+    MQTT_DEVICE_REFRESH_SECONDS: int = 60
+    MQTT_ALERT_COOLDOWN_SECONDS: int = 900
+    MQTT_METRICS_PORT: int = 9809
+    # Device timestamps accepted ahead of and behind the server clock, others
+    # are dropped (a bad lock clock would fill months without partitions)
+    MQTT_MAX_CLOCK_SKEW_SECONDS: int = 300
+    MQTT_MAX_MESSAGE_AGE_SECONDS: int = 7 * 24 * 3600
     
     REACT_APP_API_URL: str
 
+    SEARCH_INDEX_REFRESH_SECONDS: int = 300
+
+    # On-demand request profiles (X-Profile header, admins only)
+    PROFILE_DIR: str = "profiles"
+    PROFILE_INTERVAL: float = 0.001
+    PROFILE_KEEP: int = 50
+
+    # Event loop watchdog, stalls longer than the threshold are logged with
+    # their stack; a threshold of 0 disables it
+    LOOP_MONITOR_INTERVAL: float = 0.05
+    LOOP_BLOCK_THRESHOLD: float = 0.1
+
 
 settings = Settings()
@@ -1,28 +1,196 @@
+import random
+from uuid import uuid4
+from contextlib import asynccontextmanager
 from app.core.config import settings
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from typing import AsyncGenerator
-from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from typing import AsyncGenerator, Optional
+from loguru import logger
+from fastapi import HTTPException, Request
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
+from app.core.instrumentation import InstrumentedAsyncPool, instrument_engine
+from app.core.redis import redis_client
+from app.core.security import decode_access_token
 
-engine = create_async_engine(
-    str(settings.SQLALCHEMY_DATABASE_URL),
-    pool_size=10,
-    max_overflow=20,
-    future=True,
+
+def pgbouncer_connect_args() -> dict:
+    """asyncpg arguments for PgBouncer in transaction pooling mode.
+
+    Consecutive transactions may run on different server connections, so no
+    prepared statement may outlive its transaction: disable both statement
+    caches and give every statement a unique name.
+    """
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+
+def create_db_engine(url, database: str = "primary") -> AsyncEngine:
+    engine = create_async_engine(
+        str(url),
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=(
+            pgbouncer_connect_args()
+            if settings.DB_PGBOUNCER
+            else {"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE}
+        ),
+        future=True,
+    )
+    instrument_engine(engine, database)
+    return engine
+
+
+engine = create_db_engine(settings.SQLALCHEMY_DATABASE_URL)
+replica_engines = [
+    create_db_engine(url, "replica") for url in settings.SQLALCHEMY_REPLICA_URLS
+]
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of read-only units of work to a replica.
+
+    A session opts in with ``session.info["read_only"] = True``. Flushes, DML and
+    ``SELECT ... FOR UPDATE`` always go to the primary, and once a session has
+    written it keeps reading from the primary, so a read-only session that ends
+    up writing stays correct and only loses the offload.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+            return engine.sync_engine
+        if (
+            not self.info.get("read_only")
+            or not replica_engines
+            or self.info.get("wrote")
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            return engine.sync_engine
+        # Stay on one replica for the whole session so reads are consistent
+        if "replica" not in self.info:
+            self.info["replica"] = random.choice(replica_engines)
+        return self.info["replica"].sync_engine
+
+
+async_session = sessionmaker(
+    engine,
+    expire_on_commit=False,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
 )
 
-async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+def read_only_session() -> AsyncSession:
+    """Open a session whose reads are served by a replica when one is configured."""
+    session = async_session()
+    session.info["read_only"] = True
+    return session
+
 
 Base = declarative_base()
 
 
-async def get_db() -> AsyncGenerator:
+def on_commit(session, callback):
+    """Run ``callback`` once the session's current transaction commits.
+
+    CRUD functions only flush; the request commits once in ``get_db``. Side
+    effects outside the database (in-memory indexes, caches) are registered
+    here so they never run for a transaction that is rolled back.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+def on_rollback(session, callback):
+    """Run ``callback`` if the session's current transaction ends without
+    committing (rolled back or closed), to undo a side effect made ahead of
+    the commit."""
+    session.info.setdefault("after_rollback", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session):
+    if not session.in_nested_transaction():
+        session.info.pop("after_rollback", None)
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception as e:
+            # The data is committed already, a failed side effect must not turn into a 500
+            logger.error(f"After-commit callback {callback!r} failed: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(session):
+    session.info.pop("after_commit", None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _run_after_rollback(session, transaction):
+    # Still registered once the outermost transaction ends: it did not commit
+    if transaction.parent is not None:
+        return
+    for callback in session.info.pop("after_rollback", []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"After-rollback callback {callback!r} failed: {e}")
+
+
+def _writer_key(request: Request) -> Optional[str]:
+    """Identify the caller for read-your-writes, the user id from the bearer token."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        user_id = decode_access_token(token).get("sub")
+    except HTTPException:
+        return None
+    return f"read-your-writes:{user_id}" if user_id else None
+
+
+async def _recently_wrote(writer_key: Optional[str]) -> bool:
+    if writer_key is None:
+        return False
+    try:
+        return bool(await redis_client.exists(writer_key))
+    except Exception as e:
+        # Without the marker we cannot tell, the primary is always up to date
+        logger.warning(f"Read-your-writes lookup failed, reading from primary: {e}")
+        return True
+
+
+async def _remember_write(writer_key: Optional[str]):
+    if writer_key is None:
+        return
+    try:
+        await redis_client.set(writer_key, 1, ex=settings.READ_YOUR_WRITES_SECONDS)
+    except Exception as e:
+        logger.warning(f"Failed to record write for read-your-writes: {e}")
+
+
+@asynccontextmanager
+async def _request_session(request: Request, read_only: bool) -> AsyncGenerator:
     async with async_session() as session:
+        writer_key = _writer_key(request) if replica_engines else None
+        # A user who just wrote reads from the primary until replicas caught up
+        session.info["read_only"] = read_only and not await _recently_wrote(writer_key)
         try:
             yield session
             await session.commit()
+            if session.info.get("wrote"):
+                await _remember_write(writer_key)
         except SQLAlchemyError as sql_ex:
             await session.rollback()
             raise sql_ex
@@ -30,4 +198,16 @@ async def get_db() -> AsyncGenerator:
             await session.rollback()
             raise http_ex
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+async def get_db(request: Request) -> AsyncGenerator:
+    """Request session; GET requests read from a replica when one is configured."""
+    async with _request_session(request, request.method in READ_METHODS) as session:
+        yield session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator:
+    """Request session for read-only endpoints that are not GET, e.g. POST searches."""
+    async with _request_session(request, True) as session:
+        yield session
@@ -0,0 +1,240 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+from loguru import logger
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.datastructures import MutableHeaders
+from app.core.metrics import (
+    DB_COMMITS,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_TIMEOUTS,
+    DB_QUERY_DURATION,
+)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+QUERY_BUDGET_HEADER = "X-DB-Query-Budget"
+COMMIT_COUNT_HEADER = "X-DB-Commit-Count"
+
+
+@dataclass
+class QueryStats:
+    """Queries, commits and time spent in the database for one unit of work."""
+
+    count: int = 0
+    duration: float = 0.0
+    commits: int = 0
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def instrument_engine(engine, database: str = "primary"):
+    """Count every statement executed on the engine into the active ``QueryStats``.
+
+    Statements, commits and pool checkouts are also exported to Prometheus
+    labelled with ``database``.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    sync_engine.pool.database = database
+    query_duration = DB_QUERY_DURATION.labels(database)
+    commits = DB_COMMITS.labels(database)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        query_duration.observe(duration)
+        stats = _query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.duration += duration
+
+    @event.listens_for(sync_engine, "commit")
+    def commit(conn):
+        # Every commit is a round-trip and a WAL flush on the server
+        commits.inc()
+        stats = _query_stats.get()
+        if stats is not None:
+            stats.commits += 1
+
+
+def query_budget(max_queries: int):
+    """Declare the maximum number of queries a route may execute.
+
+    Apply below the router decorator::
+
+        @router.get("/")
+        @query_budget(2)
+        async def read_items(...): ...
+    """
+
+    def decorator(endpoint):
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+
+    return decorator
+
+
+def get_query_budget(endpoint) -> Optional[int]:
+    return getattr(endpoint, "__query_budget__", None)
+
+
+@contextmanager
+def count_queries():
+    """Collect query stats for the enclosed block, e.g. in tests or scripts."""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def assert_query_budget(response, max_queries: Optional[int] = None):
+    """Fail when a response reports more queries than its route budget.
+
+    ``max_queries`` overrides the budget declared on the route. Works with any
+    response object exposing ``headers`` (TestClient, httpx).
+    """
+    count = int(response.headers[QUERY_COUNT_HEADER])
+    budget = max_queries
+    if budget is None and QUERY_BUDGET_HEADER in response.headers:
+        budget = int(response.headers[QUERY_BUDGET_HEADER])
+    if budget is None:
+        raise AssertionError("No query budget declared for this route")
+    if count > budget:
+        raise AssertionError(
+            f"Route executed {count} queries, budget is {budget} "
+            f"({response.headers.get(QUERY_TIME_HEADER)} ms in the database)"
+        )
+
+
+class QueryStatsMiddleware:
+    """Report per-request query count, commits and database time as response headers.
+
+    Requests going over the route's ``query_budget`` are logged as warnings.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[QUERY_COUNT_HEADER] = str(stats.count)
+                headers[QUERY_TIME_HEADER] = f"{stats.duration * 1000:.2f}"
+                headers[COMMIT_COUNT_HEADER] = str(stats.commits)
+                budget = get_query_budget(scope.get("endpoint"))
+                if budget is not None:
+                    headers[QUERY_BUDGET_HEADER] = str(budget)
+                    if stats.count > budget:
+                        route = scope.get("route")
+                        logger.warning(
+                            f"{scope['method']} {getattr(route, 'path', scope['path'])} "
+                            f"executed {stats.count} queries, budget is {budget}"
+                        )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _query_stats.reset(token)
+
+
+# Upper bounds in seconds, the last bucket catches everything slower
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+@dataclass
+class PoolStats:
+    """Connection checkouts of one pool, with a cumulative wait time histogram."""
+
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_sum: float = 0.0
+    wait_max: float = 0.0
+    wait_buckets: list = field(default_factory=lambda: [0] * len(POOL_WAIT_BUCKETS))
+
+    def observe(self, wait: float):
+        self.checkouts += 1
+        self.wait_sum += wait
+        self.wait_max = max(self.wait_max, wait)
+        for i, bound in enumerate(POOL_WAIT_BUCKETS):
+            if wait <= bound:
+                self.wait_buckets[i] += 1
+
+
+class _InstrumentedPoolMixin:
+    database = "primary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool, keep exporting under the same label
+        pool = super().recreate()
+        pool.database = self.database
+        return pool
+
+    def _do_get(self):
+        # Includes opening a new connection when the pool may still grow
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            DB_POOL_TIMEOUTS.labels(self.database).inc()
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            self.stats.observe(wait)
+            DB_POOL_CHECKOUT_WAIT.labels(self.database).observe(wait)
+
+
+class InstrumentedPool(_InstrumentedPoolMixin, QueuePool):
+    """``QueuePool`` recording checkout waits and timeouts in ``stats``."""
+
+
+class InstrumentedAsyncPool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` recording checkout waits and timeouts in ``stats``."""
+
+
+def pool_status(engine) -> dict:
+    """Current occupancy and checkout stats of an engine's pool."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Negative while the pool has not opened pool_size connections yet
+        "overflow": max(pool.overflow(), 0),
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(
+            checkouts=stats.checkouts,
+            timeouts=stats.timeouts,
+            wait_seconds_sum=stats.wait_sum,
+            wait_seconds_max=stats.wait_max,
+            wait_seconds_buckets={
+                "+Inf" if bound == float("inf") else str(bound): count
+                for bound, count in zip(POOL_WAIT_BUCKETS, stats.wait_buckets)
+            },
+        )
+    return status
@@ -0,0 +1,115 @@
+"""Detect callbacks that block the event loop.
+
+A heartbeat task wakes up every ``LOOP_MONITOR_INTERVAL`` seconds and records
+how late it was (the loop lag). A watchdog thread checks the heartbeat; when it
+has not run for ``LOOP_BLOCK_THRESHOLD`` seconds the loop is stuck in a single
+callback, so the watchdog grabs the loop thread's stack while it is still inside
+the offending code, together with the route of the request the running task
+serves. Once the loop gets going again the stall is logged with its duration
+and counted in ``event_loop_blocks_total``.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from typing import Optional
+from loguru import logger
+from app.core.metrics import EVENT_LOOP_BLOCKS, EVENT_LOOP_LAG, UNMATCHED_ROUTE
+
+STACK_LIMIT = 40
+NO_REQUEST = "<background>"
+
+# Scope of the request each task serves, the route is matched after the task starts
+_task_scopes = weakref.WeakKeyDictionary()
+
+
+class LoopMonitorMiddleware:
+    """Remember which request the current task serves, for the watchdog."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        task = asyncio.current_task()
+        if scope["type"] != "http" or task is None:
+            await self.app(scope, receive, send)
+            return
+        _task_scopes[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _task_scopes.pop(task, None)
+
+
+def _describe_task(task: Optional[asyncio.Task]) -> str:
+    scope = _task_scopes.get(task) if task is not None else None
+    if scope is None:
+        return NO_REQUEST
+    return f"{scope['method']} {getattr(scope.get('route'), 'path', UNMATCHED_ROUTE)}"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_beat = 0.0
+        self._stall = None
+        self._heartbeat = None
+        self._stopped = threading.Event()
+        self._watchdog = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        if self._watchdog is not None:
+            self._watchdog.join(self.interval * 2)
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            EVENT_LOOP_LAG.observe(max(now - expected, 0.0))
+            self._last_beat = now
+            stall, self._stall = self._stall, None
+            if stall is not None:
+                self._report(stall, now - stall["since"])
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval / 2):
+            if self._stall is not None:
+                continue
+            since = self._last_beat
+            if time.monotonic() - since < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            self._stall = {
+                "since": since + self.interval,
+                "route": _describe_task(asyncio.current_task(self._loop)),
+                "stack": "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+                if frame is not None
+                else "",
+            }
+
+    def _report(self, stall: dict, duration: float):
+        EVENT_LOOP_BLOCKS.labels(stall["route"]).inc()
+        logger.warning(
+            f"Event loop blocked for {duration * 1000:.0f} ms by {stall['route']}:\n"
+            f"{stall['stack']}"
+        )
@@ -0,0 +1,224 @@
+"""Prometheus metrics for the API, the database, Celery and the smart locks.
+
+With several worker processes (``uvicorn --workers``, Celery prefork) set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty, writable directory shared by the
+processes before they start; every process then writes its samples there and
+``/metrics`` aggregates them. Without it each process exports its own samples.
+"""
+import os
+import time
+from celery import signals
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Requests that matched no route share one label instead of one per URL
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing a statement, the count is the number of queries.",
+    ["database"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+DB_COMMITS = Counter("db_commits_total", "Transactions committed.", ["database"])
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool, including opening a new one.",
+    ["database"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up waiting.", ["database"]
+)
+
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time by final state.",
+    ["task", "state"],
+    buckets=(0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+CELERY_TASK_RETRIES = Counter("celery_task_retries_total", "Celery task retries.", ["task"])
+CELERY_TASK_FAILURES = Counter(
+    "celery_task_failures_total", "Celery tasks that raised.", ["task"]
+)
+
+SMART_LOCK_COMMAND_DURATION = Histogram(
+    "smart_lock_command_duration_seconds",
+    "Round-trip of a direct method call to a smart lock through IoT Hub.",
+    ["command", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+DOOR_COMMAND_STAGE_DURATION = Histogram(
+    "door_command_stage_seconds",
+    "Stages of a door command: booking, code and lock before the response, "
+    "notify from the response until the notifications are written.",
+    ["command", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+ACCESS_LOG_ENTRIES = Counter(
+    "access_log_entries_total",
+    "Access log entries written, queued ones when their batch is; rejected "
+    "ones were set aside after the database refused them, dropped ones found "
+    "the buffer full.",
+    ["durability"],
+)
+ACCESS_LOG_FLUSH_DURATION = Histogram(
+    "access_log_flush_seconds",
+    "Time to COPY one batch of access log entries.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+MQTT_MESSAGES = Counter(
+    "mqtt_messages_total",
+    "Device messages received by the MQTT ingest worker.",
+    ["kind", "outcome"],
+)
+MQTT_BATCH_WRITE_DURATION = Histogram(
+    "mqtt_batch_write_seconds",
+    "Time to write and commit one batch of ingested rows.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timer, time other callbacks kept it busy.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+EVENT_LOOP_BLOCKS = Counter(
+    "event_loop_blocks_total",
+    "Callbacks that blocked the event loop longer than the threshold.",
+    ["route"],
+)
+
+
+class StageTimer:
+    """Times the consecutive stages of a door command, for the histogram and
+    a ``Server-Timing`` response header."""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.stages = []
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        DOOR_COMMAND_STAGE_DURATION.labels(self.command, stage).observe(now - self.last)
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def header(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages)
+
+
+def metrics_registry():
+    """Registry to export: the aggregate of all processes in multiprocess mode."""
+    if not MULTIPROCESS:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    """Return the ``(body, content_type)`` of a scrape."""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of a worker that exited (call from the process manager)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+class MetricsMiddleware:
+    """Record latency per route template and status, and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def instrument_celery(port: int):
+    """Export task metrics from Celery workers, served on ``port`` (0 disables)."""
+    started = {}
+
+    @signals.task_prerun.connect(weak=False)
+    def task_prerun(task_id=None, **kwargs):
+        started[task_id] = time.perf_counter()
+
+    @signals.task_postrun.connect(weak=False)
+    def task_postrun(task_id=None, task=None, state=None, **kwargs):
+        start = started.pop(task_id, None)
+        if start is not None:
+            CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+                time.perf_counter() - start
+            )
+
+    @signals.task_retry.connect(weak=False)
+    def task_retry(sender=None, **kwargs):
+        CELERY_TASK_RETRIES.labels(sender.name).inc()
+
+    @signals.task_failure.connect(weak=False)
+    def task_failure(sender=None, **kwargs):
+        CELERY_TASK_FAILURES.labels(sender.name).inc()
+
+    @signals.worker_init.connect(weak=False)
+    def worker_init(**kwargs):
+        # The main worker process serves the samples its pool children write
+        if port:
+            start_http_server(port, registry=metrics_registry())
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def worker_process_shutdown(pid=None, **kwargs):
+        mark_process_dead(pid or os.getpid())
@@ -0,0 +1,158 @@
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from loguru import logger
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from app.core.config import settings
+from app.core.database import async_session
+from app.dependencies import get_current_user, oauth2_scheme, role_required
+from app.enums.user_role import Role
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_SUFFIX = ".speedscope.json"
+PROFILE_ID_PATTERN = re.compile(r"^[\w.-]+$")
+_PROFILE_HEADER_KEY = PROFILE_HEADER.lower().encode()
+
+
+def _profiling_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == _PROFILE_HEADER_KEY:
+            return value not in (b"", b"0", b"false")
+    query = scope.get("query_string", b"")
+    if b"profile" in query:
+        return parse_qs(query.decode()).get("profile", ["0"])[-1] not in ("", "0", "false")
+    return False
+
+
+async def _require_admin(request: Request):
+    """Authenticate the caller with the same dependencies the admin routes use."""
+    token = await oauth2_scheme(request)
+    async with async_session() as db:
+        user = await get_current_user(token=token, db=db)
+    return role_required([Role.ADMIN])(current_user=user)
+
+
+def _profile_path(profile_id: str) -> str:
+    return os.path.join(settings.PROFILE_DIR, profile_id + PROFILE_SUFFIX)
+
+
+def _prune_profiles():
+    profiles = sorted(list_profiles(), key=lambda p: p["created_at"])
+    for profile in profiles[: max(len(profiles) - settings.PROFILE_KEEP, 0)]:
+        os.remove(_profile_path(profile["id"]))
+
+
+def save_profile(profiler: Profiler, method: str, route: str) -> str:
+    """Write the session as speedscope JSON and return its id."""
+    slug = re.sub(r"[^\w]+", "-", route).strip("-") or "root"
+    profile_id = (
+        f"{datetime.utcnow():%Y%m%dT%H%M%S}_{method}_{slug}_{uuid.uuid4().hex[:8]}"
+    )
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    with open(_profile_path(profile_id), "w") as file:
+        file.write(profiler.output(renderer=SpeedscopeRenderer()))
+    _prune_profiles()
+    return profile_id
+
+
+def list_profiles() -> List[dict]:
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(settings.PROFILE_DIR):
+        if name.endswith(PROFILE_SUFFIX):
+            path = os.path.join(settings.PROFILE_DIR, name)
+            profiles.append(
+                {
+                    "id": name[: -len(PROFILE_SUFFIX)],
+                    "created_at": datetime.utcfromtimestamp(os.path.getmtime(path)),
+                    "size": os.path.getsize(path),
+                }
+            )
+    return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+
+def get_profile_path(profile_id: str) -> Optional[str]:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = _profile_path(profile_id)
+    return path if os.path.isfile(path) else None
+
+
+class ProfilerMiddleware:
+    """Profile a single request when an admin asks for it.
+
+    Send ``X-Profile: 1`` or ``?profile=1`` with an admin token; the request
+    runs under a pyinstrument sampling profiler and the response carries
+    ``X-Profile-Id``, downloadable from ``/admin/profiles/{id}`` and viewable
+    in https://www.speedscope.app. Requests without the flag pass straight
+    through. Sync endpoints run in the threadpool and only show up as time
+    awaited.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await _require_admin(Request(scope))
+        except HTTPException as e:
+            response = JSONResponse(
+                {"detail": e.detail}, status_code=e.status_code, headers=e.headers
+            )
+            await response(scope, receive, send)
+            return
+
+        profiler = Profiler(interval=settings.PROFILE_INTERVAL, async_mode="enabled")
+        try:
+            profiler.start()
+        except RuntimeError as e:
+            # pyinstrument runs one profiler per thread and async context
+            response = JSONResponse({"detail": str(e)}, status_code=409)
+            await response(scope, receive, send)
+            return
+
+        profile_id = None
+        response_start = None
+
+        async def send_with_profile(message):
+            nonlocal profile_id, response_start
+            if message["type"] == "http.response.start":
+                # Hold the headers back until the profile id is known
+                response_start = message
+                return
+            if response_start is not None:
+                if profiler.is_running:
+                    profiler.stop()
+                route = getattr(scope.get("route"), "path", scope["path"])
+                profile_id = save_profile(profiler, scope["method"], route)
+                MutableHeaders(scope=response_start)[PROFILE_ID_HEADER] = profile_id
+                await send(response_start)
+                response_start = None
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if profiler.is_running:
+                profiler.stop()
+            if profile_id:
+                logger.info(
+                    f"Profiled {scope['method']} {scope['path']} in "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms, profile {profile_id}"
+                )
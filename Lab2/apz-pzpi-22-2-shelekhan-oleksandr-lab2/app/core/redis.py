@@ -0,0 +1,5 @@
+from redis.asyncio import Redis
+from app.core.config import settings
+
+# Shared by every request of the worker, the client keeps its own connection pool
+redis_client: Redis = Redis.from_url(settings.REDIS_URL, decode_responses=True)
@@ -1,38 +1,85 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from app.models.access_code import AccessCode
+from sqlalchemy import bindparam, select, delete
+from sqlalchemy.dialects.postgresql import insert
+from app.models.access_code import AccessCode, AccessCodeRevocation
 from app.models.booking import Booking
+from app.models.property import Property
+from app.models.user import User
+from app.enums.user_role import Role
+from app.core.config import settings
+from app.core.database import on_commit
 from datetime import datetime
 from fastapi import HTTPException
+from loguru import logger
+import asyncio
 import secrets
-from app.iot import SmartLock
+from app import access_code_cache, offline_codes
+from app.iot import LockTimeout, lock_gateway, parse_lock_id
+from app.iot_utils import push_access_code_revocations
 import json
 from app.crud import access_logs as access_logs_crud
 
+GET_ACCESS_CODE = select(AccessCode).where(AccessCode.booking_id == bindparam("booking_id"))
+# Cache fallback: the newest code with who may check it, in one query
+GET_ACCESS_CODE_ENTRY = (
+    select(AccessCode, Booking.user_id, Property.owner_id)
+    .join(Booking, Booking.id == AccessCode.booking_id)
+    .join(Property, Property.id == Booking.property_id)
+    .where(AccessCode.booking_id == bindparam("booking_id"))
+    .order_by(AccessCode.id.desc())
+    .limit(1)
+)
+
 
 def generate_access_code():
     return secrets.token_hex(8)
 
 
+def new_access_code(booking: Booking, valid_from: datetime, valid_until: datetime):
+    """An access code for a booking, not added to the session yet.
+
+    With a smart lock the code is signed for it and the lock verifies it
+    offline; its window is widened to whole hours as the code carries it.
+    """
+    # Booking dates start at midnight (UTC)
+    if not isinstance(valid_from, datetime):
+        valid_from = datetime.combine(valid_from, datetime.min.time())
+    if not isinstance(valid_until, datetime):
+        valid_until = datetime.combine(valid_until, datetime.min.time())
+    code = None
+    lock_id = booking.property.lock_id
+    if settings.ACCESS_CODE_SIGNED and lock_id:
+        try:
+            _, encryption_key = parse_lock_id(lock_id)
+            secret = offline_codes.derive_lock_secret(encryption_key)
+            code = offline_codes.issue_code(secret, valid_from, valid_until)
+            _, valid_from, valid_until = offline_codes.parse_code(code)
+        except ValueError as e:
+            logger.warning(f"Issuing an online-only code for booking {booking.id}: {e}")
+    return AccessCode(
+        booking_id=booking.id,
+        code=code or generate_access_code(),
+        valid_from=valid_from,
+        valid_until=valid_until,
+    )
+
+
 async def create_access_code(
-    booking_id: int, valid_from: datetime, valid_until: datetime, db: AsyncSession
+    booking: Booking, valid_from: datetime, valid_until: datetime, db: AsyncSession
 ):
-    """Create a new access code."""
-    code = generate_access_code()
-    access_code = AccessCode(
-        booking_id=booking_id, code=code, valid_from=valid_from, valid_until=valid_until
-    )
+    """Create a new access code, cached in Redis once committed."""
+    access_code = new_access_code(booking, valid_from, valid_until)
     db.add(access_code)
-    await db.commit()
-    await db.refresh(access_code)
+    await db.flush()
+    access_code_cache.store_on_commit(
+        db, access_code, booking.user_id, booking.property.owner_id
+    )
     return access_code
 
 
 async def get_access_code(db: AsyncSession, booking_id: int):
     """Get an access code by booking ID."""
-    result = await db.execute(
-        select(AccessCode).filter(AccessCode.booking_id == booking_id)
-    )
+    result = await db.execute(GET_ACCESS_CODE, {"booking_id": booking_id})
     return result.scalar_one_or_none()
 
 
@@ -42,6 +89,7 @@ async def delete_access_code(db: AsyncSession, booking_id: int):
     if not access_code:
         raise HTTPException(status_code=404, detail="Access code not found")
 
+    await revoke_access_codes(db, [booking_id])
     delete_query = (
         delete(AccessCode)
         .where(AccessCode.booking_id == booking_id)
@@ -49,64 +97,183 @@ async def delete_access_code(db: AsyncSession, booking_id: int):
     )
     result = await db.execute(delete_query)
     deleted_access_code = result.scalar_one()
-    await db.commit()
     return deleted_access_code
 
 
+async def revoke_access_codes(db: AsyncSession, booking_ids):
+    """Revoke the codes of bookings before they are deleted.
+
+    They leave the Redis mirror now and again after the commit; signed codes
+    still valid are listed for their lock, which gets the new list once the
+    request commits.
+    """
+    # Fail rather than delete a code the cache would keep accepting
+    await access_code_cache.revoke(booking_ids)
+    access_code_cache.revoke_on_commit(db, booking_ids)
+
+    result = await db.execute(
+        select(AccessCode.code, AccessCode.valid_until, Booking.property_id)
+        .join(Booking, Booking.id == AccessCode.booking_id)
+        .where(AccessCode.booking_id.in_(booking_ids))
+    )
+    now = datetime.utcnow()
+    revocations = []
+    for code, valid_until, property_id in result:
+        parsed = offline_codes.parse_code(code)
+        if parsed is not None and valid_until > now:
+            revocations.append(
+                {"property_id": property_id, "serial": parsed[0], "valid_until": valid_until}
+            )
+    if not revocations:
+        return
+    await db.execute(insert(AccessCodeRevocation).on_conflict_do_nothing(), revocations)
+    property_ids = sorted({revocation["property_id"] for revocation in revocations})
+
+    def publish():
+        for property_id in property_ids:
+            push_access_code_revocations.delay(property_id)
+
+    # Publishing is blocking broker I/O (with retries), keep it off the loop
+    on_commit(
+        db,
+        lambda: access_code_cache.spawn(
+            asyncio.to_thread(publish), f"push revoked codes of properties {property_ids}"
+        ),
+    )
+
+
+async def find_access_code(db: AsyncSession, booking_id: int):
+    """The access code of a booking as a cache entry, ``None`` if it has none.
+
+    Read from Redis; the database is only asked on a miss, and the answer is
+    cached for the next check.
+    """
+    entry = await access_code_cache.lookup(booking_id)
+    if entry == access_code_cache.REVOKED:
+        return None
+    if entry is not None:
+        return entry
+
+    row = (await db.execute(GET_ACCESS_CODE_ENTRY, {"booking_id": booking_id})).first()
+    entry = access_code_cache.make_entry(*row) if row else None
+    try:
+        if entry is not None:
+            await access_code_cache.store(entry, only_if_missing=True)
+        elif not db.info.get("read_only"):
+            # A replica may not have a new code yet, only the primary's "none" is kept
+            await access_code_cache.mark_revoked(
+                [access_code_cache.KEY.format(booking_id)], only_if_missing=True
+            )
+    except Exception as e:
+        logger.warning(f"Failed to cache the access code of booking {booking_id}: {e}")
+    return entry
+
+
+def can_check_access_code(entry: dict, user: User) -> bool:
+    """The guest, the property owner and admins may check a booking's code,
+    as for ``get_booking``."""
+    if user.role == Role.USER:
+        return entry["user_id"] == user.id
+    if user.role == Role.OWNER:
+        return entry["owner_id"] == user.id
+    return True
+
+
 async def is_access_code_valid(db: AsyncSession, booking_id: int, code: str):
     """Check if an access code is valid."""
-    access_code = await get_access_code(db, booking_id)
-    if not access_code:
-        return False
-    if access_code.code != code:
-        return False
-    now = datetime.now()
-    if access_code.valid_from > now or access_code.valid_until < now:
-        return False
-    return True
+    entry = await find_access_code(db, booking_id)
+    return entry is not None and access_code_cache.matches(entry, code)
 
 
-async def send_smart_lock_command(db: AsyncSession, booking_id: int, command: str):
-    """Send a command to the smart lock using booking ID."""
-    booking = await db.get(Booking, booking_id)
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    
-    access_code = await get_access_code(db, booking_id)
-    if not access_code:
-        raise HTTPException(status_code=404, detail="Access code not found")
-    
-    device_id = booking.property.smart_lock_id.split(":")[0]
-    encryption_key = booking.property.smart_lock_id.split(":")[1].encode()
+def is_success(response) -> bool:
+    return response.status is not None and 200 <= response.status < 300
+
+
+def lock_device_id(lock_id: str):
+    """Device id of a lock, ``None`` for a missing or malformed lock id."""
+    try:
+        return parse_lock_id(lock_id)[0]
+    except (AttributeError, ValueError):
+        return None
+
 
-    smart_lock = SmartLock(device_id, encryption_key)
-    response = await smart_lock.send_command(command)
+async def log_denied_access(door, command: str):
+    """Record a rejected access code, committed before the 403 goes out.
 
+    ``door`` is a row of ``booking_crud.get_door``.
+    """
     await access_logs_crud.create_access_log(
-        db=db,
-        access_code_id=access_code.id,
+        property_id=door.property_id,
+        device_id=lock_device_id(door.lock_id),
+        command=command,
+        response_status="denied",
+        response_message=f"Invalid access code for booking {door.id}",
+        durable=True,
+    )
+
+
+async def _send_lock_command(lock_id: str, command: str):
+    try:
+        return await lock_gateway.send_command(lock_id, command)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Smart lock is misconfigured")
+    except LockTimeout:
+        raise HTTPException(status_code=504, detail="Smart lock did not respond")
+
+
+async def send_smart_lock_command(door, command: str, access_code_id: int):
+    """Send a command to the smart lock of a booked property (a row of
+    ``booking_crud.get_door``), on behalf of a validated access code.
+
+    Failures, including a lock answering with an error status, are logged,
+    and committed, before raising; an acknowledged command is only queued
+    for the access log writer.
+    """
+    lock_id = door.lock_id
+    if not lock_id:
+        raise HTTPException(status_code=400, detail="Property has no smart lock")
+
+    try:
+        response = await _send_lock_command(lock_id, command)
+    except HTTPException as e:
+        # A command that did not reach the lock is a security event
+        await access_logs_crud.create_access_log(
+            access_code_id=access_code_id,
+            property_id=door.property_id,
+            device_id=lock_device_id(lock_id),
+            command=command,
+            response_status=str(e.status_code),
+            response_message=e.detail,
+            durable=True,
+        )
+        raise
+
+    await access_logs_crud.create_access_log(
+        access_code_id=access_code_id,
+        property_id=door.property_id,
+        device_id=lock_device_id(lock_id),
         command=command,
         response_status=str(response.status),
         response_message=json.dumps(response.payload),
+        durable=not is_success(response),
     )
+    if not is_success(response):
+        raise HTTPException(status_code=502, detail="Smart lock rejected the command")
 
     return response
 
 
 async def send_smart_lock_command_admin(db: AsyncSession, lock_id: str, command: str):
     """Send a command to the smart lock without booking."""
-    device_id = lock_id.split(":")[0]
-    encryption_key = lock_id.split(":")[1].encode()
-
-    smart_lock = SmartLock(device_id, encryption_key)
-    response = await smart_lock.send_command(command)
+    response = await _send_lock_command(lock_id, command)
 
     await access_logs_crud.create_access_log(
-        db=db,
         access_code_id=None,
+        device_id=lock_device_id(lock_id),
         command=command,
         response_status=str(response.status),
         response_message=json.dumps(response.payload),
+        durable=not is_success(response),
     )
 
     return response
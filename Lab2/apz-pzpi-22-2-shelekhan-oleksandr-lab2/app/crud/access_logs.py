@@ -1,32 +1,142 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from app.models.access_code import AccessCode
-from app.models.access_log import AccessLog
+from sqlalchemy import func, literal_column, select, tuple_
+from app.models.access_log import AccessLog, AccessLogRollup
+from app.models.property import Property
+from app.models.user import User
+from app.enums.user_role import Role
 from datetime import datetime
+from app.access_log_writer import access_log_writer
 from fastapi import HTTPException
+import base64
 
 
 async def create_access_log(
-    db: AsyncSession,
     command: str,
     response_status: str,
     response_message: str = None,
     access_code_id: int = None,
+    property_id: int = None,
+    device_id: str = None,
+    durable: bool = False,
 ):
-    """Create an access log."""
-    access_log = AccessLog(
-        access_code_id=access_code_id,
-        command=command,
-        response_status=response_status,
+    """Queue an access log entry, see ``app.access_log_writer``.
+
+    Entries are written outside the caller's transaction; ``durable`` ones
+    (security events) are committed before this returns.
+    """
+    await access_log_writer.write(
+        command,
+        response_status,
         response_message=response_message,
+        access_code_id=access_code_id,
+        property_id=property_id,
+        device_id=device_id,
+        durable=durable,
+    )
+
+
+def encode_cursor(log: AccessLog) -> str:
+    """Opaque position of the last entry of a page."""
+    return base64.urlsafe_b64encode(
+        f"{log.accessed_at.isoformat()}/{log.id}".encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        accessed_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("/")
+        return datetime.fromisoformat(accessed_at), int(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+async def get_access_logs(
+    db: AsyncSession,
+    user: User,
+    start: datetime,
+    end: datetime,
+    property_id: int = None,
+    device_id: str = None,
+    access_code_id: int = None,
+    command: str = None,
+    response_status: str = None,
+    limit: int = 100,
+    cursor: str = None,
+):
+    """A page of access logs between two times, newest first.
+
+    Keyset pagination on ``(accessed_at, id)``: the next page starts right
+    after the ``cursor`` of the previous one, however deep it is. Owners only
+    see the logs of their own properties. Returns the entries and the cursor
+    of the next page, ``None`` on the last one.
+    """
+    query = select(AccessLog).where(
+        AccessLog.accessed_at >= start, AccessLog.accessed_at < end
     )
-    db.add(access_log)
-    await db.commit()
-    return access_log
+    if user.role != Role.ADMIN:
+        query = query.where(
+            AccessLog.property_id.in_(
+                select(Property.id).where(Property.owner_id == user.id)
+            )
+        )
+    if property_id is not None:
+        query = query.where(AccessLog.property_id == property_id)
+    if device_id is not None:
+        query = query.where(AccessLog.device_id == device_id)
+    if access_code_id is not None:
+        query = query.where(AccessLog.access_code_id == access_code_id)
+    if command is not None:
+        query = query.where(AccessLog.command == command)
+    if response_status is not None:
+        query = query.where(AccessLog.response_status == response_status)
+    if cursor is not None:
+        accessed_at, id = decode_cursor(cursor)
+        query = query.where(
+            # The plain bound lets the indexes and partition pruning use it
+            AccessLog.accessed_at <= accessed_at,
+            tuple_(AccessLog.accessed_at, AccessLog.id) < tuple_(accessed_at, id),
+        )
+
+    result = await db.execute(
+        query.order_by(AccessLog.accessed_at.desc(), AccessLog.id.desc()).limit(limit + 1)
+    )
+    logs = result.scalars().all()
+    if len(logs) <= limit:
+        return logs, None
+    logs = logs[:limit]
+    return logs, encode_cursor(logs[-1])
 
 
-async def get_access_logs(db: AsyncSession, access_code_id: int):
-    """Get access logs for an access code."""
-    stmt = select(AccessLog).where(AccessLog.access_code_id == access_code_id)
-    result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+async def get_access_log_rollups(
+    db: AsyncSession, property_id: int, resolution: str, start: datetime, end: datetime
+):
+    """Entries of a property per hour or day, command and status, oldest first.
+
+    Read from the hourly rollups; days are summed from their hours (UTC). The
+    bucket ``start`` falls in is included whole.
+    """
+    if resolution == "hour":
+        start = start.replace(minute=0, second=0, microsecond=0)
+    elif resolution == "day":
+        start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise ValueError(f"Unknown rollup resolution {resolution!r}")
+    # Inlined, a bound parameter would differ between SELECT and GROUP BY
+    bucket = func.date_trunc(literal_column(f"'{resolution}'"), AccessLogRollup.hour)
+    bucket = bucket.label("bucket")
+    result = await db.execute(
+        select(
+            bucket,
+            AccessLogRollup.command,
+            AccessLogRollup.response_status,
+            func.sum(AccessLogRollup.count).label("count"),
+        )
+        .where(
+            AccessLogRollup.property_id == property_id,
+            AccessLogRollup.hour >= start,
+            AccessLogRollup.hour < end,
+        )
+        .group_by(bucket, AccessLogRollup.command, AccessLogRollup.response_status)
+        .order_by(bucket, AccessLogRollup.command, AccessLogRollup.response_status)
+    )
+    return [row._asdict() for row in result]
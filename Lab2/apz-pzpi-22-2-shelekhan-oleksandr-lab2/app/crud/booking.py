@@ -1,8 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import Integer, bindparam, delete, exists, select
 from app.models.booking import Booking
 from app.models.property import Property
-from app.models.user import User
+from app.models.user import User as UserModel
 from app.schemas.user import User
 from app.enums.user_role import Role
 from app.schemas.booking import BookingCreate, BookingUpdate, PersonalizedOffer
@@ -11,11 +11,48 @@ from fastapi import HTTPException
 from datetime import date
 from sklearn.cluster import KMeans
 import numpy as np
-from app.models.access_code import AccessCode
 from datetime import datetime, timedelta
-import random
-import string
 from typing import List
+from app.crud.loaders import (
+    BOOKING_DETAIL,
+    BOOKING_WITH_PROPERTY,
+    PROPERTY_ONLY,
+    PROPERTY_WITH_OWNER,
+)
+from app.crud.projections import booking_query, booking_row
+from app import access_code_cache
+from app.crud import access_code as access_code_crud
+
+# Hot statements are built once: SQLAlchemy memoizes the cache key of a
+# statement object, so each call skips construction and cache key generation
+# and reuses the compiled SQL and asyncpg's prepared statement.
+OVERLAPPING_BOOKING_EXISTS = select(
+    exists().where(
+        Booking.property_id == bindparam("property_id"),
+        Booking.start_date < bindparam("end_date"),
+        Booking.end_date > bindparam("start_date"),
+        # IS DISTINCT FROM keeps every booking when no booking is excluded
+        Booking.id.is_distinct_from(bindparam("booking_id", type_=Integer)),
+    )
+)
+
+GET_BOOKING = (
+    select(Booking).where(Booking.id == bindparam("booking_id")).options(*BOOKING_DETAIL)
+)
+
+# What a door command needs, as one row instead of the booking graph
+GET_DOOR = (
+    select(
+        Booking.id,
+        Booking.user_id,
+        Booking.property_id,
+        Property.name.label("property_name"),
+        Property.owner_id,
+        Property.lock_id,
+    )
+    .join(Property, Property.id == Booking.property_id)
+    .where(Booking.id == bindparam("booking_id"))
+)
 
 
 async def check_availability(
@@ -31,16 +68,16 @@ async def check_availability(
             status_code=400, detail="Start date must be before the end date."
         )
 
-    result = await db.execute(
-        select(Booking)
-        .filter(Booking.property_id == property_id)
-        .filter(Booking.start_date < end_date)
-        .filter(Booking.end_date > start_date)
-        .filter(Booking.id != booking_id)
+    overlapping = await db.scalar(
+        OVERLAPPING_BOOKING_EXISTS,
+        {
+            "property_id": property_id,
+            "start_date": start_date,
+            "end_date": end_date,
+            "booking_id": booking_id,
+        },
     )
-    overlapping_bookings = result.scalars().all()
-
-    return len(overlapping_bookings) == 0
+    return not overlapping
 
 
 async def create_booking(db: AsyncSession, booking: BookingCreate, user: User):
@@ -57,7 +94,7 @@ async def create_booking(db: AsyncSession, booking: BookingCreate, user: User):
     query = (
         select(Property)
         .where(Property.id == booking.property_id)
-        .options(selectinload(Property.owner))
+        .options(*PROPERTY_WITH_OWNER)
     )
     result = await db.execute(query)
     property = result.scalar_one()
@@ -65,20 +102,17 @@ async def create_booking(db: AsyncSession, booking: BookingCreate, user: User):
     total_price = property.price * nights
     new_booking.booking_price = total_price
     new_booking.property = property
+    # The current user is already in the identity map, no query is emitted
+    new_booking.user = await db.get(UserModel, user.id)
     db.add(new_booking)
-    await db.commit()
-    await db.refresh(new_booking)
-
-    # Generate access codes for the booking
-    access_code = AccessCode(
-        booking_id=new_booking.id,
-        code="".join(random.choices(string.ascii_uppercase + string.digits, k=8)),
-        valid_from=datetime.utcnow(),
-        valid_until=datetime.utcnow() + timedelta(days=1),
+    await db.flush()
+
+    # Generate access codes for the booking, inserted when the request commits
+    access_code = access_code_crud.new_access_code(
+        new_booking, datetime.utcnow(), datetime.utcnow() + timedelta(days=1)
     )
     db.add(access_code)
-    await db.commit()
-    await db.refresh(access_code)
+    access_code_cache.store_on_commit(db, access_code, user.id, property.owner_id)
 
     # Send access code to the user (e.g., via email or SMS)
     # You can implement the logic to send the access code here
@@ -129,8 +163,7 @@ async def update_booking(
         ]:  # Skip dates as they're handled separately
             setattr(db_booking, key, value)
 
-    await db.commit()
-    await db.refresh(db_booking)
+    await db.flush()
     return db_booking
 
 
@@ -143,24 +176,17 @@ async def delete_booking(db: AsyncSession, booking_id: int, user: User):
         raise HTTPException(
             status_code=403, detail="You are not allowed to delete this booking."
         )
+    # Its access codes go with it (ON DELETE CASCADE)
+    await access_code_crud.revoke_access_codes(db, [booking_id])
     delete_query = delete(Booking).where(Booking.id == booking_id).returning(Booking)
     result = await db.execute(delete_query)
     deleted_booking = result.scalar_one()
-    await db.commit()
     return deleted_booking
 
 
 async def get_booking(db: AsyncSession, booking_id: int, user: User):
     """Retrieve a booking by ID."""
-    query = (
-        select(Booking)
-        .where(Booking.id == booking_id)
-        .options(
-            selectinload(Booking.property).selectinload(Property.owner),
-            selectinload(Booking.payment),
-        )
-    )
-    result = await db.execute(query)
+    result = await db.execute(GET_BOOKING, {"booking_id": booking_id})
     booking = result.scalar_one_or_none()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -175,18 +201,36 @@ async def get_booking(db: AsyncSession, booking_id: int, user: User):
     return booking
 
 
-async def get_bookings(db: AsyncSession, user: User):
-    """Retrieve all bookings for a user."""
-    query = (
-        select(Booking)
-        .where(Booking.user_id == user.id)
-        .options(selectinload(Booking.property), selectinload(Booking.payment))
-    )
+async def get_door(db: AsyncSession, booking_id: int, user: User):
+    """The booking's property and lock for a door command, with the access
+    rules of ``get_booking``."""
+    result = await db.execute(GET_DOOR, {"booking_id": booking_id})
+    door = result.one_or_none()
+    if not door:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    if (user.role == Role.USER and door.user_id != user.id) or (
+        user.role == Role.OWNER and door.owner_id != user.id
+    ):
+        raise HTTPException(
+            status_code=403, detail="You are not allowed to view this booking."
+        )
+    return door
+
+
+async def get_bookings(db: AsyncSession, user: User, options=BOOKING_WITH_PROPERTY):
+    """Retrieve all bookings for a user as ORM objects loaded with ``options``."""
+    query = select(Booking).where(Booking.user_id == user.id).options(*options)
     result = await db.execute(query)
     bookings = result.scalars().all()
     return bookings
 
 
+async def list_bookings(db: AsyncSession, user: User) -> List[dict]:
+    """List a user's bookings with property and payment as plain rows."""
+    result = await db.execute(booking_query().where(Booking.user_id == user.id))
+    return [booking_row(row) for row in result]
+
+
 async def get_personalized_offers(db: AsyncSession, user: User):
     """
     Розрахувати персоналізовані пропозиції для користувача на основі попередніх бронювань.
@@ -196,7 +240,7 @@ async def get_personalized_offers(db: AsyncSession, user: User):
     query = (
         select(Booking)
         .where(Booking.user_id == user.id)
-        .options(selectinload(Booking.property))
+        .options(*BOOKING_WITH_PROPERTY)
     )
     result = await db.execute(query)
     bookings = result.scalars().all()
@@ -218,7 +262,7 @@ async def get_personalized_offers(db: AsyncSession, user: User):
     clusters = kmeans.predict(data)
 
     # Отримати всі властивості
-    all_properties_query = select(Property)
+    all_properties_query = select(Property).options(*PROPERTY_ONLY)
     all_properties_result = await db.execute(all_properties_query)
     all_properties = all_properties_result.scalars().all()
 
@@ -250,29 +294,28 @@ async def get_personalized_offers(db: AsyncSession, user: User):
     return offers
 
 
-async def get_owner_bookings(db: AsyncSession, owner_id: int):
-    """Retrieve all bookings for properties owned by the owner."""
+async def get_owner_bookings(
+    db: AsyncSession, owner_id: int, options=BOOKING_WITH_PROPERTY
+):
+    """Retrieve all bookings for properties owned by the owner as ORM objects."""
     query = (
         select(Booking)
         .join(Booking.property)
         .where(Property.owner_id == owner_id)
-        .options(
-            selectinload(Booking.property).selectinload(Property.owner),
-            selectinload(Booking.payment),
-        )
+        .options(*options)
     )
     result = await db.execute(query)
     bookings = result.scalars().all()
     return bookings
 
 
-async def get_all_bookings(db: AsyncSession) -> List[Booking]:
+async def list_owner_bookings(db: AsyncSession, owner_id: int) -> List[dict]:
+    """List bookings of the owner's properties as plain rows."""
+    result = await db.execute(booking_query().where(Property.owner_id == owner_id))
+    return [booking_row(row) for row in result]
+
+
+async def get_all_bookings(db: AsyncSession) -> List[dict]:
     """Get all bookings in the system (admin only)."""
-    result = await db.execute(
-        select(Booking).options(
-            selectinload(Booking.property).selectinload(Property.owner),
-            selectinload(Booking.user),
-            selectinload(Booking.payment),
-        )
-    )
-    return result.scalars().all()
+    result = await db.execute(booking_query())
+    return [booking_row(row) for row in result]
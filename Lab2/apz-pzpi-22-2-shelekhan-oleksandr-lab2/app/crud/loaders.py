@@ -0,0 +1,53 @@
+from sqlalchemy.orm import joinedload, selectinload, raiseload
+from app.models.booking import Booking
+from app.models.payment import Payment
+from app.models.property import Property
+
+# Building the options configures the mappers, so every model referenced by a
+# relationship must be imported first regardless of the caller's import order
+from app.models import access_code, access_log, notification, user  # noqa: F401
+
+# Loader option presets. The models default to lazy="selectin", which drags in
+# every booking of every loaded property; queries opt into what they need and
+# leave the rest unloaded (raiseload fails loudly instead of lazy loading).
+
+PROPERTY_ONLY = (
+    raiseload(Property.owner),
+    raiseload(Property.bookings),
+)
+
+PROPERTY_WITH_OWNER = (
+    selectinload(Property.owner),
+    raiseload(Property.bookings),
+)
+
+PROPERTY_WITH_BOOKINGS = (
+    raiseload(Property.owner),
+    selectinload(Property.bookings).raiseload("*"),
+)
+
+BOOKING_WITH_PROPERTY = (
+    selectinload(Booking.property).options(*PROPERTY_ONLY),
+    raiseload(Booking.user),
+    raiseload(Booking.payment),
+)
+
+# Single booking lookups join the many-to-one side in the same statement. The
+# payment stays a separate load: Booking.payment is declared to-one, but
+# partial payments leave several rows per booking and a join would repeat it.
+BOOKING_DETAIL = (
+    joinedload(Booking.property, innerjoin=True).options(
+        joinedload(Property.owner, innerjoin=True),
+        raiseload(Property.bookings),
+    ),
+    joinedload(Booking.user, innerjoin=True),
+    selectinload(Booking.payment),
+)
+
+PAYMENT_DETAIL = (
+    selectinload(Payment.booking).options(
+        selectinload(Booking.property).options(*PROPERTY_WITH_OWNER),
+        raiseload(Booking.user),
+        raiseload(Booking.payment),
+    ),
+)
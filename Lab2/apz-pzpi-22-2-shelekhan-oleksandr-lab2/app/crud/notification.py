@@ -1,26 +1,28 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import bindparam, select, update, delete
 from app.models.notification import Notification
 from app.schemas.notification import NotificationCreate
 from typing import List
 
+# Built once, the notification feed is polled by every open client
+GET_USER_NOTIFICATIONS = (
+    select(Notification)
+    .where(Notification.user_id == bindparam("user_id"))
+    .order_by(Notification.created_at.desc())
+)
+
 
 async def create_notification(
     db: AsyncSession, notification: NotificationCreate
 ) -> Notification:
     notif = Notification(**notification.dict())
     db.add(notif)
-    await db.commit()
-    await db.refresh(notif)
+    await db.flush()
     return notif
 
 
 async def get_user_notifications(db: AsyncSession, user_id: int) -> List[Notification]:
-    result = await db.execute(
-        select(Notification)
-        .where(Notification.user_id == user_id)
-        .order_by(Notification.created_at.desc())
-    )
+    result = await db.execute(GET_USER_NOTIFICATIONS, {"user_id": user_id})
     return result.scalars().all()
 
 
@@ -28,16 +30,12 @@ async def mark_notification_read(
     db: AsyncSession, notification_id: int, user_id: int
 ) -> Notification:
     result = await db.execute(
-        select(Notification).where(
-            Notification.id == notification_id, Notification.user_id == user_id
-        )
+        update(Notification)
+        .where(Notification.id == notification_id, Notification.user_id == user_id)
+        .values(read=True)
+        .returning(Notification)
     )
-    notif = result.scalar_one_or_none()
-    if notif:
-        notif.read = True
-        await db.commit()
-        await db.refresh(notif)
-    return notif
+    return result.scalar_one_or_none()
 
 
 async def delete_notification(
@@ -48,7 +46,6 @@ async def delete_notification(
             Notification.id == notification_id, Notification.user_id == user_id
         )
     )
-    await db.commit()
     return result.rowcount > 0
 
 
@@ -56,5 +53,4 @@ async def delete_all_user_notifications(db: AsyncSession, user_id: int) -> int:
     result = await db.execute(
         delete(Notification).where(Notification.user_id == user_id)
     )
-    await db.commit()
     return result.rowcount
@@ -7,7 +7,8 @@ from sqlalchemy import select, delete
 from fastapi import HTTPException
 from app.crud.booking import get_booking
 from app.models.booking import Booking
-from sqlalchemy.orm import selectinload
+from app.crud.loaders import PAYMENT_DETAIL
+from app.crud.projections import payment_query, payment_row
 
 
 async def create_payment(db: AsyncSession, payment_data: PaymentCreate, user: User):
@@ -32,18 +33,13 @@ async def create_payment(db: AsyncSession, payment_data: PaymentCreate, user: Us
 
     new_payment = Payment(**payment_data.model_dump())
     db.add(new_payment)
-    await db.commit()
-    await db.refresh(new_payment)
+    await db.flush()
 
     # Load the payment with all relationships
     result = await db.execute(
         select(Payment)
         .filter(Payment.id == new_payment.id)
-        .options(
-            selectinload(Payment.booking)
-            .selectinload(Booking.property)
-            .selectinload(Property.owner)
-        )
+        .options(*PAYMENT_DETAIL)
     )
     payment_with_relations = result.scalar_one()
 
@@ -55,11 +51,7 @@ async def check_user_payment(db: AsyncSession, payment_id: int, user: User):
     result = await db.execute(
         select(Payment)
         .filter(Payment.id == payment_id)
-        .options(
-            selectinload(Payment.booking)
-            .selectinload(Booking.property)
-            .selectinload(Property.owner)
-        )
+        .options(*PAYMENT_DETAIL)
     )
     payment = result.scalar_one_or_none()
 
@@ -92,8 +84,7 @@ async def update_payment(
     for key, value in payment_data.model_dump(exclude_none=True).items():
         setattr(payment, key, value)
 
-    await db.commit()
-    await db.refresh(payment)
+    await db.flush()
 
     return payment
 
@@ -104,18 +95,16 @@ async def delete_payment(db: AsyncSession, payment_id: int, user: User):
     payment = await check_user_payment(db, payment_id, user)
 
     await db.execute(delete(Payment).filter(Payment.id == payment_id))
-    await db.commit()
 
     return payment
 
 
 async def get_user_payments(db: AsyncSession, user: User):
-    """Get all payments for the current user."""
+    """Get all payments for the current user as plain rows."""
     query = (
-        select(Payment)
-        .join(Booking)
+        payment_query()
+        .join(Booking, Booking.id == Payment.booking_id)
         .where(Booking.user_id == user.id)
-        .options(selectinload(Payment.booking).selectinload(Booking.property))
     )
     result = await db.execute(query)
-    return result.scalars().all()
+    return [payment_row(row) for row in result]
@@ -0,0 +1,98 @@
+from sqlalchemy import select
+from app.models.booking import Booking
+from app.models.payment import Payment
+from app.models.property import Property
+
+# Column-only projections for list endpoints. Rows are turned into plain dicts
+# shaped like the response schemas, so no ORM identity map, relationship
+# loading or from_attributes validation is involved.
+
+PROPERTY_COLUMNS = (
+    Property.id,
+    Property.owner_id,
+    Property.name,
+    Property.description,
+    Property.rooms,
+    Property.price,
+    Property.location,
+    Property.lock_id,
+    Property.latitude,
+    Property.longitude,
+)
+
+BOOKING_COLUMNS = (
+    Booking.id,
+    Booking.user_id,
+    Booking.property_id,
+    Booking.start_date,
+    Booking.end_date,
+    Booking.status,
+    Booking.created_at,
+    Booking.booking_price,
+)
+
+PAYMENT_COLUMNS = (
+    Payment.id,
+    Payment.booking_id,
+    Payment.amount,
+    Payment.status,
+    Payment.created_at,
+)
+
+
+def _labelled(prefix: str, columns):
+    return [column.label(f"{prefix}__{column.key}") for column in columns]
+
+
+def _nested(mapping, prefix: str, columns) -> dict:
+    return {column.key: mapping[f"{prefix}__{column.key}"] for column in columns}
+
+
+def property_query():
+    """Select the columns of the ``Property`` schema."""
+    return select(*PROPERTY_COLUMNS)
+
+
+def property_row(row) -> dict:
+    return dict(row._mapping)
+
+
+def payment_query():
+    """Select the columns of the ``Payment`` schema."""
+    return select(*PAYMENT_COLUMNS)
+
+
+def payment_row(row) -> dict:
+    return dict(row._mapping)
+
+
+def booking_query():
+    """Select a booking with its property and latest payment in one statement."""
+    payment = (
+        select(*PAYMENT_COLUMNS)
+        .where(Payment.booking_id == Booking.id)
+        .order_by(Payment.id.desc())
+        .limit(1)
+        .lateral("payment")
+    )
+    return (
+        select(
+            *BOOKING_COLUMNS,
+            *_labelled("property", PROPERTY_COLUMNS),
+            *[column.label(f"payment__{column.key}") for column in payment.c],
+        )
+        .join(Property, Property.id == Booking.property_id)
+        .outerjoin(payment, payment.c.booking_id == Booking.id)
+    )
+
+
+def booking_row(row) -> dict:
+    mapping = row._mapping
+    booking = {column.key: mapping[column.key] for column in BOOKING_COLUMNS}
+    booking["property"] = _nested(mapping, "property", PROPERTY_COLUMNS)
+    booking["payment"] = (
+        _nested(mapping, "payment", PAYMENT_COLUMNS)
+        if mapping["payment__id"] is not None
+        else None
+    )
+    return booking
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.property import Property
+from app.models.property import Property, SEARCH_CONFIG
 from app.models.user import User, Role
 from app.schemas.property import (
     PropertyCreate,
@@ -8,20 +8,35 @@ from app.schemas.property import (
     AvailabilityPeriod,
 )
 from app.schemas.user import User
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func, or_, exists
 from fastapi import HTTPException
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import websearch_to_tsquery
 from app.enums.booking_status import BookingStatus
 from datetime import date
 from datetime import timedelta
+from app.location_index import location_index
+from app.geo_index import geo_index
+from app.models.booking import Booking
+from app.crud.loaders import PROPERTY_ONLY, PROPERTY_WITH_BOOKINGS
+from app.crud.projections import property_query, property_row
+from app.core.database import on_commit
+
+# Keeps /properties/nearby within its query budget in fully booked areas
+NEARBY_MAX_PASSES = 3
 
 
 async def create_property(db: AsyncSession, property_data: PropertyCreate, user: User):
     """Create a new property."""
     new_property = Property(**property_data.model_dump(), owner_id=user.id)
     db.add(new_property)
-    await db.commit()
-    await db.refresh(new_property)
+    await db.flush()
+
+    def index_property():
+        location_index.add(new_property.location)
+        geo_index.upsert(new_property.id, new_property.latitude, new_property.longitude)
+
+    on_commit(db, index_property)
 
     return new_property
 
@@ -30,7 +45,9 @@ async def update_property(
     db: AsyncSession, property_id: int, property_data: PropertyUpdate, user: User
 ):
     """Update an existing property."""
-    result = await db.execute(select(Property).filter(Property.id == property_id))
+    result = await db.execute(
+        select(Property).filter(Property.id == property_id).options(*PROPERTY_ONLY)
+    )
     property = result.scalar_one_or_none()
 
     if not property:
@@ -41,18 +58,29 @@ async def update_property(
             status_code=403, detail="You are not allowed to update this property."
         )
 
+    old_location = property.location
     for key, value in property_data.model_dump(exclude_none=True).items():
         setattr(property, key, value)
 
-    await db.commit()
-    await db.refresh(property)
+    await db.flush()
+    location, latitude, longitude = property.location, property.latitude, property.longitude
+
+    def reindex_property():
+        if location != old_location:
+            location_index.remove(old_location)
+            location_index.add(location)
+        geo_index.upsert(property_id, latitude, longitude)
+
+    on_commit(db, reindex_property)
 
     return property
 
 
 async def delete_property(db: AsyncSession, property_id: int, user: User):
     """Delete a property."""
-    result = await db.execute(select(Property).filter(Property.id == property_id))
+    result = await db.execute(
+        select(Property).filter(Property.id == property_id).options(*PROPERTY_ONLY)
+    )
     property = result.scalar_one_or_none()
 
     if not property:
@@ -64,14 +92,22 @@ async def delete_property(db: AsyncSession, property_id: int, user: User):
         )
 
     await db.execute(delete(Property).filter(Property.id == property_id))
-    await db.commit()
+    location = property.location
+
+    def unindex_property():
+        location_index.remove(location)
+        geo_index.remove(property_id)
+
+    on_commit(db, unindex_property)
 
     return property
 
 
 async def get_property(db: AsyncSession, property_id: int):
     """Read a property by ID."""
-    result = await db.execute(select(Property).filter(Property.id == property_id))
+    result = await db.execute(
+        select(Property).filter(Property.id == property_id).options(*PROPERTY_ONLY)
+    )
     property = result.scalar_one_or_none()
 
     if not property:
@@ -81,18 +117,97 @@ async def get_property(db: AsyncSession, property_id: int):
 
 
 async def get_properties(db: AsyncSession):
-    """Read all properties."""
-    query = select(Property)
-    result = await db.execute(query)
-    properties = result.scalars().all()
+    """Read all properties as plain rows."""
+    result = await db.execute(property_query())
+    return [property_row(row) for row in result]
+
 
+async def search_properties(db: AsyncSession, query: str, skip: int = 0, limit: int = 20):
+    """Search properties by name, description and location, ranked by relevance.
+
+    Full-text matches come from the generated ``search_vector`` column, typos in
+    the location are tolerated through pg_trgm similarity.
+    """
+    ts_query = websearch_to_tsquery(SEARCH_CONFIG, query)
+    rank = func.ts_rank_cd(Property.search_vector, ts_query) + func.similarity(
+        Property.location, query
+    )
+    stmt = (
+        property_query()
+        .where(
+            or_(
+                Property.search_vector.op("@@")(ts_query),
+                Property.location.op("%")(query),
+            )
+        )
+        .order_by(rank.desc(), Property.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return [property_row(row) for row in result]
+
+
+async def get_nearby_properties(
+    db: AsyncSession,
+    latitude: float,
+    longitude: float,
+    radius_km: float = None,
+    start_date: date = None,
+    end_date: date = None,
+    limit: int = 20,
+):
+    """Get the closest properties, optionally only those free in a date range.
+
+    Candidates come from the in-memory geo index ordered by distance, the
+    database only checks availability for those ids. The candidate window grows
+    until enough free properties are found or the index runs out, at most
+    ``NEARBY_MAX_PASSES`` times; each pass only checks the new candidates.
+    """
+    if (start_date is None) != (end_date is None):
+        raise HTTPException(
+            status_code=400, detail="Both start_date and end_date are required."
+        )
+    if start_date and start_date >= end_date:
+        raise HTTPException(
+            status_code=400, detail="Start date must be before the end date."
+        )
+
+    k = limit * 4
+    distances = {}
+    properties = []
+    for _ in range(NEARBY_MAX_PASSES):
+        candidates = geo_index.query(latitude, longitude, k, radius_km)
+        new_ids = [property_id for property_id, _ in candidates if property_id not in distances]
+        if not new_ids:
+            break
+        distances.update(candidates)
+        stmt = property_query().where(Property.id.in_(new_ids))
+        if start_date:
+            stmt = stmt.where(
+                ~exists().where(
+                    Booking.property_id == Property.id,
+                    Booking.status != BookingStatus.CANCELLED,
+                    Booking.start_date < end_date,
+                    Booking.end_date > start_date,
+                )
+            )
+        result = await db.execute(stmt)
+        properties.extend(property_row(row) for row in result)
+        if len(properties) >= limit or len(candidates) < k:
+            break
+        k *= 4
+
+    properties = sorted(properties, key=lambda p: distances[p["id"]])[:limit]
+    for property in properties:
+        property["distance_km"] = round(distances[property["id"]], 3)
     return properties
 
 
 async def get_available_properties(db: AsyncSession):
     """Get all available properties along with their free time windows."""
     # Load all properties along with their bookings
-    result = await db.execute(select(Property).options(selectinload(Property.bookings)))
+    result = await db.execute(select(Property).options(*PROPERTY_WITH_BOOKINGS))
     properties = result.scalars().all()
 
     today = date.today()
@@ -138,6 +253,8 @@ async def get_available_properties(db: AsyncSession):
                     rooms=property.rooms,
                     price=property.price,
                     location=property.location,
+                    latitude=property.latitude,
+                    longitude=property.longitude,
                     availability_periods=availability_periods,
                 )
             )
@@ -151,7 +268,7 @@ async def get_property_availability(db: AsyncSession, property_id: int):
     result = await db.execute(
         select(Property)
         .filter(Property.id == property_id)
-        .options(selectinload(Property.bookings))
+        .options(*PROPERTY_WITH_BOOKINGS)
     )
     property = result.scalar_one_or_none()
 
@@ -196,7 +313,9 @@ async def get_property_availability(db: AsyncSession, property_id: int):
 
 async def get_properties_by_owner(db: AsyncSession, owner_id: int):
     """Get all properties owned by the current user."""
-    query = select(Property).filter(Property.owner_id == owner_id)
+    query = (
+        select(Property).filter(Property.owner_id == owner_id).options(*PROPERTY_ONLY)
+    )
     result = await db.execute(query)
     properties = result.scalars().all()
     return properties
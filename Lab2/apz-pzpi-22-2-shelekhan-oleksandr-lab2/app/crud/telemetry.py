@@ -0,0 +1,93 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.models.telemetry import TemperatureReading, TemperatureRollup
+from app.telemetry import detect_anomalies
+from datetime import datetime
+import numpy as np
+
+
+async def get_readings(
+    db: AsyncSession, property_id: int, start: datetime, end: datetime, limit: int
+):
+    """Raw readings of a lock between two times, oldest first."""
+    result = await db.execute(
+        select(TemperatureReading.recorded_at, TemperatureReading.temperature)
+        .where(
+            TemperatureReading.property_id == property_id,
+            TemperatureReading.recorded_at >= start,
+            TemperatureReading.recorded_at < end,
+        )
+        .order_by(TemperatureReading.recorded_at)
+        .limit(limit)
+    )
+    return [
+        {"recorded_at": recorded_at, "temperature": temperature}
+        for recorded_at, temperature in result
+    ]
+
+
+async def get_rollups(
+    db: AsyncSession, property_id: int, resolution: str, start: datetime, end: datetime
+):
+    """Minute or hour buckets of a lock between two times, oldest first."""
+    result = await db.execute(
+        select(
+            TemperatureRollup.bucket,
+            TemperatureRollup.count,
+            TemperatureRollup.sum,
+            TemperatureRollup.min,
+            TemperatureRollup.max,
+        )
+        .where(
+            TemperatureRollup.property_id == property_id,
+            TemperatureRollup.resolution == resolution,
+            TemperatureRollup.bucket >= start,
+            TemperatureRollup.bucket < end,
+        )
+        .order_by(TemperatureRollup.bucket)
+    )
+    return [
+        {"bucket": bucket, "count": count, "mean": total / count, "min": min, "max": max}
+        for bucket, count, total, min, max in result
+    ]
+
+
+async def get_anomalies(
+    db: AsyncSession,
+    property_id: int,
+    start: datetime,
+    end: datetime,
+    method: str,
+    window: int,
+    threshold: float,
+):
+    """Anomalous readings of a lock between two times.
+
+    The ``window`` readings before ``start`` are scored too, so the first
+    readings of the range have a full rolling window behind them.
+    """
+    before = []
+    if method == "zscore":
+        result = await db.execute(
+            select(TemperatureReading.temperature)
+            .where(
+                TemperatureReading.property_id == property_id,
+                TemperatureReading.recorded_at < start,
+            )
+            .order_by(TemperatureReading.recorded_at.desc())
+            .limit(window)
+        )
+        before = result.scalars().all()[::-1]
+    readings = await get_readings(db, property_id, start, end, limit=None)
+    if not readings:
+        return []
+
+    values = np.array(before + [reading["temperature"] for reading in readings])
+    mask, scores = detect_anomalies(
+        np.zeros(len(values), dtype=int), values, method, window, threshold
+    )
+    return [
+        {**readings[i - len(before)], "score": float(scores[i])}
+        for i in np.flatnonzero(mask)
+        if i >= len(before)
+    ]
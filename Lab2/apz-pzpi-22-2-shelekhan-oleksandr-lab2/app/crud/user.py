@@ -1,11 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User as UserModel
 from app.schemas.user import UserCreate, UserUpdate, User
-from sqlalchemy import select, delete
+from sqlalchemy import bindparam, select, update, delete
 from app.core.security import get_password_hash, verify_password
 from fastapi import HTTPException
 from app.enums.user_role import Role
 
+# Built once, runs on every authenticated request through get_current_user
+GET_USER = select(UserModel).where(UserModel.id == bindparam("user_id"))
+
 
 async def create_user(db: AsyncSession, user: UserCreate):
     """Create a new user.
@@ -22,7 +25,7 @@ async def create_user(db: AsyncSession, user: UserCreate):
     user.password = get_password_hash(user.password)
     new_user = UserModel(**user.model_dump())
     db.add(new_user)
-    await db.commit()
+    await db.flush()
     return new_user
 
 
@@ -58,7 +61,7 @@ async def update_user(
         user.password = get_password_hash(user.password)
     for key, value in user.model_dump(exclude_none=True).items():
         setattr(db_user, key, value)
-    await db.commit()
+    await db.flush()
     return db_user
 
 
@@ -105,8 +108,7 @@ async def get_user(db: AsyncSession, user_id: int):
     Raises:
         HTTPException: If the user is not found.
     """
-    query = select(UserModel).where(UserModel.id == user_id)
-    result = await db.execute(query)
+    result = await db.execute(GET_USER, {"user_id": user_id})
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -154,13 +156,16 @@ async def block_user(db: AsyncSession, user_id: int):
     Raises:
         HTTPException: If the user is not found.
     """
-    query = select(UserModel).where(UserModel.id == user_id)
+    query = (
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values(is_blocked=True)
+        .returning(UserModel)
+    )
     result = await db.execute(query)
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user.is_blocked = True
-    await db.commit()
     return user
 
 
@@ -179,11 +184,14 @@ async def unblock_user(db: AsyncSession, user_id: int):
     Raises:
         HTTPException: If the user is not found.
     """
-    query = select(UserModel).where(UserModel.id == user_id)
+    query = (
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values(is_blocked=False)
+        .returning(UserModel)
+    )
     result = await db.execute(query)
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user.is_blocked = False
-    await db.commit()
     return user
@@ -2,10 +2,20 @@ from celery import Task
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from app.core.config import settings
+from app.core.instrumentation import InstrumentedPool, instrument_engine
 
 # Replace "asyncpg" with "psycopg2" for sync connection
 sqlalchemy_url = str(settings.SQLALCHEMY_DATABASE_URL).replace("asyncpg", "psycopg2")
-engine = create_engine(sqlalchemy_url, pool_recycle=3600, pool_size=10)
+engine = create_engine(
+    sqlalchemy_url,
+    poolclass=InstrumentedPool,
+    pool_size=settings.CELERY_DB_POOL_SIZE,
+    max_overflow=settings.CELERY_DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+instrument_engine(engine)
 
 class DatabaseTask(Task):
     """Abstract Celery Task that manages the database session lifecycle."""
@@ -0,0 +1,194 @@
+"""Snapshot and restore the database for tests and benchmark runs.
+
+``snapshot`` clones the database into a template database with
+``CREATE DATABASE ... TEMPLATE``, a file-level copy that takes seconds even for
+millions of rows; ``restore`` drops the database and clones it back from the
+template. Cloning needs exclusive access, so both commands disconnect every
+other session of the source database: stop the API and workers first, or
+restart them afterwards.
+
+``dump`` and ``load`` do the same through a ``pg_dump`` custom-format file,
+portable between servers but slower. ``reset`` empties every table with a
+single ``TRUNCATE ... RESTART IDENTITY CASCADE``.
+
+    python app/db_snapshot.py snapshot seeded
+    python benchmarks/load_test.py ...
+    python app/db_snapshot.py restore seeded
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import asyncpg
+from loguru import logger
+from app.core.config import settings
+from app.core.database import engine
+from app.delete_all_data import delete_all_data
+
+SNAPSHOT_PREFIX = f"{settings.POSTGRES_DB}__snapshot__"
+SNAPSHOT_NAME = re.compile(r"^[a-z0-9_]{1,30}$")
+
+
+def snapshot_database(name: str) -> str:
+    if not SNAPSHOT_NAME.match(name):
+        raise SystemExit("Snapshot names are 1-30 characters of a-z, 0-9 and _")
+    return SNAPSHOT_PREFIX + name
+
+
+async def connect_maintenance(database: str) -> asyncpg.Connection:
+    # CREATE and DROP DATABASE cannot run while connected to the databases involved
+    return await asyncpg.connect(
+        host=settings.POSTGRES_SERVER,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=database,
+    )
+
+
+async def disconnect_sessions(connection, database: str):
+    await connection.execute(
+        "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+        "WHERE datname = $1 AND pid <> pg_backend_pid()",
+        database,
+    )
+
+
+async def clone_database(connection, source: str, target: str):
+    # FILE_COPY copies the data files instead of WAL-logging every block
+    strategy = " STRATEGY FILE_COPY" if connection.get_server_version().major >= 15 else ""
+    await disconnect_sessions(connection, source)
+    await connection.execute(
+        f'CREATE DATABASE "{target}" TEMPLATE "{source}"{strategy}'
+    )
+
+
+async def drop_snapshot_database(connection, snapshot: str):
+    await connection.execute(
+        f'ALTER DATABASE "{snapshot}" WITH IS_TEMPLATE false ALLOW_CONNECTIONS true'
+    )
+    await connection.execute(f'DROP DATABASE "{snapshot}" WITH (FORCE)')
+
+
+async def snapshot_exists(connection, snapshot: str) -> bool:
+    return bool(
+        await connection.fetchval("SELECT 1 FROM pg_database WHERE datname = $1", snapshot)
+    )
+
+
+async def create_snapshot(connection, name: str, replace: bool):
+    snapshot = snapshot_database(name)
+    if await snapshot_exists(connection, snapshot):
+        if not replace:
+            raise SystemExit(f"Snapshot {name} exists, pass --replace to overwrite it")
+        await drop_snapshot_database(connection, snapshot)
+    await clone_database(connection, settings.POSTGRES_DB, snapshot)
+    # Nobody may connect to the template, a session would block the next restore
+    await connection.execute(
+        f'ALTER DATABASE "{snapshot}" WITH IS_TEMPLATE true ALLOW_CONNECTIONS false'
+    )
+    logger.info(f"Snapshot {name} created from {settings.POSTGRES_DB}")
+
+
+async def restore_snapshot(connection, name: str):
+    snapshot = snapshot_database(name)
+    if not await snapshot_exists(connection, snapshot):
+        raise SystemExit(f"Snapshot {name} does not exist")
+    await connection.execute(f'DROP DATABASE IF EXISTS "{settings.POSTGRES_DB}" WITH (FORCE)')
+    await clone_database(connection, snapshot, settings.POSTGRES_DB)
+    logger.info(f"{settings.POSTGRES_DB} restored from snapshot {name}")
+
+
+async def list_snapshots(connection):
+    rows = await connection.fetch(
+        "SELECT datname, pg_size_pretty(pg_database_size(datname)) AS size "
+        "FROM pg_database WHERE starts_with(datname, $1) ORDER BY datname",
+        SNAPSHOT_PREFIX,
+    )
+    for row in rows:
+        print(f"{row['datname'][len(SNAPSHOT_PREFIX):]:30} {row['size']:>10}")
+
+
+async def drop_snapshot(connection, name: str):
+    snapshot = snapshot_database(name)
+    if not await snapshot_exists(connection, snapshot):
+        raise SystemExit(f"Snapshot {name} does not exist")
+    await drop_snapshot_database(connection, snapshot)
+    logger.info(f"Snapshot {name} dropped")
+
+
+def pg_command(*args) -> list:
+    return [
+        *args,
+        f"--host={settings.POSTGRES_SERVER}",
+        f"--port={settings.POSTGRES_PORT}",
+        f"--username={settings.POSTGRES_USER}",
+        f"--dbname={settings.POSTGRES_DB}",
+    ]
+
+
+def run_pg_tool(command: list):
+    env = {**os.environ, "PGPASSWORD": settings.POSTGRES_PASSWORD}
+    subprocess.run(command, env=env, check=True)
+
+
+def dump(path: str):
+    run_pg_tool(pg_command("pg_dump", "--format=custom", "--no-owner", f"--file={path}"))
+    logger.info(f"{settings.POSTGRES_DB} dumped to {path}")
+
+
+def load(path: str, jobs: int):
+    run_pg_tool(
+        pg_command(
+            "pg_restore", "--clean", "--if-exists", "--no-owner", f"--jobs={jobs}", path
+        )
+    )
+    logger.info(f"{settings.POSTGRES_DB} loaded from {path}")
+
+
+async def main(args):
+    if args.command == "reset":
+        tables = await delete_all_data()
+        await engine.dispose()
+        logger.info(f"Truncated {len(tables)} tables")
+        return
+    if args.command == "dump":
+        return dump(args.path)
+    if args.command == "load":
+        return load(args.path, args.jobs)
+
+    connection = await connect_maintenance(args.maintenance_db)
+    try:
+        if args.command == "snapshot":
+            await create_snapshot(connection, args.name, args.replace)
+        elif args.command == "restore":
+            await restore_snapshot(connection, args.name)
+        elif args.command == "list":
+            await list_snapshots(connection)
+        elif args.command == "drop":
+            await drop_snapshot(connection, args.name)
+    finally:
+        await connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--maintenance-db", default="postgres", help="database to connect to while cloning"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = commands.add_parser("snapshot", help="clone the database into a template")
+    snapshot_parser.add_argument("name")
+    snapshot_parser.add_argument("--replace", action="store_true")
+    commands.add_parser("restore", help="recreate the database from a template").add_argument(
+        "name"
+    )
+    commands.add_parser("list", help="list snapshots and their size")
+    commands.add_parser("drop", help="drop a snapshot").add_argument("name")
+    commands.add_parser("reset", help="truncate every table and restart the ids")
+    commands.add_parser("dump", help="pg_dump custom-format snapshot").add_argument("path")
+    load_parser = commands.add_parser("load", help="restore a pg_dump snapshot")
+    load_parser.add_argument("path")
+    load_parser.add_argument("--jobs", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
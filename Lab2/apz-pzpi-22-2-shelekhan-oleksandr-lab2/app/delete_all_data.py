@@ -1,29 +1,36 @@
-from app.core.database import AsyncSession
-from app.models import User, Property, Booking, Payment, AccessCode, AccessLog
 from app.core.database import engine
 from sqlalchemy import text
 
+# Every table of the schema except the migration state, partitions go with their parent
+TABLES_QUERY = text(
+    """
+    SELECT quote_ident(c.relname)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema()
+      AND c.relkind IN ('r', 'p')
+      AND NOT c.relispartition
+      AND c.relname <> 'alembic_version'
+    """
+)
+
+
 async def delete_all_data():
-    try:
-        async with AsyncSession(engine) as session:
-            await session.execute(text("SET session_replication_role = 'replica'"))
-            await session.execute(User.__table__.delete())
-            await session.execute(Property.__table__.delete())
-            await session.execute(Booking.__table__.delete())
-            await session.execute(Payment.__table__.delete())
-            await session.execute(AccessCode.__table__.delete())
-            await session.execute(AccessLog.__table__.delete())
-            await session.execute(text("SET session_replication_role = 'origin'"))
-            await session.execute(text("ALTER SEQUENCE users_id_seq RESTART WITH 1"))
-            await session.execute(text("ALTER SEQUENCE properties_id_seq RESTART WITH 1"))
-            await session.execute(text("ALTER SEQUENCE bookings_id_seq RESTART WITH 1"))
-            await session.execute(text("ALTER SEQUENCE payments_id_seq RESTART WITH 1"))
-            await session.execute(text("ALTER SEQUENCE access_codes_id_seq RESTART WITH 1"))
-            await session.execute(text("ALTER SEQUENCE access_logs_id_seq RESTART WITH 1"))
-            await session.commit()
-    finally:
-        await session.close()
+    """Empty every table and restart its id sequence in a single statement."""
+    async with engine.begin() as connection:
+        tables = (await connection.execute(TABLES_QUERY)).scalars().all()
+        if tables:
+            await connection.execute(
+                text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+            )
+    return tables
+
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(delete_all_data())
+
+    async def main():
+        await delete_all_data()
+        await engine.dispose()
+
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+from typing import List, Optional, Tuple
+import numpy as np
+from loguru import logger
+from sklearn.neighbors import BallTree
+from sqlalchemy import select
+from app.core.database import read_only_session
+from app.models.property import Property
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Number of writes buffered outside the tree before it is rebuilt
+REBUILD_THRESHOLD = 256
+
+
+def haversine_km(lat: float, lon: float, points: np.ndarray) -> np.ndarray:
+    """Great-circle distance from one point to an array of radian ``(lat, lon)`` rows."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat = points[:, 0] - lat
+    dlon = points[:, 1] - lon
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(points[:, 0]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class GeoIndex:
+    """Nearest-property index over a haversine ``BallTree``.
+
+    A BallTree cannot be modified in place, so writes go to a small pending
+    buffer (searched by brute force) and a set of stale tree ids. The tree is
+    rebuilt once the buffer grows past ``REBUILD_THRESHOLD``.
+    """
+
+    def __init__(self):
+        self._tree: Optional[BallTree] = None
+        self._tree_ids = np.empty(0, dtype=np.int64)
+        self._tree_id_set = set()
+        self._pending = {}
+        self._stale = set()
+
+    def rebuild(self, points: List[Tuple[int, float, float]]):
+        """Build the tree from ``(property_id, latitude, longitude)`` rows."""
+        points = [p for p in points if p[1] is not None and p[2] is not None]
+        ids = np.array([p[0] for p in points], dtype=np.int64)
+        tree = None
+        if points:
+            coords = np.radians(np.array([(p[1], p[2]) for p in points], dtype=float))
+            tree = BallTree(coords, metric="haversine")
+        self._tree, self._tree_ids, self._tree_id_set = tree, ids, set(ids.tolist())
+        self._pending, self._stale = {}, set()
+
+    def _compact(self):
+        points = [
+            (int(id), lat, lon)
+            for id, (lat, lon) in zip(self._tree_ids, self._tree_points())
+            if int(id) not in self._stale
+        ]
+        points.extend((id, lat, lon) for id, (lat, lon) in self._pending.items())
+        self.rebuild(points)
+
+    def _tree_points(self):
+        if self._tree is None:
+            return []
+        return np.degrees(np.asarray(self._tree.data))
+
+    def upsert(self, property_id: int, latitude: Optional[float], longitude: Optional[float]):
+        """Add or move a property, or drop it when coordinates were cleared."""
+        self.remove(property_id)
+        if latitude is None or longitude is None:
+            return
+        self._pending[property_id] = (latitude, longitude)
+        if len(self._pending) + len(self._stale) > REBUILD_THRESHOLD:
+            self._compact()
+
+    def remove(self, property_id: int):
+        """Forget a property."""
+        self._pending.pop(property_id, None)
+        if property_id in self._tree_id_set:
+            self._stale.add(property_id)
+
+    def query(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        radius_km: Optional[float] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return up to ``k`` closest ``(property_id, distance_km)`` pairs."""
+        results = []
+
+        if self._tree is not None and len(self._tree_ids):
+            point = np.radians([[latitude, longitude]])
+            if radius_km is not None:
+                indices, distances = self._tree.query_radius(
+                    point, r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True
+                )
+                indices, distances = indices[0][: k + len(self._stale)], distances[0]
+            else:
+                count = min(k + len(self._stale), len(self._tree_ids))
+                distances, indices = self._tree.query(point, k=count)
+                indices, distances = indices[0], distances[0]
+            for index, distance in zip(indices, distances):
+                property_id = int(self._tree_ids[index])
+                if property_id not in self._stale:
+                    results.append((property_id, float(distance) * EARTH_RADIUS_KM))
+
+        if self._pending:
+            ids = list(self._pending)
+            coords = np.radians(np.array([self._pending[id] for id in ids], dtype=float))
+            distances = haversine_km(latitude, longitude, coords)
+            for property_id, distance in zip(ids, distances):
+                if radius_km is None or distance <= radius_km:
+                    results.append((property_id, float(distance)))
+
+        results.sort(key=lambda item: item[1])
+        return results[:k]
+
+    async def load(self):
+        """Build the index from property coordinates."""
+        async with read_only_session() as session:
+            result = await session.execute(
+                select(Property.id, Property.latitude, Property.longitude).where(
+                    Property.latitude.is_not(None), Property.longitude.is_not(None)
+                )
+            )
+            self.rebuild(result.all())
+        logger.info(f"Geo index loaded with {len(self._tree_ids)} properties")
+
+
+geo_index = GeoIndex()
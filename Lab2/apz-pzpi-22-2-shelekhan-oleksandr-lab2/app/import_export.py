@@ -31,11 +31,14 @@ async def reset_sequence(db: Session, table_name: str):
         FROM {table_name};
     """)
     await db.execute(query)
-    await db.commit()
 
 
 async def import_data(file, db: Session):
-    """Import data from an Excel file."""
+    """Import data from an Excel file.
+
+    The whole import runs in the request transaction, a bad row rolls back
+    every sheet instead of leaving a partial import behind.
+    """
     # Read the contents of the uploaded file
     contents = await file.read()
     # Load the Excel file into a dictionary of DataFrames
@@ -63,7 +66,6 @@ async def import_data(file, db: Session):
                     # Create a new record
                     new_record = schema(**data)
                     db.add(model(**new_record.dict()))
-                await db.commit()
 
     # Reset the sequence for each model
     for model in models:
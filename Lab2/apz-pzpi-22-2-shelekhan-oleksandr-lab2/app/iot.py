@@ -1,43 +1,164 @@
 import asyncio
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from cryptography.fernet import Fernet
-from azure.iot.device import Message
 from azure.iot.hub import IoTHubRegistryManager
 from azure.iot.hub.models import CloudToDeviceMethod, CloudToDeviceMethodResult
+from loguru import logger
 from app.core.config import settings
-import uuid
+from app.core.metrics import SMART_LOCK_COMMAND_DURATION
+import random
+import time
 
 
-class SmartLock:
-    _registry_manager = None
+class LockTimeout(Exception):
+    """The lock did not answer within the command timeout."""
+
+
+def parse_lock_id(lock_id: str):
+    """Split a ``device_id:fernet_key`` lock id."""
+    device_id, _, encryption_key = lock_id.partition(":")
+    if not device_id or not encryption_key:
+        raise ValueError("Lock id must look like 'device_id:encryption_key'")
+    return device_id, encryption_key.encode()
+
+
+@lru_cache(maxsize=1024)
+def get_cipher(encryption_key: bytes) -> Fernet:
+    return Fernet(encryption_key)
+
+
+_registry_manager = None
+_registry_manager_lock = threading.Lock()
+
 
+def get_registry_manager() -> IoTHubRegistryManager:
+    """The process-wide registry client, its HTTP session is reused by every call."""
+    global _registry_manager
+    with _registry_manager_lock:
+        if _registry_manager is None:
+            _registry_manager = IoTHubRegistryManager.from_connection_string(
+                f"HostName={settings.IOTHUB_HOST};"
+                f"SharedAccessKeyName={settings.REGISTRY_SHARED_ACCESS_KEY_NAME};"
+                f"SharedAccessKey={settings.REGISTRY_SHARED_ACCESS_KEY}"
+            )
+        return _registry_manager
+
+
+class SmartLock:
     def __init__(self, device_id, encryption_key):
         self.device_id = device_id
         self.encryption_key = encryption_key
-        self.cipher = Fernet(encryption_key)
+        self.cipher = get_cipher(encryption_key)
 
-    def get_registry_url(self):
-        return f"HostName={settings.IOTHUB_HOST};SharedAccessKeyName={settings.REGISTRY_SHARED_ACCESS_KEY_NAME};SharedAccessKey={settings.REGISTRY_SHARED_ACCESS_KEY}"
+    @classmethod
+    def from_lock_id(cls, lock_id: str) -> "SmartLock":
+        return cls(*parse_lock_id(lock_id))
 
-    def registry_manager(self):
-        if self._registry_manager is None:
-            self._registry_manager = IoTHubRegistryManager.from_connection_string(
-                self.get_registry_url()
-            )
-        return self._registry_manager
+    def _stub_response(self, command):
+        # Stands in for IoT Hub in load tests, with the latency of a round trip
+        time.sleep(settings.IOTHUB_STUB_LATENCY)
+        payload = {"result": "ok", "command": command}
+        if command == "get_temperature":
+            payload["temperature"] = round(random.gauss(21.5, 0.5), 2)
+        elif command == "get_temperature_stats":
+            payload["anomalies"] = []
+        return CloudToDeviceMethodResult(status=200, payload=payload)
+
+    def send_command(self, command, timeout: int = None, data: dict = None):
+        """Invoke ``command`` on the device and wait for the answer (blocking).
 
-    def send_command(self, command):
-        registry_manager = self.registry_manager()
+        ``data`` is sent along encrypted like the command, as JSON.
+        """
+        if settings.IOTHUB_STUB:
+            started = time.perf_counter()
+            response = self._stub_response(command)
+            SMART_LOCK_COMMAND_DURATION.labels(command, "ok").observe(
+                time.perf_counter() - started
+            )
+            return response
+        registry_manager = get_registry_manager()
         encrypted_command = self.cipher.encrypt(command.encode())
-        msg = Message(json.dumps({"command": encrypted_command.decode()}))
-        msg.message_id = uuid.uuid4()
-        msg.content_encoding = "utf-8"
-        msg.content_type = "application/json"
-        device_method = CloudToDeviceMethod(method_name=command, payload=msg)
-        response = registry_manager.invoke_device_method(self.device_id, device_method)
+        # The method payload goes over the wire as this JSON string
+        payload = {"command": encrypted_command.decode()}
+        if data is not None:
+            payload["data"] = self.cipher.encrypt(json.dumps(data).encode()).decode()
+        payload = json.dumps(payload)
+        timeout = timeout or settings.IOTHUB_COMMAND_TIMEOUT
+        # IoT Hub gives up on its side too, the thread does not outlive the caller
+        device_method = CloudToDeviceMethod(
+            method_name=command,
+            payload=payload,
+            response_timeout_in_seconds=timeout,
+            connect_timeout_in_seconds=timeout,
+        )
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = registry_manager.invoke_device_method(self.device_id, device_method)
+            outcome = "ok"
+        finally:
+            SMART_LOCK_COMMAND_DURATION.labels(command, outcome).observe(
+                time.perf_counter() - started
+            )
         return response
 
 
+class LockGateway:
+    """Send lock commands without blocking the event loop.
+
+    IoT Hub's registry client is synchronous, so calls run on a bounded thread
+    pool; at most ``IOTHUB_MAX_WORKERS`` commands are in flight per process and
+    the rest queue up. ``SmartLock`` objects (and their ciphers) are kept per
+    lock id.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = None
+        self._locks = {}
+
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="smart-lock"
+            )
+        return self._executor
+
+    def smart_lock(self, lock_id: str) -> SmartLock:
+        smart_lock = self._locks.get(lock_id)
+        if smart_lock is None:
+            smart_lock = self._locks[lock_id] = SmartLock.from_lock_id(lock_id)
+        return smart_lock
+
+    async def send_command(self, lock_id: str, command: str, timeout: int = None):
+        timeout = timeout or settings.IOTHUB_COMMAND_TIMEOUT
+        smart_lock = self.smart_lock(lock_id)
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(
+                    self.executor(), smart_lock.send_command, command, timeout
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Smart lock {smart_lock.device_id} did not answer {command} in {timeout} s"
+            )
+            raise LockTimeout(command)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+lock_gateway = LockGateway(settings.IOTHUB_MAX_WORKERS)
+
+
 if __name__ == "__main__":
     # Використання класу
     lock_id = "5bb6e258:KPH2GIA1nFNTXAsr37/moDk604dm1jJQHr4nC59B4Bk="
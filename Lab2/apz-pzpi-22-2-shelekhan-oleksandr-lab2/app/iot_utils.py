@@ -1,70 +1,325 @@
 from .celery_app import celery_app
-from app.crud.access_code import send_smart_lock_command_admin
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import engine
+from celery import chord
+from concurrent.futures import ThreadPoolExecutor
 from app.email_utils import send_email_task
 from app.iot import SmartLock
 from app.core.config import settings
-from app.models import Property, AccessLog
+from app.models.access_code import AccessCodeRevocation
+from app.models.access_log import AccessLog
+from app.models.property import Property
+from app.models.user import User
+# Column queries configure the mappers too; standalone processes (Celery, the
+# MQTT ingest worker) need every model a relationship names imported first
+from app.models import access_code, booking, notification, payment  # noqa: F401
+from app.access_log_rollups import roll_up_access_logs
+from app.offline_codes import revocation_payload
+from app.partitions import drop_partitions_before, ensure_monthly_partitions, month_start
+from app.telemetry import (
+    detect_anomalies,
+    ensure_partitions,
+    insert_readings,
+    parse_temperature,
+    recent_readings,
+    roll_up,
+)
 from .database_task import DatabaseTask
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select
+from loguru import logger
+from datetime import datetime, timedelta
+import numpy as np
 import json
+import time
 
+# Failures kept per chunk in the sweep summary, the rest are only counted
+MAX_REPORTED_ERRORS = 10
 
-def send_smart_lock_command_admin(db: AsyncSession, lock_id: str, command: str):
-    """Send a command to the smart lock without booking."""
-    device_id = lock_id.split(":")[0]
-    encryption_key = lock_id.split(":")[1].encode()
 
-    smart_lock = SmartLock(device_id, encryption_key)
-    response = smart_lock.send_command(command)
+def get_properties(db):
+    """Properties with a lock and their owner's email, in one query.
 
-    access_log = AccessLog(
-        command=command,
-        response_status=str(response.status),
-        response_message=json.dumps(response.payload),
+    Only the columns the sweep needs: loading ``Property`` entities would also
+    load every booking of every property through the ``selectin`` relationship.
+    """
+    rows = db.execute(
+        select(Property.id, Property.name, Property.lock_id, User.email)
+        .join(User, Property.owner_id == User.id)
+        .where(Property.lock_id.is_not(None))
+        .order_by(Property.id)
     )
+    return [
+        {"id": id, "name": name, "lock_id": lock_id, "owner_email": email}
+        for id, name, lock_id, email in rows
+    ]
 
-    db.add(access_log)
 
-    db.commit()
+def check_property(property):
+    """Read the temperature of one lock.
 
-    return response
+    Returns the access log row to write and the reading, ``None`` if the lock
+    answered without a temperature.
+    """
+    smart_lock = SmartLock.from_lock_id(property["lock_id"])
+    response = smart_lock.send_command("get_temperature")
+    log = {
+        "property_id": property["id"],
+        "device_id": smart_lock.device_id,
+        "command": "get_temperature",
+        "response_status": str(response.status),
+        "response_message": json.dumps(response.payload),
+    }
+    temperature = parse_temperature(response.payload)
+    reading = None
+    if temperature is not None:
+        reading = {
+            "property_id": property["id"],
+            "recorded_at": datetime.utcnow(),
+            "temperature": temperature,
+        }
+    return log, reading
 
 
-def get_properties(db):
-    return db.execute(select(Property).where(Property.lock_id != None)).scalars().all()
-
-
-def process_property(db, property):
-    lock_id = property.lock_id
-    print(f"Checking temperature for property {property.name}")
-    print(f"Lock ID: {lock_id}")
-
-    if lock_id:
-        send_smart_lock_command_admin(db, lock_id, "get_temperature")
-        response = send_smart_lock_command_admin(db, lock_id, "get_temperature_stats")
-        anomalies = response.payload.get("anomalies")
-
-        if anomalies:
-            # write anomalies with in celcius
-            anomalies = [f"{round(anomaly, 2)}°C" for anomaly in anomalies]
-            send_email_task.delay(
-                email_to=property.owner.email,
-                subject="Temperature Anomaly Alert",
-                body=f"Temperature anomalies detected for your property {property.name}: {anomalies}",
-            )
+def find_anomalies(session, property_ids):
+    """Locks whose latest reading is anomalous, with that temperature.
+
+    Scores the last ``TELEMETRY_ANOMALY_LOOKBACK_HOURS`` of every lock in a
+    single vectorized pass instead of trusting the lock's own statistics.
+    """
+    since = datetime.utcnow() - timedelta(hours=settings.TELEMETRY_ANOMALY_LOOKBACK_HOURS)
+    ids, _, values = recent_readings(session, property_ids, since)
+    if not len(ids):
+        return {}
+    mask, _ = detect_anomalies(
+        ids,
+        values,
+        settings.TELEMETRY_ANOMALY_METHOD,
+        settings.TELEMETRY_ANOMALY_WINDOW,
+        settings.TELEMETRY_ANOMALY_THRESHOLD,
+    )
+    # The last reading of each lock is the one just taken
+    last = np.append(np.flatnonzero(np.diff(ids)), len(ids) - 1)
+    flagged = last[mask[last]]
+    return {int(ids[i]): float(values[i]) for i in flagged}
+
+
+def notify_anomalies(property, anomalies):
+    # write anomalies with in celcius
+    anomalies = [f"{round(anomaly, 2)}°C" for anomaly in anomalies]
+    send_email_task.delay(
+        email_to=property["owner_email"],
+        subject="Temperature Anomaly Alert",
+        body=f"Temperature anomalies detected for your property {property['name']}: {anomalies}",
+    )
+
+
+@celery_app.task(name="check_temperature_chunk", bind=True, base=DatabaseTask)
+def check_temperature_chunk(self, properties):
+    """Check a chunk of locks, ``TEMPERATURE_SWEEP_CONCURRENCY`` at a time."""
+    started = time.perf_counter()
+    summary = {"checked": 0, "failed": 0, "anomalies": 0, "errors": []}
+    logs = []
+    readings = []
+
+    def check(property):
+        try:
+            return property, check_property(property), None
+        except Exception as e:
+            return property, None, e
+
+    # Device calls block on the network, threads keep several locks in flight
+    with ThreadPoolExecutor(
+        max_workers=settings.TEMPERATURE_SWEEP_CONCURRENCY
+    ) as executor:
+        for property, result, error in executor.map(check, properties):
+            if error is not None:
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append(
+                        {"property_id": property["id"], "error": repr(error)}
+                    )
+                continue
+            log, reading = result
+            summary["checked"] += 1
+            logs.append(log)
+            if reading is not None:
+                readings.append(reading)
+
+    if not logs:
+        summary["duration"] = round(time.perf_counter() - started, 3)
+        return summary
+
+    # One multi-row insert per table and one commit for the whole chunk
+    session = self.get_session()
+    session.execute(insert(AccessLog), logs)
+    insert_readings(session, readings)
+    session.commit()
+
+    if readings:
+        anomalies = find_anomalies(session, [r["property_id"] for r in readings])
+        for property in properties:
+            if property["id"] in anomalies:
+                summary["anomalies"] += 1
+                notify_anomalies(property, [anomalies[property["id"]]])
+
+    summary["duration"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+@celery_app.task(name="summarize_temperature_sweep")
+def summarize_temperature_sweep(chunk_summaries, started_at):
+    summary = {
+        "locks": 0,
+        "checked": 0,
+        "failed": 0,
+        "anomalies": 0,
+        "chunks": len(chunk_summaries),
+        "slowest_chunk": max((c["duration"] for c in chunk_summaries), default=0),
+        "duration": round(time.time() - started_at, 3),
+        "errors": [],
+    }
+    for chunk in chunk_summaries:
+        for key in ("checked", "failed", "anomalies"):
+            summary[key] += chunk[key]
+        summary["errors"].extend(chunk["errors"])
+    summary["locks"] = summary["checked"] + summary["failed"]
+    log = logger.warning if summary["failed"] else logger.info
+    log(
+        f"Temperature sweep: {summary['checked']}/{summary['locks']} locks checked, "
+        f"{summary['failed']} failed, {summary['anomalies']} with anomalies, "
+        f"{summary['duration']} s over {summary['chunks']} chunks"
+    )
+    return summary
 
 
 @celery_app.task(
     name="check_temperature_task", bind=True, base=DatabaseTask
 )
 def check_temperature_task(self):
+    """Fan the sweep out as a chord of chunks, summarized once all finished."""
+    if settings.TEMPERATURE_SOURCE == "mqtt":
+        # Locks publish their readings, the ingest worker checks them as they arrive
+        logger.info("Temperature sweep skipped, readings come from MQTT")
+        return {"locks": 0, "chunks": 0, "chord_id": None}
+
+    started_at = time.time()
     session = self.get_session()
 
     properties = get_properties(session)
+    if not properties:
+        return {"locks": 0, "chunks": 0, "chord_id": None}
+
+    size = settings.TEMPERATURE_SWEEP_CHUNK_SIZE
+    chunks = [properties[i : i + size] for i in range(0, len(properties), size)]
+    result = chord(check_temperature_chunk.s(chunk) for chunk in chunks)(
+        summarize_temperature_sweep.s(started_at)
+    )
+    logger.info(
+        f"Temperature sweep of {len(properties)} locks started in {len(chunks)} chunks"
+    )
+    return {"locks": len(properties), "chunks": len(chunks), "chord_id": result.id}
+
+
+@celery_app.task(name="roll_up_temperatures", bind=True, base=DatabaseTask)
+def roll_up_temperatures(self):
+    """Refresh the minute and hour buckets touched by recent readings."""
+    session = self.get_session()
+    since = datetime.utcnow() - timedelta(
+        minutes=settings.TELEMETRY_ROLLUP_LOOKBACK_MINUTES
+    )
+    roll_up(session, since)
+    session.commit()
+
+
+@celery_app.task(name="create_temperature_partitions", bind=True, base=DatabaseTask)
+def create_temperature_partitions(self):
+    """Keep monthly partitions ready ahead of the readings."""
+    session = self.get_session()
+    ensure_partitions(session, settings.TELEMETRY_PARTITION_MONTHS_AHEAD)
+    session.commit()
+
+
+@celery_app.task(name="maintain_access_log_partitions", bind=True, base=DatabaseTask)
+def maintain_access_log_partitions(self):
+    """Create the coming months' access log partitions and drop expired ones."""
+    session = self.get_session()
+    ensure_monthly_partitions(
+        session, AccessLog.__tablename__, settings.ACCESS_LOG_PARTITION_MONTHS_AHEAD
+    )
+    dropped = []
+    if settings.ACCESS_LOG_RETENTION_MONTHS > 0:
+        cutoff = month_start(datetime.utcnow().date())
+        for _ in range(settings.ACCESS_LOG_RETENTION_MONTHS):
+            cutoff = month_start(cutoff - timedelta(days=1))
+        dropped = drop_partitions_before(session, AccessLog.__tablename__, cutoff)
+    session.commit()
+    if dropped:
+        logger.info(f"Dropped access log partitions {', '.join(dropped)}")
+    return dropped
 
-    print(f"Properties: {properties}")
 
-    for property in properties:
-        process_property(session, property)
+@celery_app.task(name="roll_up_access_logs", bind=True, base=DatabaseTask)
+def roll_up_access_log_task(self, since: str = None):
+    """Recount the hourly access log rollups of the last few hours, or of
+    every hour from ``since`` (ISO date) on."""
+    session = self.get_session()
+    if since is not None:
+        since = datetime.fromisoformat(since)
+    else:
+        since = datetime.utcnow() - timedelta(
+            hours=settings.ACCESS_LOG_ROLLUP_LOOKBACK_HOURS
+        )
+    roll_up_access_logs(session, since)
+    session.commit()
+
+
+@celery_app.task(
+    name="push_access_code_revocations",
+    bind=True,
+    base=DatabaseTask,
+    max_retries=5,
+    default_retry_delay=60,
+)
+def push_access_code_revocations(self, property_id: int = None):
+    """Send locks the serials of their revoked signed codes.
+
+    The whole list is sent every time, so a lock that missed an update
+    catches up with the next one. Without ``property_id`` every lock with
+    revocations gets its list; revocations of expired codes are dropped first.
+    """
+    session = self.get_session()
+    session.execute(
+        delete(AccessCodeRevocation).where(
+            AccessCodeRevocation.valid_until <= datetime.utcnow()
+        )
+    )
+    session.commit()
+
+    query = (
+        select(Property.id, Property.lock_id, AccessCodeRevocation.serial)
+        .outerjoin(AccessCodeRevocation, AccessCodeRevocation.property_id == Property.id)
+        .where(Property.lock_id.is_not(None))
+    )
+    if property_id is not None:
+        query = query.where(Property.id == property_id)
+    else:
+        query = query.where(AccessCodeRevocation.serial.is_not(None))
+    locks = {}
+    for id, lock_id, serial in session.execute(query):
+        serials = locks.setdefault(id, (lock_id, []))[1]
+        if serial is not None:
+            serials.append(serial)
+
+    failed = []
+    for id, (lock_id, serials) in locks.items():
+        try:
+            response = SmartLock.from_lock_id(lock_id).send_command(
+                "set_revoked_codes", data=revocation_payload(serials)
+            )
+            if not 200 <= (response.status or 0) < 300:
+                raise RuntimeError(f"lock answered {response.status}")
+        except Exception as e:
+            logger.warning(f"Revocations not delivered to the lock of property {id}: {e}")
+            failed.append(id)
+    if failed and property_id is not None:
+        # The periodic push would catch up too, but a revoked code must stop working soon
+        raise self.retry()
+    return {"locks": len(locks), "failed": failed}
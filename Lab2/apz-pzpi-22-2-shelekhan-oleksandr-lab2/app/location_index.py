@@ -0,0 +1,136 @@
+import heapq
+from bisect import bisect_left, insort
+from typing import Iterable, List, Tuple
+from loguru import logger
+from sqlalchemy import select, func
+from app.core.database import read_only_session
+from app.models.property import Property
+
+# Prefixes up to this length match too many keys to rank on every lookup,
+# their ranking is computed once and cached until the counts change
+CACHED_PREFIX_LENGTH = 3
+# Locations kept per cached prefix, the largest limit /locations/suggest takes
+TOP_LOCATIONS = 50
+
+
+def normalize_location(location: str) -> str:
+    """Lower-case a location and collapse whitespace."""
+    return " ".join(location.casefold().split())
+
+
+def word_keys(normalized: str) -> List[str]:
+    """Return the suffixes of a location starting at each word."""
+    keys = [normalized]
+    for i, char in enumerate(normalized):
+        if char == " ":
+            keys.append(normalized[i + 1 :])
+    return keys
+
+
+class LocationIndex:
+    """In-memory prefix index of property locations with listing counts.
+
+    Locations are kept as a sorted array of ``(key, location)`` pairs where a key
+    is the location suffix starting at every word, so "ukr" finds "Kyiv, Ukraine".
+    Lookups are a bisect plus a scan of the matching keys, or a cached ranking
+    for short prefixes, and never touch the database.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, str]] = []
+        self._counts = {}
+        self._labels = {}
+        self._top = {}
+
+    def rebuild(self, locations: Iterable[Tuple[str, int]]):
+        """Replace the index contents with ``(location, count)`` pairs."""
+        counts, labels = {}, {}
+        for location, count in locations:
+            if not location:
+                continue
+            normalized = normalize_location(location)
+            counts[normalized] = counts.get(normalized, 0) + count
+            labels.setdefault(normalized, location.strip())
+
+        keys = sorted(
+            (key, normalized) for normalized in counts for key in word_keys(normalized)
+        )
+        # Swap in one step so concurrent lookups never see a half-built index
+        self._keys, self._counts, self._labels, self._top = keys, counts, labels, {}
+
+    def _invalidate(self, normalized: str):
+        """Forget the cached rankings the location takes part in."""
+        for key in word_keys(normalized):
+            for length in range(1, CACHED_PREFIX_LENGTH + 1):
+                self._top.pop(key[:length], None)
+
+    def add(self, location: str):
+        """Count one more property at the location."""
+        if not location:
+            return
+        normalized = normalize_location(location)
+        self._invalidate(normalized)
+        if normalized in self._counts:
+            self._counts[normalized] += 1
+            return
+        self._counts[normalized] = 1
+        self._labels[normalized] = location.strip()
+        for key in word_keys(normalized):
+            insort(self._keys, (key, normalized))
+
+    def remove(self, location: str):
+        """Count one property less at the location."""
+        if not location:
+            return
+        normalized = normalize_location(location)
+        count = self._counts.get(normalized)
+        if count is None:
+            return
+        self._invalidate(normalized)
+        if count > 1:
+            self._counts[normalized] = count - 1
+            return
+        del self._counts[normalized]
+        del self._labels[normalized]
+        for key in word_keys(normalized):
+            i = bisect_left(self._keys, (key, normalized))
+            if i < len(self._keys) and self._keys[i] == (key, normalized):
+                del self._keys[i]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Return the most listed locations matching the prefix."""
+        prefix = normalize_location(prefix)
+        if not prefix:
+            return []
+
+        if len(prefix) <= CACHED_PREFIX_LENGTH and limit <= TOP_LOCATIONS:
+            best = self._top.get(prefix)
+            if best is None:
+                best = self._top[prefix] = self._rank(prefix, TOP_LOCATIONS)
+            best = best[:limit]
+        else:
+            best = self._rank(prefix, limit)
+        return [
+            {"location": self._labels[loc], "count": self._counts[loc]} for loc in best
+        ]
+
+    def _rank(self, prefix: str, limit: int) -> List[str]:
+        keys = self._keys
+        matches = set()
+        i = bisect_left(keys, (prefix,))
+        while i < len(keys) and keys[i][0].startswith(prefix):
+            matches.add(keys[i][1])
+            i += 1
+        return heapq.nlargest(limit, matches, key=lambda loc: (self._counts[loc], loc))
+
+    async def load(self):
+        """Build the index from ``properties.location``."""
+        async with read_only_session() as session:
+            result = await session.execute(
+                select(Property.location, func.count()).group_by(Property.location)
+            )
+            self.rebuild(result.all())
+        logger.info(f"Location index loaded with {len(self._counts)} locations")
+
+
+location_index = LocationIndex()
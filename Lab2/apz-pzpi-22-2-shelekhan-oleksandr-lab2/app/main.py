@@ -1,5 +1,8 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 import uvicorn
 from app.routers import (
     user,
@@ -10,10 +13,68 @@ from app.routers import (
     exchange,
     access_code,
     notification,
+    admin,
+    telemetry,
+    access_log,
 )
 from app.email_utils import send_email_task
+from app.core.config import settings
+from app.core.instrumentation import (
+    QueryStatsMiddleware,
+    QUERY_COUNT_HEADER,
+    QUERY_TIME_HEADER,
+    QUERY_BUDGET_HEADER,
+    COMMIT_COUNT_HEADER,
+)
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.loop_monitor import LoopMonitor, LoopMonitorMiddleware
+from app.core.profiling import ProfilerMiddleware, PROFILE_ID_HEADER
+from app.iot import lock_gateway
+from app.access_log_writer import access_log_writer
+from app.notification_queue import notification_queue
+from app.location_index import location_index
+from app.geo_index import geo_index
+
+search_indexes = [location_index, geo_index]
+
+
+async def load_search_indexes():
+    for index in search_indexes:
+        try:
+            await index.load()
+        except Exception as e:
+            logger.error(f"Failed to load {type(index).__name__}: {e}")
+
+
+async def refresh_search_indexes(interval: float):
+    # Reload periodically so writes handled by other workers show up
+    while True:
+        await asyncio.sleep(interval)
+        await load_search_indexes()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor = LoopMonitor(
+        settings.LOOP_MONITOR_INTERVAL, settings.LOOP_BLOCK_THRESHOLD
+    )
+    if settings.LOOP_BLOCK_THRESHOLD > 0:
+        loop_monitor.start()
+    await load_search_indexes()
+    refresh_task = asyncio.create_task(
+        refresh_search_indexes(settings.SEARCH_INDEX_REFRESH_SECONDS)
+    )
+    access_log_writer.start()
+    notification_queue.start()
+    yield
+    refresh_task.cancel()
+    await notification_queue.stop()
+    await access_log_writer.stop()
+    lock_gateway.shutdown()
+    loop_monitor.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -22,7 +83,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        QUERY_COUNT_HEADER,
+        QUERY_TIME_HEADER,
+        QUERY_BUDGET_HEADER,
+        COMMIT_COUNT_HEADER,
+        PROFILE_ID_HEADER,
+        "Server-Timing",
+    ],
 )
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(LoopMonitorMiddleware)
 
 app.include_router(user.router)
 app.include_router(login.router)
@@ -32,6 +105,9 @@ app.include_router(payment.router)
 app.include_router(exchange.router)
 app.include_router(access_code.router)
 app.include_router(notification.router)
+app.include_router(admin.router)
+app.include_router(telemetry.router)
+app.include_router(access_log.router)
 
 
 @app.get("/")
@@ -39,5 +115,11 @@ def read_root():
     return {"message": "Welcome to Smart Booking API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
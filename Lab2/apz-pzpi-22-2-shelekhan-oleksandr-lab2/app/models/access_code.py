@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, DateTime
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, Integer, ForeignKey, String, DateTime, PrimaryKeyConstraint
 from app.core.database import Base
 from sqlalchemy.orm import relationship
 
@@ -8,10 +9,29 @@ class AccessCode(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     booking_id = Column(
-        Integer, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False
+        Integer,
+        ForeignKey("bookings.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     code = Column(String, nullable=False, unique=True)
     valid_from = Column(DateTime, nullable=False)
     valid_until = Column(DateTime, nullable=False)
 
     # booking = relationship("Booking", back_populates="access_codes")
+
+
+class AccessCodeRevocation(Base):
+    """Serial of a deleted signed access code, listed for its lock until the
+    code would have expired (see ``app.offline_codes``)."""
+
+    __tablename__ = "access_code_revocations"
+
+    property_id = Column(
+        Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=False
+    )
+    serial = Column(BigInteger, nullable=False)
+    valid_until = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (PrimaryKeyConstraint("property_id", "serial"),)
@@ -1,17 +1,57 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Index, PrimaryKeyConstraint
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 
 class AccessLog(Base):
+    """Append-only log of lock commands and events, range-partitioned by month
+    on ``accessed_at`` so old months are dropped instead of deleted."""
+
     __tablename__ = "access_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
-    access_code_id = Column(Integer, ForeignKey("access_codes.id", ondelete="CASCADE"), nullable=True)
+    # Partitioned tables need the partition key in the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # No foreign keys: entries are written after the fact and must outlive
+    # the code or property they name
+    access_code_id = Column(Integer, nullable=True)
+    # The lock the entry is about; admin commands may have no property
+    property_id = Column(Integer, nullable=True)
+    device_id = Column(String, nullable=True)
     command = Column(String, nullable=False)
     response_status = Column(String, nullable=False)
     response_message = Column(String, nullable=True)
-    accessed_at = Column(DateTime, default=datetime.utcnow)
+    accessed_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Leading columns also serve plain access_code_id / property_id lookups
+        Index("ix_access_logs_access_code_id_accessed_at", "access_code_id", "accessed_at"),
+        Index("ix_access_logs_property_id_accessed_at", "property_id", "accessed_at"),
+        # Rows arrive in time order, a BRIN index stays tiny and prunes time ranges
+        Index("ix_access_logs_accessed_at_brin", "accessed_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (accessed_at)"},
+    )
 
     # access_code = relationship("AccessCode", back_populates="logs")
+
+
+class AccessLogRollup(Base):
+    """Access log entries counted per property, hour, command and status.
+
+    Kept up to date by ``app.access_log_rollups``; daily figures are summed
+    from the hours.
+    """
+
+    __tablename__ = "access_log_rollups"
+
+    property_id = Column(
+        Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=False
+    )
+    hour = Column(DateTime, nullable=False)
+    command = Column(String, nullable=False)
+    response_status = Column(String, nullable=False)
+    count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("property_id", "hour", "command", "response_status"),
+    )
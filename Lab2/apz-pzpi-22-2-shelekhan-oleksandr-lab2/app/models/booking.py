@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, Enum, Float, String, Text
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, Enum, Float, String, Text, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from app.enums.booking_status import BookingStatus
@@ -9,7 +9,7 @@ class Booking(Base):
     __tablename__ = "bookings"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
@@ -20,3 +20,8 @@ class Booking(Base):
     property = relationship("Property", back_populates="bookings", lazy="selectin")
     user = relationship("User", back_populates="bookings", lazy="selectin")
     payment = relationship("Payment", back_populates="booking", uselist=False)
+
+    __table_args__ = (
+        # Leading property_id also serves plain property_id lookups
+        Index("ix_bookings_property_dates", "property_id", "start_date", "end_date"),
+    )
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text, DateTime, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.core.database import Base
 from datetime import datetime
 
+# 'simple' keeps the vector language-agnostic, listings are written in several languages
+SEARCH_CONFIG = "simple"
+
 
 class Property(Base):
     __tablename__ = "properties"
@@ -15,7 +19,30 @@ class Property(Base):
     price = Column(Float, nullable=False)
     location = Column(String, nullable=False)
     lock_id = Column(String, unique=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(location, '')), 'B') || "
+                f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'C')",
+                persisted=True,
+            ),
+        )
+    )
 
     owner = relationship("User", back_populates="properties", lazy="selectin")
     bookings = relationship("Booking", back_populates="property", lazy="selectin")
+
+    __table_args__ = (
+        Index("ix_properties_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_properties_location_trgm",
+            "location",
+            postgresql_using="gin",
+            postgresql_ops={"location": "gin_trgm_ops"},
+        ),
+    )
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, PrimaryKeyConstraint
+from app.core.database import Base
+
+
+class TemperatureReading(Base):
+    """Raw lock temperatures, range-partitioned by month on ``recorded_at``.
+
+    Partitions are created ahead of time by ``app.telemetry.ensure_partitions``;
+    the primary key makes a re-delivered reading a no-op.
+    """
+
+    __tablename__ = "temperature_readings"
+
+    property_id = Column(
+        Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=False
+    )
+    recorded_at = Column(DateTime, nullable=False)
+    temperature = Column(Float, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("property_id", "recorded_at"),
+        {"postgresql_partition_by": "RANGE (recorded_at)"},
+    )
+
+
+class TemperatureRollup(Base):
+    """Per-minute and per-hour aggregates of the readings.
+
+    The sum is stored instead of the mean so hours can be built from minutes
+    and partial buckets can be recomputed.
+    """
+
+    __tablename__ = "temperature_rollups"
+
+    property_id = Column(
+        Integer, ForeignKey("properties.id", ondelete="CASCADE"), nullable=False
+    )
+    resolution = Column(String, nullable=False)  # 'minute' or 'hour'
+    bucket = Column(DateTime, nullable=False)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+
+    __table_args__ = (PrimaryKeyConstraint("property_id", "resolution", "bucket"),)
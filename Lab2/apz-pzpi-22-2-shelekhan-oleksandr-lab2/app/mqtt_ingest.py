@@ -0,0 +1,311 @@
+"""Ingest lock telemetry and events published over MQTT.
+
+    python -m app.mqtt_ingest
+
+Locks publish to ``<MQTT_TOPIC_PREFIX>/<device_id>/telemetry`` (a reading,
+``{"temperature": 21.4, "ts": 1760889600}``) and ``.../events`` (lock events,
+``{"event": "unlocked", ...}``). Payloads are Fernet tokens made with the key
+of the lock id, ``ts`` defaults to the time the token was made.
+
+Rows are buffered and written in one transaction per batch, readings to
+``temperature_readings`` and events to ``access_logs``. Messages are QoS 1 and
+only acknowledged once their batch is committed, so a crash or a database
+outage redelivers them instead of losing them; readings are idempotent, an
+event may be logged twice. A batch the database rejects (e.g. a reading of a
+property deleted since the devices were loaded) is written row by row, and
+the rows it still rejects are logged and acknowledged. After each batch the locks that sent readings are
+checked for anomalies and their owners alerted.
+"""
+import json
+import signal
+import socket
+import threading
+import time
+from datetime import datetime
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from cryptography.fernet import InvalidToken
+from loguru import logger
+from prometheus_client import start_http_server
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import MQTT_BATCH_WRITE_DURATION, MQTT_MESSAGES
+from app.database_task import engine
+from app.iot import get_cipher, parse_lock_id
+from app.iot_utils import find_anomalies, get_properties, notify_anomalies
+from app.models.access_log import AccessLog
+from app.telemetry import insert_readings, parse_temperature
+
+KINDS = ("telemetry", "events")
+# Seconds the broker keeps our subscription and queues messages while we are away
+SESSION_EXPIRY = 3600
+# Seconds between two attempts to write a batch while the database is down
+WRITE_RETRY_DELAY = 1.0
+# Errors worth retrying the same rows for, the others come from the rows
+RETRIED_ERRORS = (OperationalError, InterfaceError)
+
+
+class DeviceDirectory:
+    """Properties with a lock by device id, with the lock's cipher."""
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self.devices = {}
+        self.properties = {}
+        self.loaded_at = 0.0
+
+    def load(self) -> bool:
+        """Reload the locks; on a database error the previous ones are kept
+        until the next refresh."""
+        try:
+            with Session(engine) as session:
+                properties = get_properties(session)
+        except SQLAlchemyError as e:
+            logger.error(f"Loading the locks failed, keeping {len(self.devices)}: {e}")
+            # Not before the next refresh, every unknown lock would wait for it
+            self.loaded_at = time.monotonic()
+            return False
+        devices = {}
+        for property in properties:
+            try:
+                device_id, encryption_key = parse_lock_id(property["lock_id"])
+                devices[device_id] = (property, get_cipher(encryption_key))
+            except ValueError as e:
+                logger.warning(f"Ignoring the lock of property {property['id']}: {e}")
+        self.devices = devices
+        self.properties = {property["id"]: property for property, _ in devices.values()}
+        self.loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(devices)} locks")
+        return True
+
+    @property
+    def stale(self) -> bool:
+        return time.monotonic() - self.loaded_at > self.refresh_seconds
+
+    def get(self, device_id: str):
+        if device_id not in self.devices and self.stale:
+            # Possibly a lock added since the last load
+            self.load()
+        return self.devices.get(device_id)
+
+
+class Ingestor:
+    def __init__(self):
+        self.directory = DeviceDirectory(settings.MQTT_DEVICE_REFRESH_SECONDS)
+        # (mid, qos, kind, row) of received messages not written yet
+        self.pending = []
+        self.condition = threading.Condition()
+        self.stopping = threading.Event()
+        # Property id -> monotonic time of the last alert
+        self.alerted = {}
+
+        self.client = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2,
+            client_id=f"{settings.MQTT_CLIENT_ID}-{socket.gethostname()}",
+            protocol=mqtt.MQTTv5,
+            manual_ack=True,
+        )
+        if settings.MQTT_USERNAME:
+            self.client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+
+    def topics(self):
+        group = settings.MQTT_SHARE_GROUP
+        share = f"$share/{group}/" if group else ""
+        return [(f"{share}{settings.MQTT_TOPIC_PREFIX}/+/{kind}", 1) for kind in KINDS]
+
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            logger.error(f"MQTT connection refused: {reason_code}")
+            return
+        client.subscribe(self.topics())
+        logger.info(f"Connected to {settings.MQTT_HOST}:{settings.MQTT_PORT}")
+
+    def on_disconnect(self, client, userdata, flags, reason_code, properties):
+        if not self.stopping.is_set():
+            logger.warning(f"MQTT connection lost ({reason_code}), reconnecting")
+
+    def decode(self, device_id: str, kind: str, message):
+        """``(row, outcome)`` of a message, the row is ``None`` if it is dropped."""
+        device = self.directory.get(device_id)
+        if device is None:
+            return None, "unknown_device"
+        property, cipher = device
+        try:
+            data = json.loads(cipher.decrypt(message.payload))
+            timestamp = data.get("ts") or cipher.extract_timestamp(message.payload)
+            recorded_at = datetime.utcfromtimestamp(float(timestamp))
+        except (InvalidToken, ValueError, TypeError, AttributeError, OverflowError, OSError):
+            return None, "invalid"
+        skew = (recorded_at - datetime.utcnow()).total_seconds()
+        if not -settings.MQTT_MAX_MESSAGE_AGE_SECONDS <= skew <= settings.MQTT_MAX_CLOCK_SKEW_SECONDS:
+            return None, "bad_timestamp"
+
+        if kind == "telemetry":
+            temperature = parse_temperature(data)
+            if temperature is None:
+                return None, "invalid"
+            return {
+                "property_id": property["id"],
+                "recorded_at": recorded_at,
+                "temperature": temperature,
+            }, "accepted"
+        if not isinstance(data.get("event"), str):
+            return None, "invalid"
+        return {
+            "property_id": property["id"],
+            "device_id": device_id,
+            "command": data["event"],
+            "response_status": "event",
+            "response_message": json.dumps(data),
+            "accessed_at": recorded_at,
+        }, "accepted"
+
+    def on_message(self, client, userdata, message):
+        # <prefix>/<device_id>/<kind>, the subscriptions only match those
+        _, device_id, kind = message.topic.rsplit("/", 2)
+        try:
+            row, outcome = self.decode(device_id, kind, message)
+        except Exception as e:
+            # Raised into paho it would end the network thread, and the ingest
+            logger.exception(f"Dropping a {kind} message of {device_id}: {e}")
+            row, outcome = None, "error"
+        MQTT_MESSAGES.labels(kind, outcome).inc()
+        if row is None:
+            # Nothing to keep, a redelivery would be dropped again
+            client.ack(message.mid, message.qos)
+            return
+        with self.condition:
+            self.pending.append((message.mid, message.qos, kind, row))
+            if len(self.pending) >= settings.MQTT_BATCH_SIZE:
+                self.condition.notify()
+
+    def commit(self, batch):
+        """Write a batch in one transaction, retrying while the database is
+        unreachable; ``False`` if stopped before it was committed."""
+        readings = [row for _, _, kind, row in batch if kind == "telemetry"]
+        logs = [row for _, _, kind, row in batch if kind == "events"]
+        while True:
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    insert_readings(session, readings)
+                    if logs:
+                        session.execute(insert(AccessLog), logs)
+                    session.commit()
+                MQTT_BATCH_WRITE_DURATION.observe(time.perf_counter() - started)
+                return True
+            except RETRIED_ERRORS as e:
+                logger.error(f"Writing {len(batch)} rows failed, retrying: {e}")
+                if self.stopping.wait(WRITE_RETRY_DELAY):
+                    return False
+
+    def write(self, batch) -> bool:
+        """Write and acknowledge a batch; rows the database rejects are
+        written one by one and the failing ones dropped."""
+        try:
+            if not self.commit(batch):
+                # Unacknowledged, the broker delivers them again next time
+                return False
+            written = batch
+        except SQLAlchemyError as e:
+            logger.error(f"Writing {len(batch)} rows failed, writing them one by one: {e}")
+            # A property may be gone, reload the devices after this batch
+            self.directory.loaded_at = float("-inf")
+            written = []
+            for item in batch:
+                try:
+                    if not self.commit([item]):
+                        return False
+                    written.append(item)
+                except SQLAlchemyError as e:
+                    logger.error(f"Dropped {item[2]} row {item[3]!r}: {e}")
+                mid, qos, _, _ = item
+                self.client.ack(mid, qos)
+        else:
+            for mid, qos, _, _ in batch:
+                self.client.ack(mid, qos)
+
+        property_ids = {row["property_id"] for _, _, kind, row in written if kind == "telemetry"}
+        if property_ids:
+            self.alert(property_ids)
+        return True
+
+    def alert(self, property_ids):
+        try:
+            with Session(engine) as session:
+                anomalies = find_anomalies(session, list(property_ids))
+        except SQLAlchemyError as e:
+            logger.error(f"Anomaly check failed: {e}")
+            return
+        now = time.monotonic()
+        for property_id, temperature in anomalies.items():
+            last = self.alerted.get(property_id)
+            if last is not None and now - last < settings.MQTT_ALERT_COOLDOWN_SECONDS:
+                continue
+            property = self.directory.properties.get(property_id)
+            if property is not None:
+                self.alerted[property_id] = now
+                try:
+                    notify_anomalies(property, [temperature])
+                except Exception as e:
+                    # The readings are written, a broker outage must not stop the ingest
+                    logger.error(f"Alerting the owner of property {property_id} failed: {e}")
+
+    def next_batch(self):
+        with self.condition:
+            self.condition.wait_for(
+                lambda: len(self.pending) >= settings.MQTT_BATCH_SIZE
+                or self.stopping.is_set(),
+                timeout=settings.MQTT_BATCH_INTERVAL,
+            )
+            batch, self.pending = self.pending, []
+        return batch
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self):
+        # Without the locks every message would be dropped as unknown
+        while not self.directory.load():
+            if self.stopping.wait(WRITE_RETRY_DELAY):
+                return
+        properties = Properties(PacketTypes.CONNECT)
+        properties.SessionExpiryInterval = SESSION_EXPIRY
+        # Unacknowledged messages the broker may send us, room for two batches
+        properties.ReceiveMaximum = min(2 * settings.MQTT_BATCH_SIZE, 65535)
+        self.client.connect(
+            settings.MQTT_HOST,
+            settings.MQTT_PORT,
+            clean_start=False,
+            properties=properties,
+        )
+        self.client.loop_start()
+        try:
+            while not self.stopping.is_set():
+                batch = self.next_batch()
+                if batch:
+                    self.write(batch)
+                if self.directory.stale:
+                    self.directory.load()
+            batch = self.next_batch()
+            if batch:
+                self.write(batch)
+        finally:
+            self.client.disconnect()
+            self.client.loop_stop()
+            logger.info("MQTT ingest stopped")
+
+
+if __name__ == "__main__":
+    ingestor = Ingestor()
+    signal.signal(signal.SIGTERM, ingestor.stop)
+    signal.signal(signal.SIGINT, ingestor.stop)
+    if settings.MQTT_METRICS_PORT:
+        start_http_server(settings.MQTT_METRICS_PORT)
+    ingestor.run()
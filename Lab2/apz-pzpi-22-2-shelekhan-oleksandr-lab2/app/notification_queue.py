@@ -0,0 +1,85 @@
+"""Notifications written after the response, off the request path.
+
+Endpoints that only inform users of what happened (a door opened) hand their
+notifications to ``notification_queue`` instead of inserting them in the
+request's transaction. A background task inserts whatever has queued up with
+one INSERT and commit per batch. Like the in-memory access log buffer,
+notifications not written yet are lost if the process dies.
+"""
+import asyncio
+import time
+from datetime import datetime
+from loguru import logger
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.metrics import DOOR_COMMAND_STAGE_DURATION
+from app.models.notification import Notification
+
+
+class NotificationQueue:
+    def __init__(self, batch_size: int, max_size: int):
+        self.batch_size = batch_size
+        # (rows, command, time queued) per emit
+        self.queue = asyncio.Queue(max_size)
+        self.task = None
+        self.writing = None
+
+    async def emit(self, rows, command: str):
+        """Queue ``{user_id, message, type}`` rows; waits only when full."""
+        created_at = datetime.utcnow()
+        rows = [{**row, "created_at": created_at} for row in rows]
+        await self.queue.put((rows, command, time.perf_counter()))
+
+    def _drain(self, first):
+        items = [first]
+        count = len(first[0])
+        while count < self.batch_size and not self.queue.empty():
+            item = self.queue.get_nowait()
+            items.append(item)
+            count += len(item[0])
+        return items
+
+    async def write(self, items):
+        rows = [row for item_rows, _, _ in items for row in item_rows]
+        async with async_session() as session:
+            await session.execute(insert(Notification), rows)
+            await session.commit()
+        written = time.perf_counter()
+        for _, command, queued in items:
+            DOOR_COMMAND_STAGE_DURATION.labels(command, "notify").observe(written - queued)
+
+    async def _write_logged(self, items):
+        try:
+            await self.write(items)
+        except Exception as e:
+            logger.error(f"Dropped {len(items)} notification batches: {e}")
+
+    async def run(self):
+        while True:
+            items = self._drain(await self.queue.get())
+            # Shielded, a shutdown waits for the batch instead of losing it
+            self.writing = asyncio.ensure_future(self._write_logged(items))
+            await asyncio.shield(self.writing)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the background task and write what is still queued."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.writing is not None:
+            await self.writing
+        while not self.queue.empty():
+            await self._write_logged(self._drain(self.queue.get_nowait()))
+
+
+notification_queue = NotificationQueue(
+    settings.NOTIFICATION_BATCH_SIZE, settings.NOTIFICATION_QUEUE_SIZE
+)
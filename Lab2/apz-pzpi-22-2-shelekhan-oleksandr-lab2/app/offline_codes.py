@@ -0,0 +1,123 @@
+"""Access codes a lock can verify by itself, without asking the server.
+
+A code carries its own validity window and is signed with a secret only the
+server and the lock know, derived (HKDF-SHA256) from the lock's Fernet key,
+which the lock already holds:
+
+    version (1 byte) | serial (4) | valid from, hours since epoch (4)
+    | valid hours (2) | HMAC-SHA256 of the above, truncated (8)
+
+base32 encoded without padding, 31 characters. The lock recomputes the HMAC,
+checks the window against its clock and looks the serial up in the revocation
+list the server pushes to it (``set_revoked_codes``, see
+``revocation_payload``). ``verify_code`` is the reference for the lock's side.
+
+The server stays the only issuer and keeps validating codes online as well;
+revoking a code deletes it here and lists its serial for the lock until the
+code would have expired.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import struct
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, Optional
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+VERSION = 1
+HEADER = struct.Struct(">BIIH")
+MAC_SIZE = 8
+EPOCH = datetime(1970, 1, 1)
+HOUR = timedelta(hours=1)
+MAX_HOURS = 0xFFFF
+
+
+@lru_cache(maxsize=1024)
+def derive_lock_secret(encryption_key: bytes) -> bytes:
+    """The signing secret of a lock, from the Fernet key in its lock id."""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"smart-booking access codes v1",
+    ).derive(base64.urlsafe_b64decode(encryption_key))
+
+
+def _sign(secret: bytes, header: bytes) -> bytes:
+    return hmac.new(secret, header, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def _encode(data: bytes) -> str:
+    return base64.b32encode(data).decode().rstrip("=")
+
+
+def normalize_code(code: str) -> str:
+    """A code as typed, without surrounding whitespace and in upper case;
+    every check compares codes in this form."""
+    return code.strip().upper()
+
+
+def _decode(code: str) -> bytes:
+    code = normalize_code(code)
+    return base64.b32decode(code + "=" * (-len(code) % 8))
+
+
+def issue_code(
+    secret: bytes, valid_from: datetime, valid_until: datetime, serial: int = None
+) -> str:
+    """A signed code valid between two UTC times, widened to whole hours."""
+    serial = secrets.randbits(32) if serial is None else serial
+    start = (valid_from - EPOCH) // HOUR
+    end = -((EPOCH - valid_until) // HOUR)
+    hours = end - start
+    if not 0 < hours <= MAX_HOURS:
+        raise ValueError(f"An access code is valid for 1 to {MAX_HOURS} hours")
+    header = HEADER.pack(VERSION, serial, start, hours)
+    return _encode(header + _sign(secret, header))
+
+
+def parse_code(code: str):
+    """``(serial, valid_from, valid_until)`` of a signed code, unverified;
+    ``None`` if it is not one."""
+    try:
+        data = _decode(code)
+    except (ValueError, TypeError):
+        return None
+    if len(data) != HEADER.size + MAC_SIZE:
+        return None
+    version, serial, start, hours = HEADER.unpack(data[: HEADER.size])
+    if version != VERSION:
+        return None
+    valid_from = EPOCH + start * HOUR
+    return serial, valid_from, valid_from + hours * HOUR
+
+
+def verify_code(
+    secret: bytes, code: str, now: datetime, revoked: Iterable[int] = ()
+) -> Optional[int]:
+    """The serial of a code that opens the lock now (UTC), else ``None``.
+
+    Valid from ``valid_from`` up to, not including, ``valid_until``.
+    """
+    parsed = parse_code(code)
+    if parsed is None:
+        return None
+    data = _decode(code)
+    header, mac = data[: HEADER.size], data[HEADER.size :]
+    if not hmac.compare_digest(mac, _sign(secret, header)):
+        return None
+    serial, valid_from, valid_until = parsed
+    if not valid_from <= now < valid_until or serial in set(revoked):
+        return None
+    return serial
+
+
+def revocation_payload(serials: Iterable[int]) -> dict:
+    """The revocation list sent to a lock, the whole list every time: sorted
+    serials packed as big-endian uint32, base64 encoded."""
+    serials = sorted(set(serials))
+    packed = struct.pack(f">{len(serials)}I", *serials)
+    return {"revoked": base64.b64encode(packed).decode(), "count": len(serials)}
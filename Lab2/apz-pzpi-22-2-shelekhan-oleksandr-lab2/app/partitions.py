@@ -0,0 +1,105 @@
+"""Monthly range partitions: creation ahead of time and retention.
+
+Partitions are named ``<table>_YYYY_MM`` and cover one calendar month of the
+parent's partition key. Dropping a whole partition is how old rows are
+removed, no DELETE and no vacuum afterwards.
+
+Rows outside every monthly partition go to the table's default partition.
+Postgres refuses to create a partition for a range the default partition
+already has rows in, so those rows are moved into the new partition before
+it is attached.
+"""
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import text
+
+PARTITIONS_QUERY = text(
+    """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    WHERE p.relname = :table
+    """
+)
+# Partition key column and default partition of a range-partitioned table
+PARTITIONING_QUERY = text(
+    """
+    SELECT a.attname, d.relname
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    LEFT JOIN pg_class d ON d.oid = pt.partdefid
+    WHERE pt.partrelid = CAST(:table AS regclass)
+    """
+)
+COLUMNS_QUERY = text(
+    """
+    SELECT attname FROM pg_attribute
+    WHERE attrelid = CAST(:table AS regclass) AND attnum > 0 AND NOT attisdropped
+    ORDER BY attnum
+    """
+)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def ensure_monthly_partitions(
+    connection, table: str, months_ahead: int, first_month: Optional[date] = None
+):
+    """Create the partitions from ``first_month`` (this month by default) to
+    ``months_ahead`` months from now. Works on a synchronous connection."""
+    this_month = month_start(datetime.utcnow().date())
+    month = month_start(first_month or this_month)
+    last = this_month
+    for _ in range(months_ahead):
+        last = next_month(last)
+    key, default = connection.execute(PARTITIONING_QUERY, {"table": table}).one()
+    while month <= last:
+        following = next_month(month)
+        name = partition_name(table, month)
+        bounds = f"FOR VALUES FROM ('{month}') TO ('{following}')"
+        if default is None:
+            connection.execute(
+                text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} {bounds}")
+            )
+        elif connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            # Built detached: rows of the month may be waiting in the default partition
+            columns = ", ".join(connection.execute(COLUMNS_QUERY, {"table": table}).scalars())
+            connection.execute(
+                text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            )
+            connection.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {default} "
+                    f"WHERE {key} >= '{month}' AND {key} < '{following}' RETURNING *) "
+                    f"INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+                )
+            )
+            connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds}"))
+        month = following
+
+
+def drop_partitions_before(connection, table: str, before: date) -> List[str]:
+    """Drop the monthly partitions that end on or before ``before``."""
+    pattern = re.compile(rf"^{re.escape(table)}_(\d{{4}})_(\d{{2}})$")
+    dropped = []
+    for name in connection.execute(PARTITIONS_QUERY, {"table": table}).scalars():
+        match = pattern.match(name)
+        if not match:
+            continue
+        month = date(int(match[1]), int(match[2]), 1)
+        if next_month(month) <= before:
+            connection.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return sorted(dropped)
@@ -1,6 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import Booking
 from app.crud import (
     access_code as access_code_crud,
     booking as booking_crud,
@@ -8,11 +7,14 @@ from app.crud import (
 )
 from app.crud import notification as notification_crud
 from app.core.database import get_db
+from app.core.instrumentation import query_budget
+from app.core.metrics import StageTimer
+from app.notification_queue import notification_queue
+from app import access_code_cache
 from datetime import datetime
 from app.dependencies import role_required, get_current_user
 from app.iot_utils import check_temperature_task
 from app.enums.user_role import Role
-from app.iot import SmartLock
 from app.schemas.notification import NotificationCreate
 import json
 
@@ -35,7 +37,7 @@ async def generate_access_code(
 
     if booking.start_date <= datetime.utcnow().date() <= booking.end_date:
         access_code = await access_code_crud.create_access_code(
-            booking_id=booking.id,
+            booking=booking,
             valid_from=booking.start_date,
             valid_until=booking.end_date,
             db=db,
@@ -80,7 +82,7 @@ async def delete_access_code(
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
-    await access_code_crud.delete_access_code(booking_id, db)
+    await access_code_crud.delete_access_code(db, booking_id)
 
     # Notification for guest
     await notification_crud.create_notification(
@@ -121,85 +123,99 @@ async def validate_access_code(
     current_user=Depends(get_current_user),
 ):
     """Validate an access code for a booking."""
-    booking = await booking_crud.get_booking(db, booking_id, current_user)
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
+    entry = await access_code_crud.find_access_code(db, booking_id)
+    # The cached code says who may check it, the booking is only loaded without one
+    if entry is None or not access_code_crud.can_check_access_code(entry, current_user):
+        await booking_crud.get_booking(db, booking_id, current_user)
+    if entry is None:
+        return {"is_valid": False}
+    return {"is_valid": access_code_cache.matches(entry, access_code)}
 
-    is_valid = await access_code_crud.is_access_code_valid(db, booking_id, access_code)
-    return {"is_valid": is_valid}
+
+async def send_door_command(
+    db: AsyncSession, booking_id: int, code: str, user, command: str, response: Response
+):
+    """Check the booking and code, and return once the lock acknowledged.
+
+    Notifications and the access log entry are queued and written after the
+    response; the stages are timed in ``Server-Timing``.
+    """
+    timer = StageTimer(command)
+    door = await booking_crud.get_door(db, booking_id, user)
+    timer.mark("booking")
+
+    entry = await access_code_crud.find_access_code(db, booking_id)
+    if entry is None or not access_code_cache.matches(entry, code):
+        await access_code_crud.log_denied_access(door, command)
+        raise HTTPException(status_code=403, detail="Access code is not valid")
+    timer.mark("code")
+
+    await access_code_crud.send_smart_lock_command(door, command, entry["id"])
+    timer.mark("lock")
+
+    response.headers["Server-Timing"] = timer.header()
+    return door
 
 
 # send open command to the door
 @router.post("/{booking_id}/open_door")
+@query_budget(2)
 async def open_door(
     booking_id: int,
     access_code: str,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     """Open the door for a booking."""
-    booking = await booking_crud.get_booking(db, booking_id, current_user)
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-
-    is_valid = await access_code_crud.is_access_code_valid(db, booking_id, access_code)
-    if not is_valid:
-        raise HTTPException(status_code=403, detail="Access code is not valid")
-
-    response = await access_code_crud.send_smart_lock_command(db, booking, "open_lock")
-
-    # Notification for guest
-    await notification_crud.create_notification(
-        db,
-        NotificationCreate(
-            user_id=booking.user.id,
-            message=f"Smart lock opened for '{booking.property.name}'. Welcome!",
-            type="info",
-        ),
+    door = await send_door_command(
+        db, booking_id, access_code, current_user, "open_lock", response
     )
-
-    # Notification for owner
-    await notification_crud.create_notification(
-        db,
-        NotificationCreate(
-            user_id=booking.property.owner.id,
-            message=f"Guest accessed '{booking.property.name}' using smart lock.",
-            type="info",
-        ),
+    await notification_queue.emit(
+        [
+            # Notification for guest
+            {
+                "user_id": door.user_id,
+                "message": f"Smart lock opened for '{door.property_name}'. Welcome!",
+                "type": "info",
+            },
+            # Notification for owner
+            {
+                "user_id": door.owner_id,
+                "message": f"Guest accessed '{door.property_name}' using smart lock.",
+                "type": "info",
+            },
+        ],
+        "open_lock",
     )
-
     return {"message": "Door opened"}
 
 
 # send close command to the door
 @router.post("/{booking_id}/close_door")
+@query_budget(2)
 async def close_door(
     booking_id: int,
     access_code: str,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     """Close the door for a booking."""
-    booking = await booking_crud.get_booking(db, booking_id, current_user)
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-
-    is_valid = await access_code_crud.is_access_code_valid(db, booking_id, access_code)
-    if not is_valid:
-        raise HTTPException(status_code=403, detail="Access code is not valid")
-
-    response = await access_code_crud.send_smart_lock_command(db, booking, "close_lock")
-
-    # Notification for guest
-    await notification_crud.create_notification(
-        db,
-        NotificationCreate(
-            user_id=booking.user.id,
-            message=f"Smart lock secured for '{booking.property.name}'.",
-            type="info",
-        ),
+    door = await send_door_command(
+        db, booking_id, access_code, current_user, "close_lock", response
+    )
+    await notification_queue.emit(
+        [
+            # Notification for guest
+            {
+                "user_id": door.user_id,
+                "message": f"Smart lock secured for '{door.property_name}'.",
+                "type": "info",
+            },
+        ],
+        "close_lock",
     )
-
     return {"message": "Door closed"}
 
 
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import access_logs as access_logs_crud
+from app.core.database import get_db
+from app.dependencies import role_required
+from app.enums.user_role import Role
+from app.models.user import User
+from app.routers.telemetry import check_property_access, time_range
+from app.schemas.access_log import AccessLogPage, AccessLogRollup
+from datetime import datetime
+from typing import List, Literal, Optional
+
+router = APIRouter(
+    prefix="/access-logs",
+    tags=["access-logs"],
+)
+
+
+@router.get("", response_model=AccessLogPage)
+async def read_access_logs(
+    property_id: Optional[int] = None,
+    device_id: Optional[str] = None,
+    access_code_id: Optional[int] = None,
+    command: Optional[str] = None,
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(role_required([Role.OWNER, Role.ADMIN])),
+):
+    """Lock activity between two times (the last day by default), newest
+    first. Owners only see their own properties; pass ``next_cursor`` back as
+    ``cursor`` for the following page."""
+    if property_id is not None:
+        await check_property_access(db, property_id, current_user)
+    start, end = time_range(start, end)
+    logs, next_cursor = await access_logs_crud.get_access_logs(
+        db,
+        current_user,
+        start,
+        end,
+        property_id=property_id,
+        device_id=device_id,
+        access_code_id=access_code_id,
+        command=command,
+        response_status=status,
+        limit=limit,
+        cursor=cursor,
+    )
+    return {"items": logs, "next_cursor": next_cursor}
+
+
+@router.get("/{property_id}/rollups", response_model=List[AccessLogRollup])
+async def read_access_log_rollups(
+    property_id: int,
+    resolution: Literal["hour", "day"] = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(role_required([Role.OWNER, Role.ADMIN])),
+):
+    """Entries of a property per hour or day, command and status."""
+    await check_property_access(db, property_id, current_user)
+    start, end = time_range(start, end)
+    return await access_logs_crud.get_access_log_rollups(
+        db, property_id, resolution, start, end
+    )
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.core.database import engine, replica_engines
+from app.core.instrumentation import pool_status
+from app.core.profiling import get_profile_path, list_profiles
+from app.dependencies import role_required
+from app.enums.user_role import Role
+from app.schemas.user import User
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+)
+
+
+@router.get("/db-pool")
+async def get_db_pool_status(
+    current_admin: User = Depends(role_required([Role.ADMIN])),
+):
+    """Connection pool occupancy and checkout wait times of this worker."""
+    return {
+        "primary": pool_status(engine),
+        "replicas": [pool_status(replica) for replica in replica_engines],
+    }
+
+
+@router.get("/profiles")
+async def get_profiles(
+    current_admin: User = Depends(role_required([Role.ADMIN])),
+):
+    """Stored request profiles, newest first."""
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    current_admin: User = Depends(role_required([Role.ADMIN])),
+):
+    """Download a profile as speedscope JSON (open it in https://www.speedscope.app)."""
+    path = get_profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=path.split("/")[-1])
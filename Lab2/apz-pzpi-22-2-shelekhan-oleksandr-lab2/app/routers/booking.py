@@ -12,6 +12,7 @@ from app.reports import generate_owner_report, generate_booking_report
 from app.models.user import User
 from app.enums.booking_status import BookingStatus
 from app.schemas.notification import NotificationCreate
+from app.core.instrumentation import query_budget
 
 router = APIRouter(
     prefix="/bookings",
@@ -76,19 +77,21 @@ async def create_new_booking(
 
 
 @router.get("/", response_model=List[Booking])
+@query_budget(2)
 async def read_bookings(
     db: AsyncSession = Depends(get_db), current_user=Depends(get_current_user)
 ):
     # Fetch all bookings for the current user
-    return await booking_crud.get_bookings(db, current_user)
+    return await booking_crud.list_bookings(db, current_user)
 
 
 @router.get("/owner", response_model=List[Booking])
+@query_budget(2)
 async def get_bookings_for_owner(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(role_required([Role.OWNER])),
 ):
-    return await booking_crud.get_owner_bookings(db, current_user.id)
+    return await booking_crud.list_owner_bookings(db, current_user.id)
 
 
 @router.get("/{booking_id}", response_model=Booking)
@@ -314,6 +317,7 @@ async def reject_booking(
 
 
 @router.get("/admin/all", response_model=List[Booking])
+@query_budget(2)
 async def get_all_bookings_for_admin(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(role_required([Role.ADMIN])),
@@ -6,6 +6,7 @@ from app.schemas.notification import Notification
 from app.crud import notification as notification_crud
 from app.models.user import User
 from typing import List
+from app.core.instrumentation import query_budget
 
 router = APIRouter(
     prefix="/notifications",
@@ -14,6 +15,7 @@ router = APIRouter(
 
 
 @router.get("/", response_model=List[Notification])
+@query_budget(2)
 async def get_my_notifications(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -12,6 +12,7 @@ from typing import List
 from app.schemas.booking import Booking
 from app.schemas.user import User
 from app.schemas.notification import NotificationCreate
+from app.core.instrumentation import query_budget
 
 router = APIRouter(
     prefix="/payments",
@@ -90,6 +91,7 @@ async def delete_payment(
 
 
 @router.get("/", response_model=List[Payment])
+@query_budget(2)
 async def get_user_payments(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from app.crud import property as property_crud
 from app.crud import notification as notification_crud
 from app.schemas.property import (
@@ -7,15 +7,20 @@ from app.schemas.property import (
     PropertyUpdate,
     PropertyWithAvailabilityPeriods,
     AvailabilityPeriod,
+    LocationSuggestion,
+    PropertyWithDistance,
 )
 from app.core.database import get_db
 from app.dependencies import role_required, check_not_blocked
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
+from datetime import date
 from app.enums.user_role import Role
 from app.models.user import User
 from app.schemas.notification import NotificationCreate
 from sqlalchemy import select
+from app.location_index import location_index
+from app.core.instrumentation import query_budget
 
 router = APIRouter(
     prefix="/properties",
@@ -24,6 +29,7 @@ router = APIRouter(
 
 
 @router.get("/", response_model=List[Property])
+@query_budget(1)
 async def read_properties(db: AsyncSession = Depends(get_db)):
     """Read all properties."""
     # Fetch all properties from the database
@@ -37,6 +43,45 @@ async def get_available_properties(db: AsyncSession = Depends(get_db)):
     return await property_crud.get_available_properties(db)
 
 
+@router.get("/search", response_model=List[Property])
+@query_budget(1)
+async def search_properties(
+    q: str = Query(..., min_length=2),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """Search properties by name, description and location."""
+    return await property_crud.search_properties(db, q, skip, limit)
+
+
+@router.get("/locations/suggest", response_model=List[LocationSuggestion])
+@query_budget(0)
+async def suggest_locations(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """Suggest locations for autocomplete from the in-memory index."""
+    return location_index.suggest(q, limit)
+
+
+@router.get("/nearby", response_model=List[PropertyWithDistance])
+@query_budget(3)
+async def get_nearby_properties(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the closest properties, free in the given dates if provided."""
+    return await property_crud.get_nearby_properties(
+        db, lat, lon, radius_km, start_date, end_date, limit
+    )
+
+
 @router.get("/my-properties", response_model=List[Property])
 async def read_owner_properties(
     db: AsyncSession = Depends(get_db),
@@ -48,6 +93,7 @@ async def read_owner_properties(
 
 
 @router.get("/{property_id}", response_model=Property)
+@query_budget(1)
 async def read_property(property_id: int, db: AsyncSession = Depends(get_db)):
     """Read a property by ID."""
     # Fetch property by ID from the database
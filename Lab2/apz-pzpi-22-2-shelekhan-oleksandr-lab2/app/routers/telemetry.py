@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import property as property_crud
+from app.crud import telemetry as telemetry_crud
+from app.core.config import settings
+from app.core.database import get_db
+from app.dependencies import role_required
+from app.enums.user_role import Role
+from app.models.user import User
+from app.schemas.telemetry import (
+    TemperatureReading,
+    TemperatureRollup,
+    TemperatureAnomaly,
+)
+from datetime import datetime, timedelta
+from typing import List, Literal, Optional
+
+router = APIRouter(
+    prefix="/telemetry",
+    tags=["telemetry"],
+)
+
+
+async def check_property_access(db: AsyncSession, property_id: int, user: User):
+    property = await property_crud.get_property(db, property_id)
+    if user.role != Role.ADMIN and property.owner_id != user.id:
+        raise HTTPException(
+            status_code=403, detail="You are not allowed to view this property."
+        )
+
+
+def time_range(start: Optional[datetime], end: Optional[datetime]):
+    """Default to the last day, a range must not be empty."""
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end.")
+    return start, end
+
+
+@router.get("/{property_id}/readings", response_model=List[TemperatureReading])
+async def read_readings(
+    property_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(role_required([Role.OWNER, Role.ADMIN])),
+):
+    """Raw temperature readings of a property's lock, the last day by default."""
+    await check_property_access(db, property_id, current_user)
+    start, end = time_range(start, end)
+    return await telemetry_crud.get_readings(db, property_id, start, end, limit)
+
+
+@router.get("/{property_id}/rollups", response_model=List[TemperatureRollup])
+async def read_rollups(
+    property_id: int,
+    resolution: Literal["minute", "hour"] = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(role_required([Role.OWNER, Role.ADMIN])),
+):
+    """Per-minute or per-hour mean, minimum and maximum temperature."""
+    await check_property_access(db, property_id, current_user)
+    start, end = time_range(start, end)
+    return await telemetry_crud.get_rollups(db, property_id, resolution, start, end)
+
+
+@router.get("/{property_id}/anomalies", response_model=List[TemperatureAnomaly])
+async def read_anomalies(
+    property_id: int,
+    method: Literal["zscore", "iqr"] = "zscore",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    window: int = Query(settings.TELEMETRY_ANOMALY_WINDOW, ge=2, le=10000),
+    threshold: float = Query(settings.TELEMETRY_ANOMALY_THRESHOLD, gt=0),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(role_required([Role.OWNER, Role.ADMIN])),
+):
+    """Readings flagged by a rolling z-score over the ``window`` readings before
+    them, or by the interquartile range of the whole period."""
+    await check_property_access(db, property_id, current_user)
+    start, end = time_range(start, end)
+    return await telemetry_crud.get_anomalies(
+        db, property_id, start, end, method, window, threshold
+    )
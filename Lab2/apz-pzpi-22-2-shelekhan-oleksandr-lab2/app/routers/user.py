@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.enums.user_role import Role
 from app.reports import generate_user_activity_report
 from app.email_utils import send_email_task
+from app.core.instrumentation import query_budget
 
 router = APIRouter(
     prefix="/users",
@@ -41,6 +42,7 @@ async def get_user_activity_report(
 
 
 @router.get("/me", response_model=User)
+@query_budget(1)
 async def read_current_user(current_user: User = Depends(check_not_blocked)):
     """Retrieve the current authenticated user."""
     return current_user
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class AccessLog(BaseModel):
+    id: int
+    access_code_id: Optional[int] = None
+    property_id: Optional[int] = None
+    device_id: Optional[str] = None
+    command: str
+    response_status: str
+    response_message: Optional[str] = None
+    accessed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AccessLogPage(BaseModel):
+    items: List[AccessLog]
+    # Pass as ``cursor`` for the next page, None on the last one
+    next_cursor: Optional[str] = None
+
+
+class AccessLogRollup(BaseModel):
+    bucket: datetime
+    command: str
+    response_status: str
+    count: int
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import date
 
@@ -10,6 +10,8 @@ class PropertyBase(BaseModel):
     price: float
     location: Optional[str] = None
     lock_id: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class PropertyCreate(PropertyBase):
@@ -39,4 +41,13 @@ class AvailabilityPeriod(BaseModel):
 
 
 class PropertyWithAvailabilityPeriods(Property):
-    availability_periods: List[AvailabilityPeriod]
\ No newline at end of file
+    availability_periods: List[AvailabilityPeriod]
+
+
+class PropertyWithDistance(Property):
+    distance_km: float
+
+
+class LocationSuggestion(BaseModel):
+    location: str
+    count: int
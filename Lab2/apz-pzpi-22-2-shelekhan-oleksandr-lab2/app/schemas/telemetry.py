@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class TemperatureReading(BaseModel):
+    recorded_at: datetime
+    temperature: float
+
+
+class TemperatureRollup(BaseModel):
+    bucket: datetime
+    count: int
+    mean: float
+    min: float
+    max: float
+
+
+class TemperatureAnomaly(TemperatureReading):
+    # Z-score, or distance beyond the IQR fences in IQRs
+    score: float
@@ -0,0 +1,189 @@
+"""Temperature telemetry: partition upkeep, rollups and anomaly detection.
+
+Readings land in ``temperature_readings``, partitioned by month. A periodic
+task folds them into per-minute and per-hour buckets in
+``temperature_rollups`` and keeps partitions created a few months ahead.
+Anomalies are found here, on the server, with vectorized NumPy over the
+readings of any number of locks at once.
+"""
+from datetime import datetime
+from typing import Tuple
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from app.models.telemetry import TemperatureReading
+from app.partitions import ensure_monthly_partitions
+
+RESOLUTIONS = ("minute", "hour")
+
+
+def ensure_partitions(connection, months_ahead: int):
+    """Create the monthly reading partitions up to ``months_ahead`` months on.
+
+    Readings outside every partition go to the default partition instead of
+    failing.
+    """
+    ensure_monthly_partitions(connection, TemperatureReading.__tablename__, months_ahead)
+
+
+def parse_temperature(payload):
+    """The temperature in a ``get_temperature`` answer, a number or
+    ``{"temperature": ...}``; ``None`` if there is none."""
+    if isinstance(payload, dict):
+        payload = payload.get("temperature")
+    if isinstance(payload, (int, float)) and not isinstance(payload, bool):
+        return float(payload)
+    return None
+
+
+def insert_readings(session, readings):
+    """Insert many ``{property_id, recorded_at, temperature}`` rows at once.
+
+    A reading already stored for the same lock and time is skipped, so
+    re-delivered batches are harmless.
+    """
+    if readings:
+        session.execute(
+            insert(TemperatureReading).on_conflict_do_nothing(), readings
+        )
+
+
+def recent_readings(session, property_ids, since: datetime):
+    """Readings of several locks since a time as ``(ids, times, values)``
+    arrays, sorted by lock and time as ``detect_anomalies`` expects."""
+    rows = session.execute(
+        select(
+            TemperatureReading.property_id,
+            TemperatureReading.recorded_at,
+            TemperatureReading.temperature,
+        )
+        .where(
+            TemperatureReading.property_id.in_(property_ids),
+            TemperatureReading.recorded_at >= since,
+        )
+        .order_by(TemperatureReading.property_id, TemperatureReading.recorded_at)
+    ).all()
+    if not rows:
+        return np.array([], dtype=int), np.array([], dtype=object), np.array([])
+    ids, times, values = zip(*rows)
+    return np.array(ids), np.array(times, dtype=object), np.array(values, dtype=float)
+
+
+ROLLUP_MINUTES = text(
+    """
+    INSERT INTO temperature_rollups (property_id, resolution, bucket, count, sum, min, max)
+    SELECT property_id, 'minute', date_trunc('minute', recorded_at),
+           count(*), sum(temperature), min(temperature), max(temperature)
+    FROM temperature_readings
+    WHERE recorded_at >= :since
+    GROUP BY property_id, date_trunc('minute', recorded_at)
+    ON CONFLICT (property_id, resolution, bucket) DO UPDATE
+    SET count = excluded.count, sum = excluded.sum, min = excluded.min, max = excluded.max
+    """
+)
+
+# Hours are built from the minute buckets, not from the raw readings again
+ROLLUP_HOURS = text(
+    """
+    INSERT INTO temperature_rollups (property_id, resolution, bucket, count, sum, min, max)
+    SELECT property_id, 'hour', date_trunc('hour', bucket),
+           sum(count), sum(sum), min(min), max(max)
+    FROM temperature_rollups
+    WHERE resolution = 'minute' AND bucket >= date_trunc('hour', CAST(:since AS timestamp))
+    GROUP BY property_id, date_trunc('hour', bucket)
+    ON CONFLICT (property_id, resolution, bucket) DO UPDATE
+    SET count = excluded.count, sum = excluded.sum, min = excluded.min, max = excluded.max
+    """
+)
+
+
+def roll_up(connection, since: datetime):
+    """Recompute every bucket from ``since`` on, partial buckets included."""
+    since = since.replace(second=0, microsecond=0)
+    connection.execute(ROLLUP_MINUTES, {"since": since})
+    connection.execute(ROLLUP_HOURS, {"since": since})
+
+
+def _segments(property_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end offsets of the runs of equal ids (input sorted by id)."""
+    boundaries = np.flatnonzero(np.diff(property_ids)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(property_ids)]))
+    return starts, ends
+
+
+def rolling_zscore(property_ids: np.ndarray, values: np.ndarray, window: int) -> np.ndarray:
+    """Z-score of every reading against the ``window`` readings before it.
+
+    The readings must be sorted by property, then time. All locks are scored in
+    one pass with cumulative sums; readings with less than ``window``
+    predecessors of the same lock, or a flat window, score 0.
+    """
+    n = len(values)
+    scores = np.zeros(n)
+    if n <= window:
+        return scores
+    starts, ends = _segments(property_ids)
+    lengths = ends - starts
+    segment_start = np.repeat(starts, lengths)
+    # Centre every lock on its own mean, the sums of squares stay small and exact
+    means = np.add.reduceat(values, starts) / lengths
+    centred = values - np.repeat(means, lengths)
+
+    sums = np.concatenate(([0.0], np.cumsum(centred)))
+    squares = np.concatenate(([0.0], np.cumsum(centred * centred)))
+    index = np.arange(n)
+    valid = index - window >= segment_start
+    current = index[valid]
+    window_sum = sums[current] - sums[current - window]
+    window_squares = squares[current] - squares[current - window]
+    mean = window_sum / window
+    variance = window_squares / window - mean * mean
+    std = np.sqrt(np.maximum(variance, 0.0))
+    # The sums run over every lock before this one, their rounding error grows
+    # with them; a flat window must not turn that error into a huge score
+    flat = (std <= 1e-9) | (variance <= 1e-12 * squares[current] / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(flat, 0.0, (centred[current] - mean) / std)
+    scores[current] = z
+    return scores
+
+
+def iqr_scores(property_ids: np.ndarray, values: np.ndarray, k: float) -> np.ndarray:
+    """Distance beyond the lock's ``k * IQR`` fences in IQRs, 0 inside them."""
+    scores = np.zeros(len(values))
+    starts, ends = _segments(property_ids) if len(values) else ([], [])
+    for start, end in zip(starts, ends):
+        segment = values[start:end]
+        q1, q3 = np.percentile(segment, [25, 75])
+        iqr = q3 - q1
+        if iqr <= 0:
+            continue
+        low, high = q1 - k * iqr, q3 + k * iqr
+        scores[start:end] = np.where(
+            segment < low,
+            (segment - low) / iqr,
+            np.where(segment > high, (segment - high) / iqr, 0.0),
+        )
+    return scores
+
+
+def detect_anomalies(
+    property_ids, values, method: str = "zscore", window: int = 60, threshold: float = 3.0
+):
+    """Return ``(mask, scores)`` of the anomalous readings.
+
+    ``property_ids`` and ``values`` are parallel arrays sorted by property and
+    time. ``zscore`` flags readings more than ``threshold`` standard
+    deviations from the rolling window before them; ``iqr`` flags readings
+    beyond ``threshold`` interquartile ranges outside the quartiles.
+    """
+    property_ids = np.asarray(property_ids)
+    values = np.asarray(values, dtype=float)
+    if method == "zscore":
+        scores = rolling_zscore(property_ids, values, window)
+        return np.abs(scores) > threshold, scores
+    if method == "iqr":
+        scores = iqr_scores(property_ids, values, threshold)
+        return scores != 0, scores
+    raise ValueError(f"Unknown anomaly detection method {method!r}")
@@ -0,0 +1,221 @@
+"""Capture EXPLAIN ANALYZE plans for the hot CRUD queries.
+
+Every CRUD function below is executed once to record the exact SQL and
+parameters it sends, then each statement is re-run under
+``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` several times. The median timings
+and the plan are written to a JSON file so runs can be compared.
+
+Seed a large dataset first, then:
+
+    python benchmarks/explain_queries.py capture before
+    alembic upgrade head
+    python benchmarks/explain_queries.py capture after
+    python benchmarks/explain_queries.py compare before after
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from fastapi import HTTPException
+from sqlalchemy import event, func, select
+from app.core.database import async_session, engine
+from app.crud import access_code as access_code_crud
+from app.crud import access_logs as access_logs_crud
+from app.crud import booking as booking_crud
+from app.crud import notification as notification_crud
+from app.crud import payment as payment_crud
+from app.crud import property as property_crud
+from app.enums.user_role import Role
+from app.models.access_code import AccessCode
+from app.models.access_log import AccessLog
+from app.models.booking import Booking
+from app.models.notification import Notification
+from app.models.property import Property
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+async def most_common(db, column):
+    """Return the value of ``column`` with the most rows, the worst case for a lookup."""
+    result = await db.execute(
+        select(column).group_by(column).order_by(func.count().desc()).limit(1)
+    )
+    return result.scalar()
+
+
+async def sample_ids(db):
+    booking_id = await most_common(db, AccessCode.booking_id) or await db.scalar(
+        select(func.max(Booking.id))
+    )
+    return SimpleNamespace(
+        user_id=await most_common(db, Booking.user_id),
+        owner_id=await most_common(db, Property.owner_id),
+        property_id=await most_common(db, Booking.property_id),
+        notified_user_id=await most_common(db, Notification.user_id),
+        access_code_id=await most_common(db, AccessLog.access_code_id),
+        booking_id=booking_id,
+    )
+
+
+def crud_calls(ids):
+    user = SimpleNamespace(id=ids.user_id, role=Role.USER)
+    admin = SimpleNamespace(id=0, role=Role.ADMIN)
+    today = datetime.utcnow().date()
+    now = datetime.utcnow()
+    month_ago = now - timedelta(days=30)
+    return {
+        "check_availability": lambda db: booking_crud.check_availability(
+            db, ids.property_id, today, today + timedelta(days=7)
+        ),
+        "get_booking": lambda db: booking_crud.get_booking(db, ids.booking_id, admin),
+        "list_bookings": lambda db: booking_crud.list_bookings(db, user),
+        "list_owner_bookings": lambda db: booking_crud.list_owner_bookings(
+            db, ids.owner_id
+        ),
+        "get_user_payments": lambda db: payment_crud.get_user_payments(db, user),
+        "get_property_availability": lambda db: property_crud.get_property_availability(
+            db, ids.property_id
+        ),
+        "get_user_notifications": lambda db: notification_crud.get_user_notifications(
+            db, ids.notified_user_id
+        ),
+        "get_access_code": lambda db: access_code_crud.get_access_code(
+            db, ids.booking_id
+        ),
+        "get_access_logs": lambda db: access_logs_crud.get_access_logs(
+            db, admin, month_ago, now, access_code_id=ids.access_code_id
+        ),
+        "get_property_access_logs": lambda db: access_logs_crud.get_access_logs(
+            db, admin, month_ago, now, property_id=ids.property_id
+        ),
+        "get_access_log_rollups": lambda db: access_logs_crud.get_access_log_rollups(
+            db, ids.property_id, "day", month_ago, now
+        ),
+    }
+
+
+async def capture_statements(call):
+    """Run a CRUD call and return the ``(sql, parameters)`` pairs it executed."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with async_session() as db:
+            try:
+                await call(db)
+            except HTTPException:
+                # A 404 for a missing sample row still leaves the lookup to explain
+                pass
+            await db.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    return statements
+
+
+async def explain(statement, parameters, repeat):
+    plans = []
+    async with engine.connect() as conn:
+        for _ in range(repeat):
+            result = await conn.exec_driver_sql(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+            )
+            plan = result.scalar()
+            plans.append(json.loads(plan)[0] if isinstance(plan, str) else plan[0])
+        await conn.rollback()
+    return {
+        "sql": statement,
+        "planning_ms": statistics.median(p["Planning Time"] for p in plans),
+        "execution_ms": statistics.median(p["Execution Time"] for p in plans),
+        "plan": plans[-1]["Plan"],
+    }
+
+
+def node_types(plan):
+    """Flatten a plan into ``Node Type [on relation using index]`` strings."""
+    label = plan["Node Type"]
+    if "Index Name" in plan:
+        label += f" using {plan['Index Name']}"
+    elif "Relation Name" in plan:
+        label += f" on {plan['Relation Name']}"
+    nodes = [label]
+    for child in plan.get("Plans", []):
+        nodes.extend(node_types(child))
+    return nodes
+
+
+async def capture(label, repeat):
+    async with async_session() as db:
+        ids = await sample_ids(db)
+
+    queries = {}
+    for name, call in crud_calls(ids).items():
+        statements = await capture_statements(call)
+        queries[name] = [
+            await explain(statement, parameters, repeat)
+            for statement, parameters in statements
+        ]
+        total = sum(q["execution_ms"] for q in queries[name])
+        print(f"{name:28} {len(statements)} statement(s) {total:10.3f} ms")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"explain_{label}.json")
+    with open(path, "w") as file:
+        json.dump(
+            {
+                "label": label,
+                "captured_at": datetime.utcnow().isoformat(),
+                "sample_ids": vars(ids),
+                "queries": queries,
+            },
+            file,
+            indent=2,
+            default=str,
+        )
+    print(f"Saved {path}")
+    await engine.dispose()
+
+
+def compare(before_label, after_label):
+    runs = []
+    for label in (before_label, after_label):
+        with open(os.path.join(RESULTS_DIR, f"explain_{label}.json")) as file:
+            runs.append(json.load(file)["queries"])
+    before, after = runs
+
+    print(f"{'query':28} {before_label:>12} {after_label:>12} {'speedup':>9}")
+    for name in before:
+        if name not in after:
+            continue
+        old = sum(q["execution_ms"] for q in before[name])
+        new = sum(q["execution_ms"] for q in after[name])
+        speedup = old / new if new else float("inf")
+        print(f"{name:28} {old:10.3f}ms {new:10.3f}ms {speedup:8.1f}x")
+        for query in after[name]:
+            print("    " + " > ".join(node_types(query["plan"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    capture_parser = commands.add_parser("capture")
+    capture_parser.add_argument("label")
+    capture_parser.add_argument("--repeat", type=int, default=5)
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "capture":
+        asyncio.run(capture(args.label, args.repeat))
+    else:
+        compare(args.before, args.after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""Generate a large synthetic dataset for benchmarks with COPY.
+
+Rows are built in Python from a seeded random generator and streamed into
+Postgres in batches with asyncpg ``copy_records_to_table``; nothing goes
+through the ORM. Every user shares one password hash (computed once, bcrypt
+costs ~0.2 s per call), ids continue after the rows already in the tables and
+the id sequences are moved past the new rows at the end.
+
+Bookings never overlap per property: each property walks forward through the
+calendar with gaps that are shorter in the high season, so availability and
+search queries see a realistic occupancy. Past bookings are mostly paid (with
+a payment and an access code, some with access logs), future ones pending or
+confirmed.
+
+    alembic upgrade head
+    python benchmarks/generate_data.py --users 100000 --owners 5000 \\
+        --properties 20000 --bookings 5000000
+
+All generated users log in with ``--password``.
+"""
+import argparse
+import asyncio
+import base64
+import random
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from app.access_log_rollups import roll_up_access_logs
+from app.core.config import settings
+from app.core.database import engine
+from app.core.security import get_password_hash
+from app.enums.booking_status import BookingStatus
+from app.enums.payment import PaymentStatus
+from app.enums.user_role import Role
+from app.partitions import ensure_monthly_partitions
+
+# Relative demand per month, the gap between two stays is divided by it
+MONTHLY_DEMAND = {
+    1: 0.7, 2: 0.6, 3: 0.7, 4: 0.9, 5: 1.0, 6: 1.4,
+    7: 1.8, 8: 1.8, 9: 1.1, 10: 0.8, 11: 0.6, 12: 1.2,
+}
+# Nights per stay, weighted towards weekends and short city breaks
+STAY_NIGHTS = [1, 2, 3, 4, 5, 6, 7, 10, 14]
+STAY_WEIGHTS = [14, 24, 18, 12, 8, 6, 10, 5, 3]
+MEAN_STAY = sum(n * w for n, w in zip(STAY_NIGHTS, STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+
+CITIES = [
+    ("Kyiv", 50.4501, 30.5234),
+    ("Lviv", 49.8397, 24.0297),
+    ("Odesa", 46.4825, 30.7233),
+    ("Kharkiv", 49.9935, 36.2304),
+    ("Dnipro", 48.4647, 35.0462),
+    ("Uzhhorod", 48.6208, 22.2879),
+    ("Chernivtsi", 48.2921, 25.9358),
+    ("Bukovel", 48.3640, 24.4010),
+    ("Warsaw", 52.2297, 21.0122),
+    ("Krakow", 50.0647, 19.9450),
+]
+STREETS = ["Shevchenka", "Franka", "Khreshchatyk", "Sadova", "Lesi Ukrainky", "Rynok"]
+ADJECTIVES = ["Cozy", "Sunny", "Modern", "Quiet", "Spacious", "Charming", "Bright"]
+KINDS = ["apartment", "studio", "loft", "house", "cottage", "flat", "villa"]
+FIRST_NAMES = ["Olena", "Taras", "Iryna", "Andrii", "Oksana", "Dmytro", "Maria", "Ivan"]
+LAST_NAMES = ["Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk"]
+NOTIFICATIONS = [
+    ("Your booking has been created!", "success"),
+    ("Your booking has been approved by the owner!", "success"),
+    ("Your payment was successful. Booking confirmed!", "success"),
+    ("Your access code has been generated.", "info"),
+    ("Smart lock opened. Welcome!", "info"),
+    ("Access code has been revoked.", "warning"),
+]
+LOCK_COMMANDS = ["open_lock", "close_lock"]
+
+# (table, columns) in foreign key order, search_vector of properties is generated
+TABLES = {
+    "users": (
+        "id", "first_name", "last_name", "email", "password", "role", "created_at",
+        "is_blocked",
+    ),
+    "properties": (
+        "id", "owner_id", "name", "description", "rooms", "price", "location",
+        "lock_id", "latitude", "longitude", "created_at",
+    ),
+    "bookings": (
+        "id", "user_id", "property_id", "start_date", "end_date", "status",
+        "created_at", "booking_price",
+    ),
+    "payments": ("id", "booking_id", "amount", "status", "created_at"),
+    "access_codes": ("id", "booking_id", "code", "valid_from", "valid_until"),
+    "access_logs": (
+        "id", "access_code_id", "property_id", "command", "response_status",
+        "response_message", "accessed_at",
+    ),
+    "notifications": ("id", "user_id", "message", "type", "created_at", "read"),
+}
+
+
+class CopyWriter:
+    """Buffer rows per table and COPY them in batches, parents before children."""
+
+    def __init__(self, connection, batch_size: int):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.buffers = {table: [] for table in TABLES}
+        self.counts = dict.fromkeys(TABLES, 0)
+        self.next_ids = {}
+
+    async def load_next_ids(self):
+        for table in TABLES:
+            current = await self.connection.fetchval(
+                f"SELECT coalesce(max(id), 0) FROM {table}"
+            )
+            self.next_ids[table] = current + 1
+
+    def next_id(self, table: str) -> int:
+        value = self.next_ids[table]
+        self.next_ids[table] = value + 1
+        return value
+
+    async def add(self, table: str, row: tuple):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        # Buffered children reference buffered parents, copy in foreign key order
+        for table, columns in TABLES.items():
+            rows = self.buffers[table]
+            if rows:
+                await self.connection.copy_records_to_table(
+                    table, records=rows, columns=columns
+                )
+                self.counts[table] += len(rows)
+                self.buffers[table] = []
+
+    async def fix_sequences(self):
+        for table in TABLES:
+            await self.connection.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"coalesce(max(id), 1), max(id) IS NOT NULL) FROM {table}"
+            )
+
+
+def random_datetime(rng, start: datetime, end: datetime) -> datetime:
+    return start + timedelta(seconds=rng.uniform(0, (end - start).total_seconds()))
+
+
+async def generate_users(writer, rng, count, role, password_hash, since):
+    ids = []
+    now = datetime.utcnow()
+    for _ in range(count):
+        user_id = writer.next_id("users")
+        await writer.add(
+            "users",
+            (
+                user_id,
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                f"{role.value}.{user_id}@generated.example.com",
+                password_hash,
+                role.name,
+                random_datetime(rng, since, now),
+                rng.random() < 0.002,
+            ),
+        )
+        ids.append(user_id)
+    return ids
+
+
+def lock_id(rng, property_id: int) -> str:
+    key = base64.urlsafe_b64encode(rng.randbytes(32)).decode()
+    return f"lock-{property_id}:{key}"
+
+
+async def generate_properties(writer, rng, count, owner_ids, lock_share, since):
+    properties = []
+    now = datetime.utcnow()
+    for _ in range(count):
+        property_id = writer.next_id("properties")
+        city, lat, lon = rng.choice(CITIES)
+        rooms = rng.choices([1, 2, 3, 4, 5], [30, 35, 20, 10, 5])[0]
+        price = round(rng.lognormvariate(3.9, 0.4) * (0.8 + rooms * 0.2), 2)
+        kind = rng.choice(KINDS)
+        await writer.add(
+            "properties",
+            (
+                property_id,
+                rng.choice(owner_ids),
+                f"{rng.choice(ADJECTIVES)} {kind} in {city}",
+                f"{rooms}-room {kind} near {rng.choice(STREETS)} street, "
+                f"{rng.choice(['wifi', 'parking', 'balcony', 'sea view', 'fireplace'])}.",
+                rooms,
+                price,
+                f"{city}, {rng.choice(STREETS)} {rng.randint(1, 200)}",
+                lock_id(rng, property_id) if rng.random() < lock_share else None,
+                lat + rng.gauss(0, 0.05),
+                lon + rng.gauss(0, 0.05),
+                random_datetime(rng, since, now),
+            ),
+        )
+        properties.append((property_id, price))
+    return properties
+
+
+def booking_status(rng, start: date, end: date, today: date) -> BookingStatus:
+    if end < today:
+        return BookingStatus.CANCELLED if rng.random() < 0.08 else BookingStatus.PAID
+    if start <= today:
+        return BookingStatus.PAID
+    return rng.choices(
+        [BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.PAID],
+        [30, 30, 40],
+    )[0]
+
+
+async def generate_access(
+    writer, rng, booking_id, property_id, start, end, today, logs_per_code
+):
+    valid_from = datetime.combine(start, datetime.min.time())
+    valid_until = datetime.combine(end, datetime.min.time()) + timedelta(hours=12)
+    code_id = writer.next_id("access_codes")
+    code = f"{booking_id:x}{rng.getrandbits(32):08x}"
+    await writer.add("access_codes", (code_id, booking_id, code, valid_from, valid_until))
+    if start > today:
+        return
+    log_end = min(valid_until, datetime.utcnow())
+    for _ in range(int(rng.expovariate(1 / logs_per_code)) if logs_per_code else 0):
+        await writer.add(
+            "access_logs",
+            (
+                writer.next_id("access_logs"),
+                code_id,
+                property_id,
+                rng.choice(LOCK_COMMANDS),
+                "200",
+                '{"result": "ok"}',
+                random_datetime(rng, valid_from, log_end),
+            ),
+        )
+
+
+async def generate_bookings(
+    writer, rng, total, properties, guest_ids, since: date, until: date, logs_per_code
+):
+    today = date.today()
+    window = (until - since).days
+    # Popular properties get more stays, the quota sums up to the requested total
+    popularity = [rng.paretovariate(2.5) for _ in properties]
+    scale = total / sum(popularity)
+    remaining = total
+    for n, ((property_id, price), weight) in enumerate(zip(properties, popularity)):
+        quota = remaining if n == len(properties) - 1 else min(round(weight * scale), remaining)
+        remaining -= quota
+        mean_gap = max(window / max(quota, 1) - MEAN_STAY, 0.2)
+        cursor = since + timedelta(days=int(rng.uniform(0, mean_gap)))
+        for _ in range(quota):
+            demand = MONTHLY_DEMAND[cursor.month]
+            start = cursor + timedelta(days=int(rng.expovariate(demand / mean_gap)))
+            nights = rng.choices(STAY_NIGHTS, STAY_WEIGHTS)[0]
+            end = start + timedelta(days=nights)
+            cursor = end
+            status = booking_status(rng, start, end, today)
+            booked_at = datetime.combine(start, datetime.min.time()) - timedelta(
+                days=rng.expovariate(1 / 21), hours=rng.uniform(0, 24)
+            )
+            booking_id = writer.next_id("bookings")
+            amount = round(price * nights, 2)
+            await writer.add(
+                "bookings",
+                (
+                    booking_id,
+                    rng.choice(guest_ids),
+                    property_id,
+                    start,
+                    end,
+                    status.name,
+                    booked_at,
+                    amount,
+                ),
+            )
+            if status == BookingStatus.PAID:
+                await writer.add(
+                    "payments",
+                    (
+                        writer.next_id("payments"),
+                        booking_id,
+                        amount,
+                        PaymentStatus.SUCCESS.name,
+                        booked_at + timedelta(minutes=rng.uniform(1, 600)),
+                    ),
+                )
+                await generate_access(
+                    writer, rng, booking_id, property_id, start, end, today,
+                    logs_per_code,
+                )
+
+
+async def generate_notifications(writer, rng, user_ids, per_user, since):
+    now = datetime.utcnow()
+    for user_id in user_ids:
+        for _ in range(int(rng.expovariate(1 / per_user)) if per_user else 0):
+            message, kind = rng.choice(NOTIFICATIONS)
+            created_at = random_datetime(rng, since, now)
+            await writer.add(
+                "notifications",
+                (
+                    writer.next_id("notifications"),
+                    user_id,
+                    message,
+                    kind,
+                    created_at,
+                    created_at < now - timedelta(days=7) or rng.random() < 0.5,
+                ),
+            )
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    password_hash = get_password_hash(args.password)
+    today = date.today()
+    since = today - timedelta(days=args.history_days)
+    until = today + timedelta(days=args.future_days)
+    since_dt = datetime.combine(since, datetime.min.time())
+
+    async with engine.connect() as connection:
+        # The history needs its monthly partitions, the default one would
+        # hold it all and nothing could be pruned or dropped
+        await connection.run_sync(
+            ensure_monthly_partitions,
+            "access_logs",
+            settings.ACCESS_LOG_PARTITION_MONTHS_AHEAD,
+            since,
+        )
+        await connection.commit()
+        raw = await connection.get_raw_connection()
+        writer = CopyWriter(raw.driver_connection, args.batch_size)
+        await writer.load_next_ids()
+
+        started = time.perf_counter()
+        owner_ids = await generate_users(
+            writer, rng, args.owners, Role.OWNER, password_hash, since_dt
+        )
+        guest_ids = await generate_users(
+            writer, rng, args.users, Role.USER, password_hash, since_dt
+        )
+        properties = await generate_properties(
+            writer, rng, args.properties, owner_ids, args.lock_share, since_dt
+        )
+        await writer.flush()
+        await generate_bookings(
+            writer, rng, args.bookings, properties, guest_ids, since, until,
+            args.access_logs_per_code,
+        )
+        await generate_notifications(
+            writer, rng, guest_ids + owner_ids, args.notifications_per_user, since_dt
+        )
+        await writer.flush()
+        await writer.fix_sequences()
+        await connection.run_sync(roll_up_access_logs, datetime.min)
+        await connection.commit()
+        elapsed = time.perf_counter() - started
+
+        print("Analyzing ...")
+        await connection.execute(text("ANALYZE"))
+        await connection.commit()
+    await engine.dispose()
+
+    for table, count in writer.counts.items():
+        print(f"{table:14} {count:10}")
+    print(f"Generated {sum(writer.counts.values())} rows in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--owners", type=int, default=5_000)
+    parser.add_argument("--properties", type=int, default=20_000)
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--notifications-per-user", type=float, default=5)
+    parser.add_argument("--access-logs-per-code", type=float, default=2)
+    parser.add_argument("--lock-share", type=float, default=0.3, help="properties with a smart lock")
+    parser.add_argument("--history-days", type=int, default=3 * 365)
+    parser.add_argument("--future-days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.owners < 1 or args.users < 1 or args.properties < 1:
+        parser.error("need at least one owner, user and property")
+    asyncio.run(main(args))
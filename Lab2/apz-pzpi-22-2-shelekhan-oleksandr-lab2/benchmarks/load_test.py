@@ -0,0 +1,368 @@
+"""End-to-end HTTP load test of the main user journeys.
+
+Every scenario runs for ``--duration`` seconds with ``--concurrency`` workers
+looping over the same request, then the next scenario starts. The results
+(requests, errors, throughput and p50/p95/p99 latency per scenario) are
+written as JSON so two runs can be compared with ``--compare``.
+
+Run it against a local stack with the IoT hub stubbed out, the test creates
+its own users, properties and bookings:
+
+    IOTHUB_STUB=true docker compose up -d db redis celery app
+    python benchmarks/load_test.py --base-url http://localhost:8000 \\
+        --output benchmarks/baselines/local.json
+    # after a change
+    python benchmarks/load_test.py --output /tmp/after.json \\
+        --compare benchmarks/baselines/local.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import subprocess
+import time
+import uuid
+from datetime import date, datetime, timedelta
+import httpx
+from cryptography.fernet import Fernet
+
+PASSWORD = "load-test-password"
+SEARCH_TERMS = ["apartment", "house", "center", "sea", "loft", "studio"]
+# Far enough ahead not to collide with real bookings, one slot per created booking
+BOOKING_OFFSET_DAYS = 400
+BOOKING_NIGHTS = 2
+
+
+class ScenarioError(Exception):
+    pass
+
+
+def check(response: httpx.Response, expected=200):
+    if response.status_code != expected:
+        raise ScenarioError(f"{response.status_code} {response.text[:200]}")
+    return response
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, properties: int, guests: int):
+        self.client = client
+        self.property_count = properties
+        self.guest_count = guests
+        self.run_id = uuid.uuid4().hex[:8]
+        self.owner = None
+        self.guests = []
+        self.property_ids = []
+        self.door = None
+        self.booking_slots = itertools.count()
+        # Bookings created by one scenario and consumed by the following ones
+        self.pending_bookings = asyncio.Queue()
+        self.approved_bookings = asyncio.Queue()
+
+    def headers(self, account):
+        return {"Authorization": f"Bearer {account['token']}"}
+
+    async def create_account(self, role: str, n: int):
+        email = f"load-{self.run_id}-{role}-{n}@example.com"
+        user = check(
+            await self.client.post(
+                "/users/",
+                json={
+                    "first_name": "Load",
+                    "last_name": f"{role.title()} {n}",
+                    "email": email,
+                    "password": PASSWORD,
+                    "role": role,
+                },
+            )
+        ).json()
+        account = {"id": user["id"], "email": email, "token": None}
+        account["token"] = await self.login(account)
+        return account
+
+    async def login(self, account):
+        response = check(
+            await self.client.post(
+                "/token", data={"username": account["email"], "password": PASSWORD}
+            )
+        )
+        return response.json()["access_token"]
+
+    async def create_property(self, n: int, lock_id=None):
+        return check(
+            await self.client.post(
+                "/properties/",
+                headers=self.headers(self.owner),
+                json={
+                    "name": f"Load test {SEARCH_TERMS[n % len(SEARCH_TERMS)]} {n}",
+                    "description": "Created by the load test",
+                    "rooms": 1 + n % 4,
+                    "price": 50 + n,
+                    "location": f"Load City {n % 10}",
+                    "lock_id": lock_id,
+                    "latitude": 50.0 + n / 1000,
+                    "longitude": 30.0 + n / 1000,
+                },
+            )
+        ).json()["id"]
+
+    async def setup(self):
+        self.owner = await self.create_account("owner", 0)
+        self.guests = [
+            await self.create_account("user", n) for n in range(self.guest_count)
+        ]
+        self.property_ids = [
+            await self.create_property(n) for n in range(self.property_count)
+        ]
+
+        # One booking running today, its access code opens the (stubbed) lock
+        lock_id = f"load-{self.run_id}:{Fernet.generate_key().decode()}"
+        door_property = await self.create_property(self.property_count, lock_id)
+        guest = self.guests[0]
+        booking = check(
+            await self.client.post(
+                "/bookings/",
+                headers=self.headers(guest),
+                json={
+                    "property_id": door_property,
+                    "start_date": date.today().isoformat(),
+                    "end_date": (date.today() + timedelta(days=1)).isoformat(),
+                },
+            )
+        ).json()
+        code = check(
+            await self.client.get(
+                f"/access-codes/{booking['id']}/access_code", headers=self.headers(guest)
+            )
+        ).json()["access_code"]
+        self.door = {"booking_id": booking["id"], "code": code, "guest": guest}
+
+    def guest(self, worker: int):
+        return self.guests[worker % len(self.guests)]
+
+    # Scenarios, each performs one request per call
+
+    async def login_scenario(self, worker):
+        await self.login(self.guest(worker))
+
+    async def list_properties(self, worker):
+        check(await self.client.get("/properties/"))
+
+    async def search_properties(self, worker):
+        term = SEARCH_TERMS[worker % len(SEARCH_TERMS)]
+        check(await self.client.get("/properties/search", params={"q": term}))
+
+    async def availability(self, worker):
+        property_id = self.property_ids[worker % len(self.property_ids)]
+        check(await self.client.get(f"/properties/{property_id}/availability"))
+
+    async def create_booking(self, worker):
+        slot = next(self.booking_slots)
+        property_id = self.property_ids[slot % len(self.property_ids)]
+        start = date.today() + timedelta(
+            days=BOOKING_OFFSET_DAYS + slot // len(self.property_ids) * (BOOKING_NIGHTS + 1)
+        )
+        guest = self.guest(worker)
+        booking = check(
+            await self.client.post(
+                "/bookings/",
+                headers=self.headers(guest),
+                json={
+                    "property_id": property_id,
+                    "start_date": start.isoformat(),
+                    "end_date": (start + timedelta(days=BOOKING_NIGHTS)).isoformat(),
+                },
+            )
+        ).json()
+        self.pending_bookings.put_nowait((booking, guest))
+
+    async def approve_booking(self, worker):
+        booking, guest = self.pending_bookings.get_nowait()
+        check(
+            await self.client.post(
+                f"/bookings/{booking['id']}/approve", headers=self.headers(self.owner)
+            )
+        )
+        self.approved_bookings.put_nowait((booking, guest))
+
+    async def notifications(self, worker):
+        check(
+            await self.client.get(
+                "/notifications/", headers=self.headers(self.guest(worker))
+            )
+        )
+
+    async def create_payment(self, worker):
+        booking, guest = self.approved_bookings.get_nowait()
+        check(
+            await self.client.post(
+                "/payments/",
+                headers=self.headers(guest),
+                json={
+                    "booking_id": booking["id"],
+                    "amount": booking["booking_price"],
+                    "status": "success",
+                },
+            )
+        )
+
+    async def open_door(self, worker):
+        check(
+            await self.client.post(
+                f"/access-codes/{self.door['booking_id']}/open_door",
+                params={"access_code": self.door["code"]},
+                headers=self.headers(self.door["guest"]),
+            )
+        )
+
+    def scenarios(self):
+        return {
+            "login": self.login_scenario,
+            "list_properties": self.list_properties,
+            "search_properties": self.search_properties,
+            "availability": self.availability,
+            "create_booking": self.create_booking,
+            "approve_booking": self.approve_booking,
+            "notifications": self.notifications,
+            "create_payment": self.create_payment,
+            "open_door": self.open_door,
+        }
+
+
+async def run_scenario(call, duration: float, concurrency: int):
+    latencies = []
+    errors = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(n):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                await call(n)
+            except asyncio.QueueEmpty:
+                # Nothing left to approve or pay for, the previous scenario was shorter
+                return
+            except ScenarioError as e:
+                status = str(e).split(" ", 1)[0]
+                errors[status] = errors.get(status, 0) + 1
+                continue
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors.values()),
+        "error_kinds": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results, baseline=None):
+    print(
+        f"{'scenario':18} {'requests':>8} {'errors':>6} {'rps':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for name, result in results.items():
+        line = (
+            f"{name:18} {result['requests']:8} {result['errors']:6} "
+            f"{result['throughput_rps']:8.1f} "
+            + " ".join(
+                f"{result[key]:8.1f}" if result[key] is not None else f"{'-':>8}"
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            )
+        )
+        before = (baseline or {}).get(name)
+        if before and before.get("p95_ms") and result["p95_ms"]:
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+            line += f"   p95 {change:+.0f}% vs baseline"
+        print(line)
+
+
+async def main(args):
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+        load_test = LoadTest(client, args.properties, args.concurrency)
+        await load_test.setup()
+        scenarios = load_test.scenarios()
+        selected = args.scenarios or list(scenarios)
+
+        results = {}
+        for name in selected:
+            print(f"Running {name} for {args.duration:g} s ...")
+            results[name] = await run_scenario(
+                scenarios[name], args.duration, args.concurrency
+            )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["scenarios"]
+    print_results(results, baseline)
+
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "base_url": args.base_url,
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--properties", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--scenario",
+        dest="scenarios",
+        action="append",
+        help="run only this scenario, can be repeated",
+    )
+    parser.add_argument("--output", default="benchmarks/baselines/load_test.json")
+    parser.add_argument("--compare", help="earlier results to compare the p95 with")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,88 @@
+"""Simulate locks publishing telemetry and events over MQTT.
+
+Every lock in the database publishes an encrypted reading each
+``--interval`` seconds, and now and then an unlock event, the way the
+ingest worker (``python -m app.mqtt_ingest``) expects them. A share of the
+readings can be made anomalous to exercise the alerts.
+
+    docker compose up -d mosquitto mqtt_ingest
+    python benchmarks/mqtt_devices.py --interval 1 --duration 60
+"""
+import argparse
+import json
+import random
+import time
+import paho.mqtt.client as mqtt
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database_task import engine
+from app.iot import get_cipher, parse_lock_id
+from app.iot_utils import get_properties
+
+
+def load_locks(limit: int):
+    with Session(engine) as session:
+        properties = get_properties(session)
+    locks = []
+    for property in properties[:limit or None]:
+        try:
+            device_id, encryption_key = parse_lock_id(property["lock_id"])
+            locks.append((device_id, get_cipher(encryption_key)))
+        except ValueError:
+            continue
+    return locks
+
+
+def main(args):
+    locks = load_locks(args.locks)
+    if not locks:
+        raise SystemExit("No property has a valid lock id")
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    if settings.MQTT_USERNAME:
+        client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
+    client.connect(args.host, args.port)
+    client.loop_start()
+
+    sent = 0
+    started = time.perf_counter()
+    deadline = started + args.duration
+    while time.perf_counter() < deadline:
+        tick = time.perf_counter()
+        for device_id, cipher in locks:
+            temperature = random.gauss(21.5, 0.5)
+            if random.random() < args.anomaly_rate:
+                temperature += random.choice([-1, 1]) * random.uniform(8, 15)
+            reading = {"temperature": round(temperature, 2), "ts": time.time()}
+            client.publish(
+                f"{settings.MQTT_TOPIC_PREFIX}/{device_id}/telemetry",
+                cipher.encrypt(json.dumps(reading).encode()),
+                qos=1,
+            )
+            sent += 1
+            if random.random() < args.event_rate:
+                event = {"event": "unlocked", "ts": time.time()}
+                client.publish(
+                    f"{settings.MQTT_TOPIC_PREFIX}/{device_id}/events",
+                    cipher.encrypt(json.dumps(event).encode()),
+                    qos=1,
+                )
+                sent += 1
+        time.sleep(max(0.0, args.interval - (time.perf_counter() - tick)))
+
+    client.disconnect()
+    client.loop_stop()
+    elapsed = time.perf_counter() - started
+    print(f"{sent} messages from {len(locks)} locks in {elapsed:.1f} s ({sent / elapsed:.0f}/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=settings.MQTT_PORT)
+    parser.add_argument("--locks", type=int, default=0, help="0 for every lock")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between readings")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--anomaly-rate", type=float, default=0.001)
+    parser.add_argument("--event-rate", type=float, default=0.01)
+    main(parser.parse_args())
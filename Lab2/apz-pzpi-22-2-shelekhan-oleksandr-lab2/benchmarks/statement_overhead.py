@@ -0,0 +1,91 @@
+"""Measure the Python overhead of the hottest CRUD reads.
+
+Each CRUD call is timed end to end while ``count_queries`` records the time
+spent inside the database driver; the difference is what SQLAlchemy and the
+CRUD code cost per call (statement construction, cache key, compilation
+lookup, result processing). Run it on a seeded database:
+
+    python benchmarks/statement_overhead.py --calls 2000
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+from datetime import date, timedelta
+from sqlalchemy import func, select
+from app.core.database import async_session, engine
+from app.core.instrumentation import count_queries
+from app.crud import access_code as access_code_crud
+from app.crud import booking as booking_crud
+from app.crud import notification as notification_crud
+from app.crud import user as user_crud
+from app.enums.user_role import Role
+from app.models.booking import Booking
+
+
+def hot_calls(sample):
+    admin = SimpleNamespace(id=0, role=Role.ADMIN)
+    start = date.today() + timedelta(days=1)
+    return {
+        "get_user": lambda db: user_crud.get_user(db, sample.user_id),
+        "get_booking": lambda db: booking_crud.get_booking(db, sample.booking_id, admin),
+        "check_availability": lambda db: booking_crud.check_availability(
+            db, sample.property_id, start, start + timedelta(days=3)
+        ),
+        "get_access_code": lambda db: access_code_crud.get_access_code(
+            db, sample.booking_id
+        ),
+        "get_user_notifications": lambda db: notification_crud.get_user_notifications(
+            db, sample.user_id
+        ),
+    }
+
+
+async def measure(call, calls):
+    async with async_session() as db:
+        # Warm up the compiled cache and the connection's prepared statements
+        for _ in range(50):
+            await call(db)
+            db.expunge_all()
+        total = 0.0
+        with count_queries() as stats:
+            for _ in range(calls):
+                started = time.perf_counter()
+                await call(db)
+                total += time.perf_counter() - started
+                # Start every call with an empty identity map, like a new request
+                db.expunge_all()
+        await db.rollback()
+    return total / calls, stats.duration / calls, stats.count / calls
+
+
+async def main(calls):
+    async with async_session() as db:
+        booking = (
+            await db.execute(
+                select(Booking.id, Booking.user_id, Booking.property_id).order_by(
+                    func.random()
+                )
+            )
+        ).first()
+    if booking is None:
+        raise SystemExit("Seed some bookings first")
+    sample = SimpleNamespace(
+        booking_id=booking.id, user_id=booking.user_id, property_id=booking.property_id
+    )
+
+    print(f"{'query':24} {'queries':>8} {'total us':>9} {'db us':>8} {'python us':>10}")
+    for name, call in hot_calls(sample).items():
+        total, db_time, queries = await measure(call, calls)
+        print(
+            f"{name:24} {queries:8.1f} {total * 1e6:9.1f} {db_time * 1e6:8.1f} "
+            f"{(total - db_time) * 1e6:10.1f}"
+        )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
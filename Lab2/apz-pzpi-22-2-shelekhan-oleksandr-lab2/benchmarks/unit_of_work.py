@@ -0,0 +1,159 @@
+"""Count queries and commits of the write endpoints.
+
+Each scenario replays the CRUD calls a route makes and commits once at the end,
+the way ``get_db`` does, while ``count_queries`` records the statements,
+commits and database time. Every commit is a round-trip plus a WAL flush, so
+the commit column is the fsync count per request.
+
+The scenarios write real rows, run it against a seeded development database:
+
+    python benchmarks/unit_of_work.py
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from sqlalchemy import select
+from app.core.database import async_session, engine
+from app.core.instrumentation import count_queries
+from app.crud import booking as booking_crud
+from app.crud import notification as notification_crud
+from app.crud import payment as payment_crud
+from app.crud import property as property_crud
+from app.crud import user as user_crud
+from app.enums.booking_status import BookingStatus
+from app.enums.payment import PaymentStatus
+from app.enums.user_role import Role
+from app.models.property import Property
+from app.models.user import User
+from app.schemas.booking import BookingCreate, BookingUpdate
+from app.schemas.notification import NotificationCreate
+from app.schemas.payment import PaymentCreate
+from app.schemas.property import PropertyCreate
+
+
+def notify(db, user_id, message):
+    return notification_crud.create_notification(
+        db, NotificationCreate(user_id=user_id, message=message)
+    )
+
+
+async def create_booking(db, ctx):
+    # Far in the future with a random offset so repeated runs do not overlap
+    start = date.today() + timedelta(days=random.randint(3650, 36500))
+    booking = await booking_crud.create_booking(
+        db,
+        BookingCreate(
+            property_id=ctx.property_id, start_date=start, end_date=start + timedelta(days=2)
+        ),
+        ctx.guest,
+    )
+    await notify(db, booking.property.owner.id, "Your property has been booked.")
+    await notify(db, ctx.guest.id, "Your booking has been created!")
+    await booking_crud.get_booking(db, booking.id, ctx.guest)
+    ctx.booking_id = booking.id
+
+
+async def confirm_booking(db, ctx):
+    booking = await booking_crud.update_booking(
+        db, ctx.booking_id, BookingUpdate(status=BookingStatus.CONFIRMED), ctx.owner
+    )
+    await notify(db, booking.user_id, "Your booking has been confirmed.")
+    await notify(db, ctx.owner.id, "You confirmed a booking.")
+
+
+async def create_payment(db, ctx):
+    payment = await payment_crud.create_payment(
+        db,
+        PaymentCreate(booking_id=ctx.booking_id, amount=1, status=PaymentStatus.SUCCESS),
+        ctx.guest,
+    )
+    await notify(db, ctx.guest.id, "Payment processed.")
+    await notify(db, payment.booking.property.owner.id, "Payment received.")
+
+
+async def create_property(db, ctx):
+    await property_crud.create_property(
+        db,
+        PropertyCreate(name="Benchmark flat", rooms=1, price=1, location="Benchmark"),
+        ctx.owner,
+    )
+
+
+async def block_user(db, ctx):
+    user = await user_crud.block_user(db, ctx.guest.id)
+    await notify(db, user.id, "Your account has been temporarily blocked.")
+    await user_crud.unblock_user(db, ctx.guest.id)
+
+
+async def mark_notification_read(db, ctx):
+    notifications = await notification_crud.get_user_notifications(db, ctx.guest.id)
+    await notification_crud.mark_notification_read(db, notifications[0].id, ctx.guest.id)
+
+
+SCENARIOS = {
+    "create_booking": create_booking,
+    "confirm_booking": confirm_booking,
+    "create_payment": create_payment,
+    "create_property": create_property,
+    "block_user": block_user,
+    "mark_notification_read": mark_notification_read,
+}
+
+
+class Context:
+    """Seeded users and property the scenarios run as."""
+
+    async def load(self):
+        async with async_session() as db:
+            self.owner_id = await db.scalar(
+                select(User.id).where(User.role == Role.OWNER).order_by(User.id).limit(1)
+            )
+            self.guest_id = await db.scalar(
+                select(User.id).where(User.role == Role.USER).order_by(User.id).limit(1)
+            )
+            self.property_id = await db.scalar(
+                select(Property.id)
+                .where(Property.owner_id == self.owner_id)
+                .order_by(Property.id)
+                .limit(1)
+            )
+        if None in (self.owner_id, self.guest_id, self.property_id):
+            raise SystemExit("Seed at least one owner with a property and one user first")
+        self.booking_id = None
+
+    async def attach(self, db):
+        # Routes get the current user from the request session, do the same here
+        self.owner = await db.get(User, self.owner_id)
+        self.guest = await db.get(User, self.guest_id)
+
+
+async def main(repeat: int):
+    ctx = Context()
+    await ctx.load()
+
+    print(f"{'scenario':24} {'queries':>8} {'commits':>8} {'db ms':>8} {'total ms':>9}")
+    for name, scenario in SCENARIOS.items():
+        runs = []
+        for _ in range(repeat):
+            async with async_session() as db:
+                await ctx.attach(db)
+                started = time.perf_counter()
+                with count_queries() as stats:
+                    await scenario(db, ctx)
+                    await db.commit()
+                runs.append((stats, time.perf_counter() - started))
+        stats = runs[-1][0]
+        db_ms = statistics.median(s.duration for s, _ in runs) * 1000
+        total_ms = statistics.median(t for _, t in runs) * 1000
+        print(f"{name:24} {stats.count:8} {stats.commits:8} {db_ms:8.2f} {total_ms:9.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
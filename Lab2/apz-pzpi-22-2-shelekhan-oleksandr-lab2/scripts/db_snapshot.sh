@@ -0,0 +1,4 @@
+#!/bin/bash
+
+# Snapshot, restore or reset the database, see app/db_snapshot.py --help
+python app/db_snapshot.py "$@"
@@ -0,0 +1,12 @@
+#!/bin/bash
+# Runs once from docker-entrypoint-initdb.d when the primary volume is created.
+# Lets the db_replica service stream WAL from the primary.
+set -e
+
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" <<-EOSQL
+    SELECT pg_create_physical_replication_slot('db_replica')
+    WHERE NOT EXISTS (
+        SELECT 1 FROM pg_replication_slots WHERE slot_name = 'db_replica'
+    );
+EOSQL
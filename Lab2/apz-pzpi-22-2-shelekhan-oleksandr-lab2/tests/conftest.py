@@ -0,0 +1,19 @@
+import os
+
+# Settings without a default, the tests never reach these services
+for name, value in {
+    "SECRET_KEY": "test",
+    "FIRST_SUPERUSER_EMAIL": "admin@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "test",
+    "MAIL_USERNAME": "mail@example.com",
+    "MAIL_PASSWORD": "test",
+    "MAIL_PORT": "25",
+    "MAIL_SERVER": "localhost",
+    "BROKER_URL": "memory://",
+    "RESULT_BACKEND": "cache+memory://",
+    "IOTHUB_HOST": "localhost",
+    "REGISTRY_SHARED_ACCESS_KEY_NAME": "test",
+    "REGISTRY_SHARED_ACCESS_KEY": "test",
+    "REACT_APP_API_URL": "http://localhost",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,152 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import fakeredis
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app import access_code_cache
+from app.crud import access_code as access_code_crud
+
+BOOKING_ID = 7
+KEY = access_code_cache.KEY.format(BOOKING_ID)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(access_code_cache, "redis_client", client)
+    return client
+
+
+def make_code(code="0123456789abcdef", valid_for=timedelta(days=2)):
+    now = datetime.utcnow()
+    return SimpleNamespace(
+        id=3,
+        booking_id=BOOKING_ID,
+        code=code,
+        valid_from=now - timedelta(days=1),
+        valid_until=now + valid_for,
+    )
+
+
+class FakeDb:
+    """Answers the cache fallback query with ``row``, counting the queries."""
+
+    def __init__(self, row=None, read_only=False):
+        self.row = row
+        self.info = {"read_only": read_only}
+        self.queries = 0
+
+    async def execute(self, statement, parameters=None):
+        self.queries += 1
+        return SimpleNamespace(first=lambda: self.row)
+
+
+async def settle():
+    await asyncio.gather(*access_code_cache._pending)
+
+
+def test_matches_checks_code_and_window():
+    entry = access_code_cache.make_entry(make_code(), 1, 2)
+    until = datetime.fromisoformat(entry["valid_until"])
+    assert access_code_cache.matches(entry, "0123456789abcdef")
+    assert not access_code_cache.matches(entry, "0123456789abcdee")
+    assert access_code_cache.matches(entry, "0123456789abcdef", until - timedelta(seconds=1))
+    assert not access_code_cache.matches(entry, "0123456789abcdef", until)
+    # Checked as typed, like signed codes at the lock
+    assert access_code_cache.matches(entry, " 0123456789ABCDEF ")
+
+
+def test_refill_loses_to_revocation_marker(redis):
+    async def run():
+        await access_code_cache.revoke([BOOKING_ID])
+        entry = access_code_cache.make_entry(make_code(), 1, 2)
+        await access_code_cache.store(entry, only_if_missing=True)
+        assert await access_code_cache.lookup(BOOKING_ID) == access_code_cache.REVOKED
+        # A new code (not a refill) replaces the marker
+        await access_code_cache.store(entry)
+        assert await access_code_cache.lookup(BOOKING_ID) == entry
+
+    asyncio.run(run())
+
+
+def test_expired_code_is_stored_as_revoked(redis):
+    async def run():
+        entry = access_code_cache.make_entry(make_code(valid_for=-timedelta(hours=1)), 1, 2)
+        await access_code_cache.store(entry)
+        assert await redis.get(KEY) == access_code_cache.REVOKED
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("commit", [True, False])
+def test_revocation_markers_follow_the_transaction(redis, commit):
+    engine = create_engine("sqlite://")
+
+    async def run():
+        await access_code_cache.store(access_code_cache.make_entry(make_code(), 1, 2))
+        with Session(engine) as session:
+            session.execute(text("SELECT 1"))
+            # As revoke_access_codes does: marked ahead of the commit
+            await access_code_cache.revoke([BOOKING_ID])
+            access_code_cache.revoke_on_commit(session, [BOOKING_ID])
+            if commit:
+                session.commit()
+            else:
+                session.rollback()
+        await settle()
+        if commit:
+            assert await redis.get(KEY) == access_code_cache.REVOKED
+        else:
+            # Lifted, the next check reads the database again
+            assert await redis.get(KEY) is None
+
+    asyncio.run(run())
+
+
+def test_markers_lifted_when_session_closes_without_commit(redis):
+    engine = create_engine("sqlite://")
+
+    async def run():
+        session = Session(engine)
+        session.execute(text("SELECT 1"))
+        await access_code_cache.revoke([BOOKING_ID])
+        access_code_cache.revoke_on_commit(session, [BOOKING_ID])
+        session.close()
+        await settle()
+        assert await redis.get(KEY) is None
+
+    asyncio.run(run())
+
+
+def test_find_access_code_hit_needs_no_query(redis):
+    async def run():
+        entry = access_code_cache.make_entry(make_code(), 1, 2)
+        await access_code_cache.store(entry)
+        db = FakeDb()
+        assert await access_code_crud.find_access_code(db, BOOKING_ID) == entry
+        assert db.queries == 0
+
+    asyncio.run(run())
+
+
+def test_find_access_code_refills_from_the_database(redis):
+    async def run():
+        code = make_code()
+        db = FakeDb(row=(code, 1, 2))
+        entry = await access_code_crud.find_access_code(db, BOOKING_ID)
+        assert entry == access_code_cache.make_entry(code, 1, 2)
+        assert await access_code_cache.lookup(BOOKING_ID) == entry
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("read_only, cached", [(False, "revoked"), (True, None)])
+def test_missing_code_cached_only_from_the_primary(redis, read_only, cached):
+    async def run():
+        db = FakeDb(read_only=read_only)
+        assert await access_code_crud.find_access_code(db, BOOKING_ID) is None
+        assert await redis.get(KEY) == cached
+
+    asyncio.run(run())
@@ -0,0 +1,115 @@
+import asyncio
+import fakeredis
+import pytest
+from asyncpg.exceptions import IntegrityConstraintViolationError
+from app import access_log_writer
+from app.access_log_writer import AccessLogWriter, QUEUE_KEY, REJECTED_KEY
+
+
+class FakeCopy:
+    """Stands in for ``AccessLogWriter.copy``: keeps the written rows, rejects
+    rows with a ``None`` status like the NOT NULL constraint, and fails once
+    with a connection error on the call numbered ``fail_on``."""
+
+    def __init__(self, fail_on=None):
+        self.rows = []
+        self.calls = 0
+        self.fail_on = fail_on
+
+    async def __call__(self, records):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise ConnectionError("database went away")
+        if any(record[4] is None for record in records):
+            raise IntegrityConstraintViolationError("null response_status")
+        self.rows.extend(records)
+
+
+def make_writer(buffer, copy, batch_size=10, max_buffer=100):
+    writer = AccessLogWriter(buffer, batch_size, flush_interval=60, max_buffer=max_buffer)
+    writer.copy = copy
+    return writer
+
+
+async def queue(writer, statuses, message):
+    for status in statuses:
+        await writer.write("open_lock", status, message)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(access_log_writer, "redis_client", client)
+    return client
+
+
+def messages(copy):
+    return [record[5] for record in copy.rows]
+
+
+@pytest.mark.parametrize("buffer", ["memory", "redis"])
+def test_rejected_rows_are_set_aside(buffer, redis):
+    async def run():
+        copy = FakeCopy()
+        writer = make_writer(buffer, copy)
+        await queue(writer, ["200", None, "200", None, "200"], "a")
+        await writer.flush()
+        assert [record[4] for record in copy.rows] == ["200"] * 3
+        assert writer.pending == []
+        assert await redis.llen(QUEUE_KEY) == 0
+        assert await redis.llen(REJECTED_KEY) == (2 if buffer == "redis" else 0)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("buffer", ["memory", "redis"])
+def test_transient_error_while_writing_row_by_row_does_not_duplicate(buffer, redis):
+    async def run():
+        # Call 1 rejects the batch, 2 and 3 write rows, 4 fails
+        copy = FakeCopy(fail_on=4)
+        writer = make_writer(buffer, copy)
+        await queue(writer, ["200", "201", None, "203", "204"], "b")
+        with pytest.raises(ConnectionError):
+            await writer.flush()
+        await writer.flush()
+        assert [record[4] for record in copy.rows] == ["200", "201", "203", "204"]
+        assert writer.pending == []
+        assert await redis.llen(QUEUE_KEY) == 0
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("buffer", ["memory", "redis"])
+def test_transient_error_requeues_batch_in_order(buffer, redis):
+    async def run():
+        copy = FakeCopy(fail_on=2)
+        writer = make_writer(buffer, copy, batch_size=3)
+        await queue(writer, [str(status) for status in range(7)], "c")
+        with pytest.raises(ConnectionError):
+            await writer.flush()
+        await writer.flush()
+        assert [record[4] for record in copy.rows] == [str(status) for status in range(7)]
+
+    asyncio.run(run())
+
+
+def test_full_buffer_drops_without_flushing():
+    async def run():
+        copy = FakeCopy()
+        writer = make_writer("memory", copy, batch_size=100, max_buffer=3)
+        await queue(writer, ["200"] * 5, "d")
+        assert copy.calls == 0
+        assert len(writer.pending) == 3 and writer.dropped == 2
+        await writer.flush()
+        assert len(copy.rows) == 3 and writer.dropped == 0
+
+    asyncio.run(run())
+
+
+def test_durable_write_raises():
+    async def run():
+        writer = make_writer("memory", FakeCopy(fail_on=1))
+        with pytest.raises(ConnectionError):
+            await writer.write("open_lock", "denied", durable=True)
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+from app.location_index import LocationIndex
+
+
+def build(locations):
+    index = LocationIndex()
+    index.rebuild(locations)
+    return index
+
+
+def test_short_prefix_ranks_every_match():
+    # The popular location sorts after thousands of other "a..." keys
+    index = build([(f"a{i:05d} town", 1) for i in range(5000)] + [("Azzz City", 500)])
+    assert index.suggest("a", 1) == [{"location": "Azzz City", "count": 500}]
+
+
+def test_cached_ranking_follows_count_changes():
+    index = build([("Kyiv, Ukraine", 2), ("Kharkiv, Ukraine", 1)])
+    assert index.suggest("k", 1)[0]["location"] == "Kyiv, Ukraine"
+    for _ in range(2):
+        index.add("Kharkiv, Ukraine")
+    assert index.suggest("k", 1) == [{"location": "Kharkiv, Ukraine", "count": 3}]
+    index.remove("Kharkiv, Ukraine")
+    index.remove("Kharkiv, Ukraine")
+    assert index.suggest("k", 1)[0]["location"] == "Kyiv, Ukraine"
+
+
+def test_matches_any_word():
+    index = build([("Kyiv, Ukraine", 1), ("Lviv, Ukraine", 3), ("Warsaw, Poland", 5)])
+    assert [s["location"] for s in index.suggest("ukr")] == ["Lviv, Ukraine", "Kyiv, Ukraine"]
+    assert index.suggest("ukraine lviv") == []
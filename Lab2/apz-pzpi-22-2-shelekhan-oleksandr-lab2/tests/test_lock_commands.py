@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.crud import access_code as access_code_crud
+
+DOOR = SimpleNamespace(id=1, property_id=2, lock_id="lock-1")
+
+
+@pytest.fixture
+def logs(monkeypatch):
+    entries = []
+
+    async def create_access_log(**entry):
+        entries.append(entry)
+
+    monkeypatch.setattr(access_code_crud.access_logs_crud, "create_access_log", create_access_log)
+    monkeypatch.setattr(access_code_crud, "lock_device_id", lambda lock_id: 3)
+    return entries
+
+
+def answer(monkeypatch, status):
+    async def send_command(lock_id, command):
+        return SimpleNamespace(status=status, payload={"result": "ok" if status == 200 else "error"})
+
+    monkeypatch.setattr(access_code_crud.lock_gateway, "send_command", send_command)
+
+
+def test_acknowledged_command_is_queued(monkeypatch, logs):
+    answer(monkeypatch, 200)
+    response = asyncio.run(access_code_crud.send_smart_lock_command(DOOR, "open_lock", 4))
+    assert response.status == 200
+    assert logs[0]["response_status"] == "200"
+    assert not logs[0]["durable"]
+
+
+@pytest.mark.parametrize("status", [404, 500, None])
+def test_lock_error_is_logged_and_raised(monkeypatch, logs, status):
+    answer(monkeypatch, status)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(access_code_crud.send_smart_lock_command(DOOR, "open_lock", 4))
+    assert e.value.status_code == 502
+    assert logs[0]["response_status"] == str(status)
+    assert logs[0]["durable"]
@@ -0,0 +1,94 @@
+import base64
+import secrets
+import struct
+from datetime import datetime, timedelta
+import pytest
+from cryptography.fernet import Fernet
+from app import offline_codes
+from app.offline_codes import (
+    derive_lock_secret,
+    issue_code,
+    parse_code,
+    revocation_payload,
+    verify_code,
+)
+
+SECRET = derive_lock_secret(Fernet.generate_key())
+VALID_FROM = datetime(2026, 10, 19, 14, 0)
+VALID_UNTIL = datetime(2026, 10, 22, 12, 0)
+
+
+def test_round_trip():
+    code = issue_code(SECRET, VALID_FROM, VALID_UNTIL, serial=42)
+    assert len(code) == 31
+    assert parse_code(code) == (42, VALID_FROM, VALID_UNTIL)
+    assert verify_code(SECRET, code, datetime(2026, 10, 20, 9, 30)) == 42
+
+
+def test_codes_are_checked_as_typed():
+    code = issue_code(SECRET, VALID_FROM, VALID_UNTIL, serial=42)
+    assert verify_code(SECRET, f"  {code.lower()}\n", VALID_FROM) == 42
+
+
+def test_window_edges():
+    code = issue_code(SECRET, VALID_FROM, VALID_UNTIL)
+    serial = parse_code(code)[0]
+    tick = timedelta(microseconds=1)
+    assert verify_code(SECRET, code, VALID_FROM - tick) is None
+    assert verify_code(SECRET, code, VALID_FROM) == serial
+    assert verify_code(SECRET, code, VALID_UNTIL - tick) == serial
+    assert verify_code(SECRET, code, VALID_UNTIL) is None
+
+
+def test_window_widened_to_whole_hours():
+    code = issue_code(SECRET, datetime(2026, 10, 19, 14, 30), datetime(2026, 10, 19, 16, 0, 1))
+    assert parse_code(code)[1:] == (datetime(2026, 10, 19, 14), datetime(2026, 10, 19, 17))
+
+
+@pytest.mark.parametrize(
+    "valid_until",
+    [VALID_FROM, VALID_FROM - timedelta(hours=1), VALID_FROM + timedelta(hours=0x10000)],
+)
+def test_window_out_of_range(valid_until):
+    with pytest.raises(ValueError):
+        issue_code(SECRET, VALID_FROM, valid_until)
+
+
+def tampered(code: str, index: int) -> str:
+    data = bytearray(offline_codes._decode(code))
+    data[index] ^= 0x01
+    return offline_codes._encode(bytes(data))
+
+
+def test_tampered_code_rejected():
+    code = issue_code(SECRET, VALID_FROM, VALID_UNTIL)
+    now = VALID_FROM + timedelta(hours=1)
+    # Last byte is the MAC, byte 5 is in the validity window
+    assert verify_code(SECRET, tampered(code, -1), now) is None
+    assert verify_code(SECRET, tampered(code, 5), now) is None
+
+
+def test_other_lock_secret_rejected():
+    code = issue_code(SECRET, VALID_FROM, VALID_UNTIL)
+    other = derive_lock_secret(Fernet.generate_key())
+    assert verify_code(other, code, VALID_FROM) is None
+
+
+def test_revoked_serial_rejected():
+    code = issue_code(SECRET, VALID_FROM, VALID_UNTIL, serial=7)
+    assert verify_code(SECRET, code, VALID_FROM, revoked=[3, 7]) is None
+    assert verify_code(SECRET, code, VALID_FROM, revoked=[3]) == 7
+
+
+def test_online_codes_are_not_signed_codes():
+    for _ in range(200):
+        assert parse_code(secrets.token_hex(8)) is None
+    assert parse_code("") is None
+    assert parse_code("not a code!") is None
+
+
+def test_revocation_payload_packing():
+    payload = revocation_payload([9, 1, 9, 0xFFFFFFFF])
+    assert payload["count"] == 3
+    assert struct.unpack(">3I", base64.b64decode(payload["revoked"])) == (1, 9, 0xFFFFFFFF)
+    assert revocation_payload([]) == {"revoked": "", "count": 0}
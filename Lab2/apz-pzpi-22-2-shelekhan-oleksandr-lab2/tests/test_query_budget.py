@@ -0,0 +1,68 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app.core.instrumentation import (
+    QueryStatsMiddleware,
+    assert_query_budget,
+    instrument_engine,
+    query_budget,
+)
+
+engine = create_engine("sqlite://")
+instrument_engine(engine, "test")
+
+app = FastAPI()
+app.add_middleware(QueryStatsMiddleware)
+
+
+def run_queries(count: int):
+    with engine.connect() as connection:
+        for _ in range(count):
+            connection.execute(text("SELECT 1"))
+
+
+@app.get("/within")
+@query_budget(2)
+async def within_budget():
+    run_queries(2)
+    return {}
+
+
+@app.get("/over")
+@query_budget(1)
+async def over_budget():
+    run_queries(3)
+    return {}
+
+
+@app.get("/undeclared")
+async def undeclared():
+    run_queries(1)
+    return {}
+
+
+client = TestClient(app)
+
+
+def test_route_within_budget_passes():
+    response = client.get("/within")
+    assert response.headers["X-DB-Query-Count"] == "2"
+    assert_query_budget(response)
+
+
+def test_route_over_budget_fails():
+    response = client.get("/over")
+    with pytest.raises(AssertionError, match="executed 3 queries, budget is 1"):
+        assert_query_budget(response)
+
+
+def test_explicit_budget_overrides_route():
+    response = client.get("/within")
+    with pytest.raises(AssertionError):
+        assert_query_budget(response, max_queries=1)
+
+
+def test_route_without_budget_fails():
+    with pytest.raises(AssertionError, match="No query budget"):
+        assert_query_budget(client.get("/undeclared"))
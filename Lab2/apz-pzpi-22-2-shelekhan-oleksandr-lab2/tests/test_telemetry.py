@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from app.telemetry import detect_anomalies, iqr_scores, rolling_zscore
+
+
+def brute_zscore(property_ids, values, window):
+    scores = np.zeros(len(values))
+    for i in range(len(values)):
+        before = [
+            values[j]
+            for j in range(max(0, i - window), i)
+            if property_ids[j] == property_ids[i]
+        ]
+        if len(before) < window:
+            continue
+        std = np.std(before)
+        if std > 1e-9:
+            scores[i] = (values[i] - np.mean(before)) / std
+    return scores
+
+
+def brute_iqr(property_ids, values, k):
+    scores = np.zeros(len(values))
+    for property_id in np.unique(property_ids):
+        rows = np.flatnonzero(property_ids == property_id)
+        q1, q3 = np.percentile(values[rows], [25, 75])
+        iqr = q3 - q1
+        if iqr <= 0:
+            continue
+        for i in rows:
+            if values[i] < q1 - k * iqr:
+                scores[i] = (values[i] - (q1 - k * iqr)) / iqr
+            elif values[i] > q3 + k * iqr:
+                scores[i] = (values[i] - (q3 + k * iqr)) / iqr
+    return scores
+
+
+def readings(lengths, seed=0):
+    """Readings of several locks sorted by lock, each around its own level."""
+    rng = np.random.default_rng(seed)
+    property_ids = np.repeat(np.arange(1, len(lengths) + 1), lengths)
+    levels = np.repeat(rng.uniform(-10, 40, len(lengths)), lengths)
+    return property_ids, levels + rng.normal(0, 1.5, len(property_ids))
+
+
+@pytest.mark.parametrize("window", [1, 3, 10])
+def test_rolling_zscore_matches_brute_force(window):
+    # Segments shorter than, equal to and longer than the window
+    property_ids, values = readings([1, 2, 3, 10, 11, 50, 4])
+    values[40] += 25
+    expected = brute_zscore(property_ids, values, window)
+    np.testing.assert_allclose(rolling_zscore(property_ids, values, window), expected, atol=1e-6)
+
+
+def test_rolling_zscore_flat_windows_score_zero():
+    property_ids = np.array([1] * 6 + [2] * 6)
+    values = np.array([20.0] * 5 + [35.0] + [18.0, 18.0, 18.0, 19.0, 18.0, 18.0])
+    scores = rolling_zscore(property_ids, values, 3)
+    # Lock 1 only ever looks back at a flat window, its spike included
+    assert not scores[:6].any()
+    np.testing.assert_allclose(scores, brute_zscore(property_ids, values, 3), atol=1e-6)
+    assert scores[9] == 0 and scores[10] < 0
+
+
+def test_rolling_zscore_fewer_readings_than_window():
+    assert not rolling_zscore(np.array([1, 1, 2]), np.array([1.0, 5.0, 9.0]), 3).any()
+
+
+def test_iqr_scores_match_brute_force():
+    property_ids, values = readings([1, 5, 8, 40], seed=1)
+    values[[3, 20, 45]] += [30, -30, 12]
+    np.testing.assert_allclose(
+        iqr_scores(property_ids, values, 1.5), brute_iqr(property_ids, values, 1.5), atol=1e-9
+    )
+
+
+def test_iqr_scores_flat_lock_scores_zero():
+    property_ids = np.array([1, 1, 1, 1, 2, 2, 2, 2, 2])
+    values = np.array([21.0, 21.0, 21.0, 21.0, 20.0, 21.0, 22.0, 21.0, 60.0])
+    scores = iqr_scores(property_ids, values, 1.5)
+    assert not scores[:4].any()
+    assert scores[8] > 0 and not scores[4:8].any()
+
+
+def test_detect_anomalies_flags_the_spike_of_each_lock():
+    property_ids, values = readings([30, 30, 30], seed=2)
+    values[[25, 55, 85]] += [20, -20, 20]
+    for method, threshold in (("zscore", 4.0), ("iqr", 3.0)):
+        mask, scores = detect_anomalies(
+            property_ids, values, method=method, window=20, threshold=threshold
+        )
+        assert set(np.flatnonzero(mask)) == {25, 55, 85}
+        assert scores.shape == values.shape
+
+
+def test_detect_anomalies_unknown_method():
+    with pytest.raises(ValueError):
+        detect_anomalies([1], [1.0], method="mad")
+
+
+def test_rolling_zscore_flat_lock_after_many_readings():
+    # Cumulative sums are large by the last lock, rounding must not score it
+    property_ids, values = readings([5000] * 20, seed=3)
+    property_ids = np.concatenate((property_ids, [99] * 30))
+    values = np.concatenate((values, [21.3] * 30))
+    assert not rolling_zscore(property_ids, values, 10)[-20:].any()